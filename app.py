@@ -11,15 +11,23 @@ from typing import List, Optional, Literal
 import os
 from tempfile import NamedTemporaryFile
 from knowledge_base import KnowledgeBase
-from llms import get_llm
+from neo4j_worker import get_neo4j_worker, close_neo4j_worker, close_async_neo4j_reader
+from graph_store import get_graph_backend
+from llms import get_llm, close_llms, fit_context
+from search import get_url_fetcher, close_url_fetcher
 from prompts import CHAT_PROMPT, RAG_PROMPT, URL_CHAT_PROMPT, GRAPH_CHAT_PROMPT
 from config import (ALLOWED_EXTENSIONS, MAX_CONTENT_LENGTH,
                     ALLOWED_CHAT_MODELS, MAX_URL_NUM,
-                    ALLOWED_GRAPH_MODELS, SERVER_HOST, SERVER_PORT)
+                    ALLOWED_GRAPH_MODELS, SERVER_HOST, SERVER_PORT,
+                    GRAPH_SCHEMA_AUTO_CREATE, GRAPH_RAG_MODE, GRAPH_BACKEND)
 import json
 
-from utils import get_logging
+from utils import (get_logging, stop_logging, metrics_registry, coalesce_stream, SingleFlight, StreamFlight,
+                   flight_key)
 from datetime import datetime
+import asyncio
+from embedding_models import embedding_loader
+from semantic_cache import get_semantic_cache, cache_key
 
 logging = get_logging()
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -42,6 +50,53 @@ def stream_response(data):
     return 'data: ' + json.dumps(data, ensure_ascii=False) + '\n\n'
 
 
+def stream_llm_response(deltas, model_name):
+    """大模型流式回复的增量按时间窗口合并后再输出 SSE 帧"""
+    return coalesce_stream(deltas, lambda text: stream_response({"code": 200,
+                                                                  "type": "response",
+                                                                  "model": model_name,
+                                                                  "data": text}))
+
+
+# 合并相同的并发检索和大模型调用
+retrieval_flight = SingleFlight("retrieval")
+llm_flight = StreamFlight("llm")
+
+
+async def cache_query_embedding(user_input):
+    """开启语义缓存时计算问题向量(用于缓存匹配，检索时复用)，未开启时返回 None"""
+    if get_semantic_cache() is None:
+        return None
+    return await asyncio.to_thread(embedding_loader.get_embedding_model().embed_query, user_input)
+
+
+def llm_deltas(llm, context, user_input, temperature, stream, query_embedding, endpoint, kb_uuid, model_name,
+               prompt_template, context_ids=()):
+    """
+    大模型的流式回复。提示完全相同的并发请求共享一次调用，各自订阅同一输出；
+    开启语义缓存时先按问题向量查缓存，命中则回放缓存的回复，未命中时生成并写入缓存
+    :param context: fit_context 组装的上下文
+    """
+    def produce():
+        return llm.get_response(context.system_prompt, user_input, history=context.history,
+                                temperature=temperature, stream=stream)
+
+    def cached():
+        cache = get_semantic_cache()
+        if cache is None or query_embedding is None:
+            return produce()
+        key = cache_key(endpoint, kb_uuid, model_name, prompt_template, context_ids, context.history)
+        return cache.stream(key, query_embedding, produce)
+
+    key = flight_key(endpoint, model_name, context.system_prompt, context.history, user_input, temperature, stream)
+    return llm_flight.stream(key, cached)
+
+
+def prompt_headers(context):
+    """在响应头中返回本次请求的提示 token 数"""
+    return {"X-Prompt-Tokens": str(context.prompt_tokens)}
+
+
 app = FastAPI()
 
 # 允许跨域请求
@@ -60,6 +115,27 @@ app.add_middleware(LimitUploadSizeMiddleware)
 kb = KnowledgeBase()
 
 
+@app.on_event("startup")
+def startup():
+    if GRAPH_BACKEND == "neo4j" and GRAPH_SCHEMA_AUTO_CREATE:
+        try:
+            worker = get_neo4j_worker()
+            worker.schema.ensure_schema()
+            worker.schema.diagnose()
+        except Exception as e:
+            logging.error(f"图数据库索引检查失败: {e}")
+    kb.resume_graph_deletions()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    close_neo4j_worker()
+    await close_async_neo4j_reader()
+    await close_llms()
+    await close_url_fetcher()
+    stop_logging()
+
+
 # 创建知识库接口
 @app.post(
     "/create_kb",
@@ -279,19 +355,20 @@ async def chat_stream(
         raise HTTPException(status_code=500, detail="用户输入不能为空")
     try:
         llm = get_llm(model_name)
+        query_embedding = await retrieval_flight.do(flight_key("embed", user_input),
+                                                    lambda: cache_query_embedding(user_input))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     try:
+        context = fit_context(llm, lambda items: system_prompt, [], history, user_input, model_name)
+
         async def generate():
-            async for response in llm.get_response(system_prompt, user_input,
-                                                   history=history, temperature=temperature,
-                                                   stream=stream):
-                yield stream_response({"code": 200,
-                                       "type": "response",
-                                       "model": model_name,
-                                       "data": response})
+            deltas = llm_deltas(llm, context, user_input, temperature, stream, query_embedding,
+                                "chat", None, model_name, system_prompt)
+            async for frame in stream_llm_response(deltas, model_name):
+                yield frame
 
-        return StreamingResponse(generate(), media_type="text/event-stream")
+        return StreamingResponse(generate(), media_type="text/event-stream", headers=prompt_headers(context))
     except Exception as e:
         logging.error(str(e))
 
@@ -321,28 +398,25 @@ async def chat_url_info(
     try:
         async def generate():
             from utils import extract_url
-            from search import SearchHelper
 
-            search_helper = SearchHelper()
             url_list = extract_url(user_input)
-            res = search_helper.get_info_from_url(url_list)
-            logging.info(res)
-
-            if 0 < MAX_URL_NUM < len(res):
+            if 0 < MAX_URL_NUM < len(url_list):
                 logging.warning(f"URL 数量超过最大限制 {MAX_URL_NUM}, 仅解析前 {MAX_URL_NUM} 个")
-                res = res[:MAX_URL_NUM]
+                url_list = url_list[:MAX_URL_NUM]
+
+            res = await get_url_fetcher().fetch_all(url_list)
+            logging.info(res)
 
             # yield stream_response({"code": 200, "type": "url_info", "msg": "URL 信息", "data": res})
 
-            system_prompt = URL_CHAT_PROMPT.format(url_info=res)
+            context = fit_context(llm, lambda infos: URL_CHAT_PROMPT.format(url_info=infos), res, history,
+                                  user_input, model_name)
 
-            async for response in llm.get_response(system_prompt, user_input,
-                                                   history=history, temperature=temperature,
-                                                   stream=stream):
-                yield stream_response({"code": 200,
-                                       "type": "response",
-                                       "model": model_name,
-                                       "data": response})
+            deltas = llm.get_response(context.system_prompt, user_input,
+                                      history=context.history, temperature=temperature,
+                                      stream=stream)
+            async for frame in stream_llm_response(deltas, model_name):
+                yield frame
 
             yield stream_response({"code": 200,
                                    "type": "response",
@@ -379,24 +453,27 @@ async def rag_chat(
         raise HTTPException(status_code=500, detail="用户输入不能为空")
     if not kb_uuid:
         raise HTTPException(status_code=500, detail="知识库 UUID 不能为空")
+    async def retrieve():
+        query_embedding = await cache_query_embedding(user_input)
+        return query_embedding, await asyncio.to_thread(kb.find_top_k_matches_in_kb, kb_uuid, user_input, top_k,
+                                                        query_embedding=query_embedding)
+
     try:
-        res = kb.find_top_k_matches_in_kb(kb_uuid, user_input, top_k)
+        query_embedding, res = await retrieval_flight.do(flight_key("rag", kb_uuid, user_input, top_k), retrieve)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     try:
-        knowledges = "\n".join([match[1] for match in res])
-        system_prompt = RAG_PROMPT.format(knowledges=knowledges)
         llm = get_llm(model_name)
+        context = fit_context(llm, lambda chunks: RAG_PROMPT.format(knowledges="\n".join(chunks)),
+                              [match[1] for match in res], history, user_input, model_name)
 
         async def generate():
             # yield stream_response({"code": 200, "type": "match", "msg": "匹配结果", "data": res})
 
-            async for response in llm.get_response(system_prompt, user_input,
-                                                   history=history, temperature=temperature, stream=stream):
-                yield stream_response({"code": 200,
-                                       "type": "response",
-                                       "model": model_name,
-                                       "data": response})
+            deltas = llm_deltas(llm, context, user_input, temperature, stream, query_embedding,
+                                "rag", kb_uuid, model_name, RAG_PROMPT, context_ids=[match[0] for match in res])
+            async for frame in stream_llm_response(deltas, model_name):
+                yield frame
 
             yield stream_response({"code": 200,
                                    "type": "response",
@@ -410,7 +487,7 @@ async def rag_chat(
                                        "data": f'{index}.\"\n' + code_block + f'\n\"\n相似度:{match[2]}\n'})
                 index += 1
 
-        return StreamingResponse(generate(), media_type="text/event-stream")
+        return StreamingResponse(generate(), media_type="text/event-stream", headers=prompt_headers(context))
     except Exception as e:
         logging.error(str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -430,34 +507,45 @@ async def graph_rag_chat(
         temperature: confloat(ge=0.0, le=1.0) = Body(0.8, description="温度", examples=[0.8]),
         stream: bool = Body(True, description="是否流式", examples=[True]),
         top_k: int = Body(3, description="top k", examples=[3]),
-        kb_uuid: str = Body(..., description="知识库 UUID", examples=["1"])
+        kb_uuid: str = Body(..., description="知识库 UUID", examples=["1"]),
+        graph_mode: Literal["one_hop", "expand", "entity", "global"] = Body(GRAPH_RAG_MODE,
+                                                                            description="图谱检索模式",
+                                                                            examples=["expand"])
 ):
     if not user_input:
         raise HTTPException(status_code=500, detail="用户输入不能为空")
     if not kb_uuid:
         raise HTTPException(status_code=500, detail="知识库 UUID 不能为空")
+    async def retrieve():
+        query_embedding = await cache_query_embedding(user_input)
+        return query_embedding, await kb.afind_top_k_matches_in_graph(kb_uuid, user_input, top_k, mode=graph_mode,
+                                                                      query_embedding=query_embedding)
+
     try:
-        res = kb.find_top_k_matches_in_graph(kb_uuid, user_input, top_k)
+        query_embedding, res = await retrieval_flight.do(
+            flight_key("graph_rag", kb_uuid, user_input, top_k, graph_mode), retrieve)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     try:
 
-        graph_info = [
-            f"( {item['source']} : {', '.join(item['source_labels'])} )-[ {item['rel_type']} ] -> ( {item['target']} : {', '.join(item['target_labels'])} )"
-            for item in res]
-        system_prompt = GRAPH_CHAT_PROMPT.format(graph='/n'.join(graph_info))
+        if graph_mode == "global":
+            graph_info = [f"[社区 {item['community']}] {item['summary']}" for item in res]
+        else:
+            graph_info = [
+                f"( {item['source']} : {', '.join(item['source_labels'])} )-[ {item['rel_type']} ] -> ( {item['target']} : {', '.join(item['target_labels'])} )"
+                for item in res]
         llm = get_llm(model_name)
+        context = fit_context(llm, lambda lines: GRAPH_CHAT_PROMPT.format(graph='/n'.join(lines)), graph_info,
+                              history, user_input, model_name)
 
         async def generate():
             # for match in res:
             #     yield stream_response({"code": 200, "type": "match", "msg": "匹配结果", "data": match})
 
-            async for response in llm.get_response(system_prompt, user_input,
-                                                   history=history, temperature=temperature, stream=stream):
-                yield stream_response({"code": 200,
-                                       "type": "response",
-                                       "model": model_name,
-                                       "data": response})
+            deltas = llm_deltas(llm, context, user_input, temperature, stream, query_embedding,
+                                "graph_rag", kb_uuid, model_name, GRAPH_CHAT_PROMPT, context_ids=graph_info)
+            async for frame in stream_llm_response(deltas, model_name):
+                yield frame
 
             yield stream_response({"code": 200,
                                    "type": "response",
@@ -467,12 +555,51 @@ async def graph_rag_chat(
             for info in graph_info:
                 yield stream_response({"code": 200, "type": "response", "msg": "匹配结果", "data": info + '\n'})
 
-        return StreamingResponse(generate(), media_type="text/event-stream")
+        return StreamingResponse(generate(), media_type="text/event-stream", headers=prompt_headers(context))
     except Exception as e:
         logging.error(str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# 运行指标接口
+@app.get(
+    "/metrics",
+    tags=["system"],
+    summary="获取运行指标",
+)
+async def get_metrics():
+    return {"code": 200, "msg": "运行指标获取成功", "metrics": metrics_registry.snapshot()}
+
+
+# 健康检查接口
+@app.get(
+    "/health",
+    tags=["system"],
+    summary="健康检查",
+)
+def health():
+    graph_status = get_graph_backend().health_check()
+    code = 200 if graph_status["ok"] else 503
+    # 依赖不可用时 HTTP 状态码也返回 503，负载均衡和探针才能感知
+    return JSONResponse(status_code=code, content={"code": code, "msg": "健康检查完成", "graph": graph_status})
+
+
+# 图数据库索引诊断接口
+@app.get(
+    "/graph_diagnose",
+    tags=["system"],
+    summary="图数据库索引诊断",
+)
+def graph_diagnose():
+    if GRAPH_BACKEND != "neo4j":
+        return {"code": 200, "msg": f"图存储后端 {GRAPH_BACKEND} 不需要索引诊断", "report": {}}
+    try:
+        report = get_neo4j_worker().schema.diagnose()
+        return {"code": 200, "msg": "索引诊断完成", "report": report}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     logging.info("加载 embedding 模型...")
     from embedding_models import embedding_loader
@@ -1,10 +1,13 @@
 from .gpt import *
 from .qianfan import *
+from .fake import *
 
 def get_chat_openai(model_name):
     if model_name == 'openai':
         return get_gpt_chatopenai()
     if model_name == 'qianfan':
         return get_qianfan_chatopenai()
+    if model_name == 'fake':
+        return get_fake_chatopenai()
     else:
         raise ValueError("Invalid model name")
\ No newline at end of file
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+
+FAKE_NODE_TYPES = ["Person", "Organization", "Product", "Location", "Concept"]
+FAKE_REL_TYPES = ["WORKS_FOR", "LOCATED_IN", "PRODUCES", "RELATED_TO", "PART_OF"]
+
+
+class FakeGraphChatModel(BaseChatModel):
+    """
+    离线的确定性图谱抽取模型，用于在没有真实服务商时测量图谱构建自身的开销。
+
+    同一段文本总是产生相同的关系；实体从固定大小的实体池中按哈希选取，
+    因此不同分块之间会出现重复实体，与真实抽取结果的合并情况相近。
+    """
+
+    latency: float = 0.0
+    """每次调用的模拟延迟(秒)"""
+    relations_per_chunk: int = 5
+    """每个分块输出的关系数量"""
+    entity_pool_size: int = 1000
+    """实体池大小"""
+    function_call: bool = True
+    """是否支持 with_structured_output(函数调用)模式，False 时只输出纯文本 JSON"""
+    parsed: bool = False
+    """函数调用模式下是否返回已解析的 pydantic 对象，False 时走原始 JSON 解析路径"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-graph"
+
+    def _fake_relations(self, text: str) -> List[dict]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        relations = []
+        for i in range(self.relations_per_chunk):
+            head = int.from_bytes(digest[i % 16:i % 16 + 4], "little") + i
+            tail = int.from_bytes(digest[(i + 8) % 16:(i + 8) % 16 + 4], "little") + 7 * i
+            relations.append({
+                "head": f"entity {head % self.entity_pool_size}",
+                "head_type": FAKE_NODE_TYPES[head % len(FAKE_NODE_TYPES)],
+                "relation": FAKE_REL_TYPES[(head + tail) % len(FAKE_REL_TYPES)],
+                "tail": f"entity {tail % self.entity_pool_size}",
+                "tail_type": FAKE_NODE_TYPES[tail % len(FAKE_NODE_TYPES)],
+            })
+        return relations
+
+    def _fake_graph_arguments(self, text: str) -> dict:
+        nodes = {}
+        relationships = []
+        for rel in self._fake_relations(text):
+            nodes[rel["head"]] = rel["head_type"]
+            nodes[rel["tail"]] = rel["tail_type"]
+            relationships.append({
+                "source_node_id": rel["head"],
+                "source_node_type": rel["head_type"],
+                "target_node_id": rel["tail"],
+                "target_node_type": rel["tail_type"],
+                "type": rel["relation"],
+            })
+        return {
+            "nodes": [{"id": node_id, "type": node_type} for node_id, node_type in nodes.items()],
+            "relationships": relationships,
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        content = json.dumps(self._fake_relations(messages[-1].content), ensure_ascii=False)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def with_structured_output(self, schema: Any, include_raw: bool = False, **kwargs: Any):
+        if not self.function_call:
+            raise NotImplementedError("FakeGraphChatModel 未开启函数调用模式")
+        return _FakeStructuredOutput(model=self, schema=schema, include_raw=include_raw)
+
+
+class _FakeStructuredOutput(Runnable):
+    """
+    模拟 with_structured_output 返回的函数调用结果。
+    不使用 RunnableLambda，避免其每次调用时读取源码带来的额外开销干扰基准测试。
+    """
+
+    def __init__(self, model: FakeGraphChatModel, schema: Any, include_raw: bool):
+        self.model = model
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def invoke(self, input: Any, config: Any = None) -> Any:
+        if self.model.latency:
+            time.sleep(self.model.latency)
+        messages = input.to_messages()
+        arguments = self.model._fake_graph_arguments(messages[-1].content)
+        raw = AIMessage(
+            content="",
+            additional_kwargs={
+                "tool_calls": [{
+                    "id": "call_fake",
+                    "type": "function",
+                    "function": {
+                        "name": getattr(self.schema, "__name__", "DynamicGraph"),
+                        "arguments": json.dumps(arguments, ensure_ascii=False),
+                    },
+                }]
+            },
+        )
+        parsed = self.schema.parse_obj(arguments) if self.model.parsed else None
+        if not self.include_raw:
+            return parsed
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+
+def get_fake_chatopenai():
+    return FakeGraphChatModel()
@@ -0,0 +1,183 @@
+# 大模型配置
+# kimi
+KIMI_API_KEY = ''
+KIMI_BASE_URL = "https://api.moonshot.cn/v1"  # 压测时可指向 test/mock_openai_server.py
+# Kimi 按提示长度选择能容纳的最小上下文模型 [(模型名, 上下文长度)]，按上下文长度升序
+KIMI_CONTEXT_TIERS = (("moonshot-v1-8k", 8192), ("moonshot-v1-32k", 32768), ("moonshot-v1-128k", 131072))
+KIMI_MAX_PROMPT_TOKENS = 6000  # 提示的 token 上限，超出时从最早的历史和相关度最低的知识开始丢弃
+
+# qianfan
+QIANFAN_AK = ''
+QIANFAN_SK = ''
+
+# openai(proxy)
+OPENAI_API_KEY = "mock"
+OPENAI_BASE_URL = "http://127.0.0.1:9000/v1"
+OPENAI_MODEL = "gpt-4"
+OPENAI_CONTEXT_LENGTH = 8192  # OPENAI_MODEL 的上下文长度
+OPENAI_MAX_PROMPT_TOKENS = 6000  # 提示(系统提示 + 历史 + 用户输入)的 token 上限
+
+# 搜索引擎API配置
+# https://www.apihz.cn/
+APIHZ_USER_ID = ''
+APIHZ_USER_KEY = ''
+
+# 设备类型, 可选 "cpu" 或 "cuda"
+DEVICE = "cpu"
+
+# Embedding模型路径
+EMBEDDING_MODEL_PATH = r"D:\xz\大创\矿大智慧助手\代码\langchain-graph-builder\models\multilingual_MiniLM_L12_v2"
+
+# 向量知识库路径
+VEC_BASE_PATH = "/tmp/lgb/vec_base"
+
+# Neo4j Vector Index配置
+GRAPH_VEC_BASE_PATH = "/tmp/lgb/graph_vec"
+
+# 配置日志路径
+LOG_PATH = "/tmp/lgb/logs"
+LOG_LEVEL = "DEBUG"  # 这里可以设置为 "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"
+# 日志写入有界队列，由后台线程写文件和控制台；队列中超过 LOG_QUEUE_SIZE 条时丢弃 WARNING 以下的日志而不阻塞请求
+LOG_QUEUE_SIZE = 10000
+# 为 WARNING 及以上的日志额外保留的队列位置，保留位置也满时最多等待 LOG_BLOCK_TIMEOUT 秒
+LOG_QUEUE_RESERVED = 1000
+LOG_BLOCK_TIMEOUT = 0.1
+# 按日志分类设置级别，"llm.stream" 为大模型逐 token 输出(DEBUG)，默认不记录，完整回复仍在 INFO 记录一次
+LOG_CATEGORY_LEVELS = {"llm.stream": "INFO"}
+# 按日志分类采样，分类 -> 保留比例(0~1)，WARNING 及以上总是保留，例如 {"llm.stream": 0.01}
+LOG_SAMPLE_RATES = {}
+
+# 允许上传的文件类型
+ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt', 'csv', 'xlsx', 'html', 'json', 'md'}
+
+# 允许的聊天模型和图抽取模型
+# 图抽取模型可加入 'fake'(离线模拟模型)用于测试和基准测试
+ALLOWED_CHAT_MODELS = ['kimi', 'openai', 'qianfan', 'auto']
+ALLOWED_GRAPH_MODELS = ['openai', 'qianfan']
+
+# 单次对话解析URL最大数量
+# -1表示不限制
+MAX_URL_NUM = 2
+MAX_INPUT_LENGTH = 1024  # 最大输入长度
+
+# 网页抓取配置(对话中解析URL)
+# 连接、读取超时(秒)，以及单个URL的总耗时上限(秒)，超时的页面内容为空
+FETCH_CONNECT_TIMEOUT = 3.0
+FETCH_READ_TIMEOUT = 5.0
+FETCH_TOTAL_TIMEOUT = 8.0
+# 每个域名的最大并发请求数和连接池总连接数
+FETCH_MAX_PER_HOST = 4
+FETCH_MAX_CONNECTIONS = 100
+# 单个页面最多下载的字节数，提取到 MAX_INPUT_LENGTH 个字符后也会提前停止下载
+FETCH_MAX_BYTES = 2 * 1024 * 1024  # 2MB
+
+# 网页缓存: 按URL缓存提取后的文本，TTL(秒)内直接使用缓存，过期后用 ETag / Last-Modified 发起条件请求校验
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TTL = 600
+# 校验时源站返回 5xx、网络错误或超时，过期不超过该时间(秒)的缓存仍可使用；返回 4xx 时删除缓存
+PAGE_CACHE_MAX_STALE = 86400
+PAGE_CACHE_MAX_ENTRIES = 1000  # 内存中缓存的页面数
+# 磁盘缓存目录，为空时只使用内存缓存；磁盘缓存总大小超过上限时淘汰最久未使用的页面
+PAGE_CACHE_PATH = "/tmp/lgb/page_cache"
+PAGE_CACHE_MAX_DISK_BYTES = 100 * 1024 * 1024  # 100MB
+
+# 允许上传的文件大小
+MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20MB
+
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_USER = "neo4j"
+NEO4J_PASSWORD = ''
+NEO4J_DATABASE = "neo4j"
+NEO4J_MAX_POOL_SIZE = 50  # 连接池最大连接数
+NEO4J_CONNECTION_TIMEOUT = 5.0  # 从连接池获取连接的超时时间(秒)
+NEO4J_QUERY_TIMEOUT = None  # 单次查询超时时间(秒), None表示不限制
+NEO4J_WRITE_BATCH_SIZE = 1000  # 批量写入时每个事务的行数
+NEO4J_DELETE_BATCH_SIZE = 1000  # 删除知识库图谱时每个事务删除的节点数
+# 按知识库分区实体节点: 实体按 (kb_uuid, id) 唯一, 检索和删除只访问该知识库的实体
+# 切换后需要重新构建已有知识库的图谱
+GRAPH_PARTITION_BY_KB = False
+GRAPH_SCHEMA_AUTO_CREATE = True  # 启动时自动创建图数据库约束与索引
+
+GRAPH_BACKEND = "embedded"
+GRAPH_STORE_PATH = "/tmp/lgb/graph_store"
+
+# 大模型服务商共享的 HTTP 连接池配置
+LLM_HTTP_MAX_CONNECTIONS = 500  # 最大并发连接数, 即同时进行的流式回复上限
+LLM_HTTP_MAX_KEEPALIVE = 100  # 保持的空闲长连接数
+LLM_HTTP_KEEPALIVE_EXPIRY = 30.0  # 空闲长连接保持时间(秒)
+LLM_HTTP_TIMEOUT = 60.0  # 读写超时(秒), 流式回复中两个数据块的最大间隔
+LLM_HTTP_CONNECT_TIMEOUT = 5.0  # 建立连接超时(秒)
+
+# 流式对话的 SSE 合并: 第一个 token 立即发出，之后的增量在时间窗口(毫秒)内或累计到字符数上限时合并为一帧，窗口为 0 时不合并
+SSE_COALESCE_WINDOW_MS = 30
+SSE_COALESCE_MAX_CHARS = 256
+
+# 语义回复缓存(/chat/chat、/chat/rag、/chat/graph_rag): 接口、知识库、模型、提示词模板、检索结果和对话历史都相同，
+# 且问题向量的余弦相似度不低于阈值时，直接回放之前的回复
+SEMANTIC_CACHE_ENABLED = False
+SEMANTIC_CACHE_THRESHOLD = 0.95
+SEMANTIC_CACHE_TTL = 3600  # 条目有效期(秒)
+SEMANTIC_CACHE_MAX_ENTRIES = 10000  # 条目数上限，超过后按 LRU 淘汰
+
+# 组装提示时对话历史最多占用的预算比例(其余留给检索到的知识)，token 数优先用 tiktoken(可选依赖)统计，未安装时估算
+LLM_HISTORY_BUDGET_RATIO = 0.3
+
+# 模型名称 "auto": 在以下服务商之间按滚动的首 token 延迟(TTFT)和错误率路由
+LLM_ROUTER_PROVIDERS = ["kimi", "openai"]
+LLM_ROUTER_WINDOW = 100  # 每个服务商统计最近多少次请求
+LLM_ROUTER_MIN_SAMPLES = 10  # 样本数达到后才按错误率熔断、按 TTFT 分位数计算对冲延迟
+LLM_ROUTER_ERROR_THRESHOLD = 0.5  # 错误率超过该值时熔断
+LLM_ROUTER_COOLDOWN = 30  # 熔断时长(秒)，期间只在其他服务商都失败时才使用
+# 对冲请求: 首 token 在首选服务商 TTFT 的 LLM_HEDGE_PERCENTILE 分位数内未到达时，向下一个服务商再发一次请求，取先返回的一方
+LLM_HEDGE_ENABLED = True
+LLM_HEDGE_PERCENTILE = 95
+LLM_HEDGE_MIN_DELAY = 0.5  # 对冲延迟下限(秒)
+LLM_HEDGE_MAX_DELAY = 5.0  # 对冲延迟上限(秒)，样本不足时使用
+
+# 合并相同的并发请求: 检索参数相同的请求共享一次检索，提示完全相同的请求共享一次大模型调用并各自输出
+SINGLE_FLIGHT_ENABLED = True
+
+# 服务器端口
+SERVER_PORT = 5000
+SERVER_HOST = "127.0.0.1"
+
+# 线程数
+NUMEXPR_MAX_THREADS = 16
+
+# 图谱抽取并发与重试配置
+# 并发上限按AIMD自适应调整: 成功时缓慢增加, 遇到限流(429)或超时减半
+GRAPH_EXTRACT_INITIAL_CONCURRENCY = 4
+GRAPH_EXTRACT_MAX_CONCURRENCY = 16
+GRAPH_EXTRACT_MAX_RETRIES = 5  # 单个分块最大重试次数
+GRAPH_EXTRACT_BACKOFF_BASE = 1.0  # 指数退避基数(秒)
+GRAPH_EXTRACT_BACKOFF_MAX = 30.0  # 单次退避上限(秒)
+
+# 流式图谱构建配置
+GRAPH_WRITE_BATCH_SIZE = 50  # 每批写入数据库的图文档数量
+GRAPH_PIPELINE_QUEUE_SIZE = 64  # 抽取与写入之间的队列深度
+GRAPH_TRANSFORMER_CACHE_SIZE = 32  # 按抽取配置缓存的图谱转换器数量
+
+# GraphRAG 检索配置
+# one_hop: 返回种子实体的全部一跳关系; expand: 限制度数的多跳扩展, 按相关度排序后取前 GRAPH_RAG_TOP_M 条
+# entity: 与 expand 相同, 但种子实体直接从实体名称向量索引中检索, 不经过分块
+# global: 检索预先生成的社区摘要, 适合关于知识库整体的问题
+GRAPH_RAG_MODE = "expand"
+GRAPH_RAG_HOPS = 2  # 扩展跳数
+GRAPH_RAG_FANOUT = 20  # 每个实体每跳最多扩展的关系数
+GRAPH_RAG_MAX_FRONTIER = 50  # 每跳最多继续扩展的实体数
+GRAPH_RAG_MAX_CANDIDATES = 100  # 参与向量打分的候选三元组上限
+GRAPH_RAG_TRIPLE_CACHE_SIZE = 20000  # 按三元组文本缓存的向量数量, 只为未缓存的候选三元组调用向量模型
+GRAPH_RAG_TOP_M = 30  # 最终返回的三元组数量
+GRAPH_RAG_SUPPORT_WEIGHT = 0.3  # 分块支持度在得分中的权重, 其余为与问题的向量相似度
+GRAPH_RAG_ENTITY_TOP_K = 10  # entity 模式下检索的种子实体数量
+GRAPH_ENTITY_EMBED_BATCH_SIZE = 256  # 构建实体向量索引时每批计算向量的实体数
+
+# 社区摘要配置(构建图谱后检测社区, 为每个社区生成摘要并计算向量, 供 global 检索模式使用)
+# 开启后每次建图对每个社区调用一次图谱抽取模型(最多 GRAPH_COMMUNITY_MAX_COMMUNITIES 次), 建图期间还需在内存中保留全部关系
+# 默认关闭, 需要 global 检索模式时再开启
+GRAPH_COMMUNITY_ENABLED = False
+GRAPH_COMMUNITY_MIN_SIZE = 3  # 实体数少于该值的社区不生成摘要
+GRAPH_COMMUNITY_MAX_COMMUNITIES = 50  # 生成摘要的社区数上限(保留实体最多的社区)
+GRAPH_COMMUNITY_MAX_TRIPLES = 50  # 每个社区交给大模型的关系数上限
+GRAPH_COMMUNITY_MAX_ITER = 20  # 标签传播最大迭代次数
+GRAPH_RAG_COMMUNITY_TOP_K = 3  # global 模式下检索的社区摘要数量
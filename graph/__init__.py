@@ -1 +1,7 @@
-from .builder import LLMGraphTransformer
\ No newline at end of file
+from .builder import LLMGraphTransformer
+from .concurrency import AdaptiveConcurrencyController, get_concurrency_controller
+from .pipeline import GraphBuildPipeline
+from .cache import get_graph_transformer, clear_graph_transformer_cache
+from .retrieval import (expand_from_seeds, aexpand_from_seeds, chunk_seeds, achunk_seeds, rank_triples,
+                        retrieve_graph_triples, aretrieve_graph_triples, triple_embedding_cache)
+from .community import GraphCollector, label_propagation, community_triples, summarize_communities
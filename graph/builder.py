@@ -1,6 +1,19 @@
 import asyncio
 import json
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union, cast
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
 from langchain_core.documents import Document
@@ -14,6 +27,8 @@ from langchain_core.prompts import (
 )
 from langchain_core.pydantic_v1 import BaseModel, Field, create_model
 
+from .concurrency import AdaptiveConcurrencyController
+
 examples = [
     {
         "text": (
@@ -375,9 +390,12 @@ def _parse_and_clean_json(
     if 'Items' in argument_json["relationships"]:
         argument_json["relationships"] = argument_json["relationships"]['Items']
     nodes = []
+    # id -> type index, the first node with a given id wins
+    node_types: Dict[Any, Any] = {}
     for node in argument_json["nodes"]:
         if not node.get("id"):  # Id is mandatory, skip this node
             continue
+        node_types.setdefault(node["id"], node.get("type"))
         nodes.append(
             Node(
                 id=node["id"],
@@ -396,23 +414,9 @@ def _parse_and_clean_json(
 
         # Node type copying if needed from node list
         if not rel.get("source_node_type"):
-            try:
-                rel["source_node_type"] = [
-                    el.get("type")
-                    for el in argument_json["nodes"]
-                    if el["id"] == rel["source_node_id"]
-                ][0]
-            except IndexError:
-                rel["source_node_type"] = None
+            rel["source_node_type"] = node_types.get(rel["source_node_id"])
         if not rel.get("target_node_type"):
-            try:
-                rel["target_node_type"] = [
-                    el.get("type")
-                    for el in argument_json["nodes"]
-                    if el["id"] == rel["target_node_id"]
-                ][0]
-            except IndexError:
-                rel["target_node_type"] = None
+            rel["target_node_type"] = node_types.get(rel["target_node_id"])
 
         source_node = Node(
             id=rel["source_node_id"],
@@ -520,6 +524,9 @@ class LLMGraphTransformer:
         strict_mode (bool, optional): Determines whether the transformer should apply
           filtering to strictly adhere to `allowed_nodes` and `allowed_relationships`.
           Defaults to True.
+        concurrency_controller (AdaptiveConcurrencyController, optional): AIMD
+          controller that bounds parallel LLM calls and retries rate-limited or
+          timed out calls. Defaults to a private controller for this transformer.
 
     Example:
         .. code-block:: python
@@ -544,11 +551,21 @@ class LLMGraphTransformer:
         prompt: Optional[ChatPromptTemplate] = None,
         strict_mode: bool = True,
         node_properties: Union[bool, List[str]] = False,
-        use_function_call: bool = True
+        use_function_call: bool = True,
+        concurrency_controller: Optional[AdaptiveConcurrencyController] = None,
     ) -> None:
+        self.llm = llm
         self.allowed_nodes = allowed_nodes
         self.allowed_relationships = allowed_relationships
         self.strict_mode = strict_mode
+        # Lowercased lookup sets for strict mode filtering
+        self._allowed_nodes_set = {el.lower() for el in allowed_nodes or []}
+        self._allowed_relationships_set = {
+            el.lower() for el in allowed_relationships or []
+        }
+        self.controller = concurrency_controller or AdaptiveConcurrencyController(
+            "graph_extraction"
+        )
         self._function_call = use_function_call
         # Check if the LLM really supports structured output
         try:
@@ -584,13 +601,37 @@ class LLMGraphTransformer:
             prompt = prompt or default_prompt
             self.chain = prompt | structured_llm
 
+    def _filter_strict(
+        self, nodes: List[Node], relationships: List[Relationship]
+    ) -> Tuple[List[Node], List[Relationship]]:
+        """Strict mode filtering against the allowed node and relationship types."""
+        if not self.strict_mode:
+            return nodes, relationships
+        if self._allowed_nodes_set:
+            allowed_nodes = self._allowed_nodes_set
+            nodes = [node for node in nodes if node.type.lower() in allowed_nodes]
+            relationships = [
+                rel
+                for rel in relationships
+                if rel.source.type.lower() in allowed_nodes
+                and rel.target.type.lower() in allowed_nodes
+            ]
+        if self._allowed_relationships_set:
+            allowed_relationships = self._allowed_relationships_set
+            relationships = [
+                rel
+                for rel in relationships
+                if rel.type.lower() in allowed_relationships
+            ]
+        return nodes, relationships
+
     def process_response(self, document: Document) -> GraphDocument:
         """
         Processes a single document, transforming it into a graph document using
         an LLM based on the model's schema and constraints.
         """
         text = document.page_content
-        raw_schema = self.chain.invoke({"input": text})
+        raw_schema = self.controller.call(self.chain.invoke, {"input": text})
         
         ###
         # print("The raw schema of the response is: ")
@@ -641,27 +682,7 @@ class LLMGraphTransformer:
             # Create nodes list
             nodes = [Node(id=el[0], type=el[1]) for el in list(nodes_set)]
 
-        # Strict mode filtering
-        if self.strict_mode and (self.allowed_nodes or self.allowed_relationships):
-            if self.allowed_nodes:
-                lower_allowed_nodes = [el.lower() for el in self.allowed_nodes]
-                nodes = [
-                    node for node in nodes if node.type.lower() in lower_allowed_nodes
-                ]
-                relationships = [
-                    rel
-                    for rel in relationships
-                    if rel.source.type.lower() in lower_allowed_nodes
-                    and rel.target.type.lower() in lower_allowed_nodes
-                ]
-            if self.allowed_relationships:
-                relationships = [
-                    rel
-                    for rel in relationships
-                    if rel.type.lower()
-                    in [el.lower() for el in self.allowed_relationships]
-                ]
-
+        nodes, relationships = self._filter_strict(nodes, relationships)
         return GraphDocument(nodes=nodes, relationships=relationships, source=document)
 
     def convert_to_graph_documents(
@@ -676,7 +697,47 @@ class LLMGraphTransformer:
         Returns:
             Sequence[GraphDocument]: The transformed documents as graphs.
         """
-        return [self.process_response(document) for document in documents]
+        # 线程池只提供上限，实际并行度由 AIMD 控制器动态决定
+        executor = ThreadPoolExecutor(max_workers=self.controller.max_limit)
+        try:
+            return list(executor.map(self.process_response, documents))
+        finally:
+            # 某个分块重试耗尽时，取消尚未开始的分块
+            executor.shutdown(cancel_futures=True)
+
+    def iter_graph_documents(
+        self, documents: Iterable[Document], max_pending: Optional[int] = None
+    ) -> Iterator[GraphDocument]:
+        """Lazily convert documents into graph documents in completion order.
+
+        At most `max_pending` documents are read ahead of the consumer, so memory
+        stays proportional to the window instead of the input size.
+
+        Args:
+            documents (Iterable[Document]): The original documents, may be a generator.
+            max_pending (int, optional): Maximum number of submitted but not yet
+              consumed documents. Defaults to twice the controller's max limit.
+
+        Yields:
+            GraphDocument: The transformed documents as graphs.
+        """
+        max_pending = max_pending or 2 * self.controller.max_limit
+        executor = ThreadPoolExecutor(max_workers=self.controller.max_limit)
+        pending = set()
+        try:
+            for document in documents:
+                pending.add(executor.submit(self.process_response, document))
+                if len(pending) < max_pending:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
 
     async def aprocess_response(self, document: Document) -> GraphDocument:
         """
@@ -688,26 +749,7 @@ class LLMGraphTransformer:
         raw_schema = cast(Dict[Any, Any], raw_schema)
         nodes, relationships = _convert_to_graph_document(raw_schema)
 
-        if self.strict_mode and (self.allowed_nodes or self.allowed_relationships):
-            if self.allowed_nodes:
-                lower_allowed_nodes = [el.lower() for el in self.allowed_nodes]
-                nodes = [
-                    node for node in nodes if node.type.lower() in lower_allowed_nodes
-                ]
-                relationships = [
-                    rel
-                    for rel in relationships
-                    if rel.source.type.lower() in lower_allowed_nodes
-                    and rel.target.type.lower() in lower_allowed_nodes
-                ]
-            if self.allowed_relationships:
-                relationships = [
-                    rel
-                    for rel in relationships
-                    if rel.type.lower()
-                    in [el.lower() for el in self.allowed_relationships]
-                ]
-
+        nodes, relationships = self._filter_strict(nodes, relationships)
         return GraphDocument(nodes=nodes, relationships=relationships, source=document)
 
     async def aconvert_to_graph_documents(
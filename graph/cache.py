@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+from config import GRAPH_TRANSFORMER_CACHE_SIZE
+from .builder import LLMGraphTransformer
+from .concurrency import get_concurrency_controller
+
+_transformers = OrderedDict()
+_transformers_lock = threading.Lock()
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return value
+
+
+def get_graph_transformer(model_name, allowed_nodes=None, allowed_relationships=None,
+                          strict_mode=False, node_properties=False) -> LLMGraphTransformer:
+    """
+    按抽取配置获取缓存的图谱转换器。
+
+    同一配置只创建一次聊天模型客户端、动态 schema、提示词和抽取链，
+    缓存按 LRU 淘汰，容量为 GRAPH_TRANSFORMER_CACHE_SIZE。
+    :param model_name: 图谱抽取模型名称
+    :param allowed_nodes: 允许的节点类型
+    :param allowed_relationships: 允许的关系类型
+    :param strict_mode: 严格模式
+    :param node_properties: 节点属性
+    :return: LLMGraphTransformer
+    """
+    key = (model_name, _freeze(allowed_nodes or ()), _freeze(allowed_relationships or ()),
+           bool(strict_mode), _freeze(node_properties))
+    with _transformers_lock:
+        transformer = _transformers.get(key)
+        if transformer is not None:
+            _transformers.move_to_end(key)
+            return transformer
+
+    from chat_openai import get_chat_openai
+    transformer = LLMGraphTransformer(
+        llm=get_chat_openai(model_name),
+        allowed_nodes=list(allowed_nodes or []),
+        allowed_relationships=list(allowed_relationships or []),
+        strict_mode=strict_mode,
+        node_properties=list(node_properties) if isinstance(node_properties, (list, tuple)) else node_properties,
+        concurrency_controller=get_concurrency_controller(model_name)
+    )
+
+    with _transformers_lock:
+        # 并发创建时保留先放入缓存的实例
+        transformer = _transformers.setdefault(key, transformer)
+        _transformers.move_to_end(key)
+        while len(_transformers) > GRAPH_TRANSFORMER_CACHE_SIZE:
+            _transformers.popitem(last=False)
+    return transformer
+
+
+def clear_graph_transformer_cache():
+    with _transformers_lock:
+        _transformers.clear()
@@ -0,0 +1,140 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from config import (GRAPH_COMMUNITY_MIN_SIZE, GRAPH_COMMUNITY_MAX_TRIPLES, GRAPH_COMMUNITY_MAX_ITER,
+                    GRAPH_COMMUNITY_MAX_COMMUNITIES)
+from prompts import COMMUNITY_SUMMARY_PROMPT
+
+
+class GraphCollector:
+    """
+    构建图谱时收集实体和关系(实体编号为整数)，用于建图后的实体索引和社区检测，
+    避免再从图存储中读回整个图。不做社区检测时 collect_edges 传 False，只收集实体。
+    """
+
+    def __init__(self, collect_edges=True):
+        self.entities = {}  # 实体 id -> 类型，插入顺序即编号
+        self._index = {}
+        self.collect_edges = collect_edges
+        self.edges = []  # (起点编号, 关系类型, 终点编号)
+
+    def _node(self, node):
+        i = self._index.get(node.id)
+        if i is None:
+            i = self._index[node.id] = len(self._index)
+            self.entities[node.id] = node.type
+        return i
+
+    def add(self, graph_document_list):
+        for graph_document in graph_document_list:
+            for node in graph_document.nodes:
+                self._node(node)
+            for rel in graph_document.relationships:
+                source, target = self._node(rel.source), self._node(rel.target)
+                if self.collect_edges:
+                    self.edges.append((source, rel.type, target))
+
+
+def label_propagation(n_nodes, edges, max_iter=GRAPH_COMMUNITY_MAX_ITER, seed=0):
+    """
+    标签传播社区检测(无向、不加权)，每轮用 numpy 按 (节点, 邻居标签) 统计票数。
+    每轮随机更新一半节点，避免同步更新时在二分结构上来回振荡；所有节点的当前标签都是票数最多的标签之一时停止。
+    :param n_nodes: 节点数
+    :param edges: [(起点编号, 终点编号)]
+    :return: 每个节点的社区编号(从 0 开始连续编号)
+    """
+    labels = np.arange(n_nodes, dtype=np.int64)
+    if n_nodes == 0 or not len(edges):
+        return labels
+    pairs = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    src = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    dst = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    rng = np.random.default_rng(seed)
+
+    for _ in range(max_iter):
+        # (节点, 邻居标签) 的票数，结果按节点、标签排序
+        keys, votes = np.unique(src * n_nodes + labels[dst], return_counts=True)
+        nodes, candidate = keys // n_nodes, keys % n_nodes
+        starts = np.flatnonzero(np.r_[True, nodes[1:] != nodes[:-1]])
+        repeats = np.diff(np.r_[starts, len(votes)])
+        # 每个节点取票数最多的标签，平票时由随机扰动决定
+        score = votes + rng.random(len(votes)) * 0.5
+        is_best = score == np.repeat(np.maximum.reduceat(score, starts), repeats)
+        best = np.full(n_nodes, -1, dtype=np.int64)
+        best[nodes[is_best]] = candidate[is_best]
+        # 当前标签已是票数最多的标签之一的节点保持不变
+        is_top = votes == np.repeat(np.maximum.reduceat(votes, starts), repeats)
+        stable = np.zeros(n_nodes, dtype=bool)
+        stable[nodes[is_top & (candidate == labels[nodes])]] = True
+
+        # 在全部节点上判断是否收敛，再随机选一半节点更新
+        pending = (best >= 0) & ~stable
+        if not pending.any():
+            break
+        changed = pending & (rng.random(n_nodes) < 0.5)
+        labels[changed] = best[changed]
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def community_triples(collector, labels, min_size=GRAPH_COMMUNITY_MIN_SIZE, max_triples=GRAPH_COMMUNITY_MAX_TRIPLES,
+                      max_communities=GRAPH_COMMUNITY_MAX_COMMUNITIES):
+    """
+    按社区分组关系，两端实体属于同一社区的关系归入该社区
+    :param max_communities: 最多保留的社区数(每个社区需要一次大模型调用)，保留实体最多的社区
+    :return: [{"id", "size", "entities", "triples"}]，按社区大小降序，只保留不少于 min_size 个实体的社区
+    """
+    entity_ids = list(collector.entities)
+    sizes = np.bincount(labels)
+    candidates = np.flatnonzero(sizes >= min_size)
+    kept = set(candidates[np.argsort(-sizes[candidates], kind="stable")[:max_communities]].tolist())
+    # 按社区排序后的实体编号，members[bounds[c]:bounds[c + 1]] 为社区 c 的实体
+    members = np.argsort(labels, kind="stable")
+    bounds = np.r_[0, np.cumsum(sizes)]
+    communities = {}
+    for source, rel_type, target in collector.edges:
+        community = int(labels[source])
+        if community != labels[target] or community not in kept:
+            continue
+        triples = communities.setdefault(community, [])
+        if len(triples) < max_triples:
+            triples.append(f"({entity_ids[source]})-[{rel_type}]->({entity_ids[target]})")
+
+    result = []
+    for community, triples in communities.items():
+        start = bounds[community]
+        result.append({
+            "id": community,
+            "size": int(sizes[community]),
+            "entities": [entity_ids[i] for i in members[start:min(start + 20, bounds[community + 1])]],
+            "triples": triples,
+        })
+    return sorted(result, key=lambda c: c["size"], reverse=True)
+
+
+def summarize_communities(llm, communities, controller=None, max_workers=4):
+    """
+    调用大模型为每个社区生成摘要，经由并发控制器限流与重试
+    :param llm: LangChain 聊天模型
+    :param controller: AdaptiveConcurrencyController，为空时直接调用
+    :return: 带 "summary" 字段的社区列表(生成失败的社区被跳过)
+    """
+    def summarize(community):
+        prompt = COMMUNITY_SUMMARY_PROMPT.format(triples="\n".join(community["triples"]))
+        try:
+            message = controller.call(llm.invoke, prompt) if controller else llm.invoke(prompt)
+        except Exception as e:
+            logging.error(f"社区 {community['id']} 摘要生成失败: {e}")
+            return None
+        return dict(community, summary=message.content.strip())
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        summarized = [c for c in executor.map(summarize, communities) if c is not None]
+    logging.info(f"社区摘要生成完成: {len(summarized)}/{len(communities)} 个, "
+                 f"耗时 {time.perf_counter() - start:.3f}s")
+    return summarized
@@ -0,0 +1,156 @@
+import logging
+import random
+import threading
+import time
+
+from config import (GRAPH_EXTRACT_INITIAL_CONCURRENCY, GRAPH_EXTRACT_MAX_CONCURRENCY,
+                    GRAPH_EXTRACT_MAX_RETRIES, GRAPH_EXTRACT_BACKOFF_BASE,
+                    GRAPH_EXTRACT_BACKOFF_MAX)
+from utils.metrics import metrics_registry
+
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    """判断异常是否为服务商限流(HTTP 429)，只按状态码和异常类型判断，不匹配异常消息"""
+    status_code = getattr(e, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(e, "response", None), "status_code", None)
+    if status_code == 429:
+        return True
+    return type(e).__name__ == "RateLimitError"
+
+
+def is_timeout_error(e: BaseException) -> bool:
+    """判断异常是否为请求超时"""
+    return isinstance(e, TimeoutError) or "Timeout" in type(e).__name__
+
+
+def is_retryable_error(e: BaseException) -> bool:
+    """限流、超时、连接错误和 5xx 错误可以重试，其余错误直接抛出"""
+    if is_rate_limit_error(e) or is_timeout_error(e):
+        return True
+    if isinstance(e, ConnectionError) or "Connection" in type(e).__name__:
+        return True
+    status_code = getattr(e, "status_code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD 自适应并发控制器。
+
+    调用成功时并发上限加性增长(每完成约 limit 次成功调用 +1)，
+    遇到限流或超时时乘性减半；线程通过 acquire/release 占用并发槽位。
+    """
+
+    def __init__(self, name, initial_limit=GRAPH_EXTRACT_INITIAL_CONCURRENCY,
+                 max_limit=GRAPH_EXTRACT_MAX_CONCURRENCY, min_limit=1, decrease_factor=0.5):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "calls": 0,
+            "successes": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "failures": 0,
+            "decreases": 0,
+        }
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+            self._stats["calls"] += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._stats["successes"] += 1
+            self._limit = min(self.max_limit, self._limit + 1.0 / max(self._limit, 1.0))
+            self._cond.notify_all()
+
+    def on_error(self, e: BaseException, will_retry: bool):
+        with self._cond:
+            if will_retry:
+                self._stats["retries"] += 1
+            else:
+                self._stats["failures"] += 1
+            overloaded = False
+            if is_rate_limit_error(e):
+                self._stats["rate_limited"] += 1
+                overloaded = True
+            elif is_timeout_error(e):
+                self._stats["timeouts"] += 1
+                overloaded = True
+            if overloaded:
+                self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+                self._stats["decreases"] += 1
+                logging.warning(f"[{self.name}] 触发限流/超时，并发上限降为 {self.limit}")
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {"concurrency": self.limit, "in_flight": self._in_flight,
+                    "max_concurrency": self.max_limit, **self._stats}
+
+    def call(self, fn, *args, max_retries=GRAPH_EXTRACT_MAX_RETRIES,
+             backoff_base=GRAPH_EXTRACT_BACKOFF_BASE, backoff_max=GRAPH_EXTRACT_BACKOFF_MAX, **kwargs):
+        """
+        在并发槽位内调用 fn，可重试错误按带抖动的指数退避重试
+        :param fn: 被调用的函数
+        :param max_retries: 最大重试次数
+        :param backoff_base: 退避基数(秒)
+        :param backoff_max: 单次退避上限(秒)
+        :return: fn 的返回值
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                will_retry = attempt < max_retries and is_retryable_error(e)
+                self.on_error(e, will_retry)
+                if not will_retry:
+                    raise
+            else:
+                self.on_success()
+                return result
+            finally:
+                self.release()
+
+            # full jitter: 在 [0, min(max, base * 2^n)] 内随机等待，避免重试同时涌向服务商
+            delay = random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+            attempt += 1
+            logging.warning(f"[{self.name}] 第 {attempt}/{max_retries} 次重试，等待 {delay:.2f}s")
+            time.sleep(delay)
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_concurrency_controller(name) -> AdaptiveConcurrencyController:
+    """
+    按名称(通常为图谱抽取模型名称)获取进程内共享的并发控制器，并注册到指标
+    """
+    with _controllers_lock:
+        controller = _controllers.get(name)
+        if controller is None:
+            controller = AdaptiveConcurrencyController(name)
+            _controllers[name] = controller
+            metrics_registry.register(f"graph_extraction.{name}", controller.metrics)
+        return controller
@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List
+
+from langchain_community.graphs.graph_document import GraphDocument
+from langchain_core.documents import Document
+
+from config import GRAPH_WRITE_BATCH_SIZE, GRAPH_PIPELINE_QUEUE_SIZE
+from .builder import LLMGraphTransformer
+
+_SENTINEL = object()
+
+
+class GraphBuildPipeline:
+    """
+    流式图谱构建流水线: 读取分块 -> LLM抽取 -> 批量写入。
+
+    三个阶段通过有界队列衔接，抽取后面的分块时前面的结果已在写入数据库，
+    内存占用只与队列深度成正比，与知识库大小无关。
+    """
+
+    def __init__(self, transformer: LLMGraphTransformer,
+                 write_fn: Callable[[List[GraphDocument]], None],
+                 batch_size=GRAPH_WRITE_BATCH_SIZE, queue_size=GRAPH_PIPELINE_QUEUE_SIZE):
+        """
+        :param transformer: 图谱抽取器
+        :param write_fn: 写入一批图文档的回调
+        :param batch_size: 每批写入的图文档数量
+        :param queue_size: 抽取结果队列深度，同时也是抽取阶段的预读窗口
+        """
+        self.transformer = transformer
+        self.write_fn = write_fn
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writer_error = None
+        self.stats = {
+            "chunks": 0,
+            "graph_documents": 0,
+            "nodes": 0,
+            "relationships": 0,
+            "batches": 0,
+            "write_seconds": 0.0,
+            "elapsed_seconds": 0.0,
+        }
+
+    def _write_batch(self, batch):
+        start = time.perf_counter()
+        self.write_fn(batch)
+        self.stats["write_seconds"] += time.perf_counter() - start
+        self.stats["batches"] += 1
+        logging.info(f"已写入第 {self.stats['batches']} 批图文档, 共 {len(batch)} 个")
+
+    def _writer(self):
+        batch = []
+        while True:
+            item = self._queue.get()
+            if item is _SENTINEL:
+                break
+            if self._writer_error is not None:
+                # 写入已失败，继续消费队列避免抽取阶段阻塞
+                continue
+            batch.append(item)
+            if len(batch) < self.batch_size:
+                continue
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self._writer_error = e
+            batch = []
+        if batch and self._writer_error is None:
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self._writer_error = e
+
+    def run(self, documents: Iterable[Document]) -> dict:
+        """
+        运行流水线
+        :param documents: 分块文档，可以是惰性生成器
+        :return: 统计信息
+        """
+        start = time.perf_counter()
+        writer = threading.Thread(target=self._writer, name="graph-writer", daemon=True)
+        writer.start()
+
+        def counted(docs):
+            for doc in docs:
+                self.stats["chunks"] += 1
+                yield doc
+
+        try:
+            for graph_document in self.transformer.iter_graph_documents(counted(documents),
+                                                                        max_pending=self.queue_size):
+                if self._writer_error is not None:
+                    break
+                if not graph_document.nodes and not graph_document.relationships:
+                    continue
+                self.stats["graph_documents"] += 1
+                self.stats["nodes"] += len(graph_document.nodes)
+                self.stats["relationships"] += len(graph_document.relationships)
+                self._queue.put(graph_document)
+        finally:
+            self._queue.put(_SENTINEL)
+            writer.join()
+
+        if self._writer_error is not None:
+            raise self._writer_error
+
+        self.stats["elapsed_seconds"] = time.perf_counter() - start
+        logging.info(f"图谱构建流水线完成: {self.stats}")
+        return self.stats
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (GRAPH_RAG_HOPS, GRAPH_RAG_FANOUT, GRAPH_RAG_MAX_FRONTIER, GRAPH_RAG_MAX_CANDIDATES,
+                    GRAPH_RAG_TOP_M, GRAPH_RAG_SUPPORT_WEIGHT, GRAPH_RAG_TRIPLE_CACHE_SIZE)
+from utils.metrics import metrics_registry
+
+# 非种子实体继承来源实体支持度时每跳的衰减系数
+HOP_DECAY = 0.5
+
+
+def triple_text(triple):
+    return f"{triple['source']} {triple['rel_type']} {triple['target']}"
+
+
+class TripleEmbeddingCache:
+    """
+    按三元组文本缓存向量(LRU)，热门实体附近的三元组在多次查询间复用，只为未见过的三元组调用向量模型
+    """
+
+    def __init__(self, max_size=GRAPH_RAG_TRIPLE_CACHE_SIZE):
+        self.max_size = max_size
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, embeddings, texts):
+        """
+        :param embeddings: 向量模型，需提供 embed_documents
+        :return: 与 texts 对应的向量矩阵(float32)
+        """
+        vectors = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                vector = self._vectors.get(text)
+                if vector is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    self._vectors.move_to_end(text)
+                    vectors[i] = vector
+            self.hits += len(texts) - sum(len(rows) for rows in missing.values())
+            self.misses += len(missing)
+        if missing:
+            computed = np.asarray(embeddings.embed_documents(list(missing)), dtype=np.float32)
+            with self._lock:
+                for (text, rows), vector in zip(missing.items(), computed):
+                    for i in rows:
+                        vectors[i] = vector
+                    if self.max_size > 0:
+                        self._vectors[text] = vector
+                        self._vectors.move_to_end(text)
+                while len(self._vectors) > self.max_size:
+                    self._vectors.popitem(last=False)
+        return np.stack(vectors)
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+
+    def metrics(self):
+        return {"entries": len(self._vectors), "hits": self.hits, "misses": self.misses}
+
+
+triple_embedding_cache = TripleEmbeddingCache()
+metrics_registry.register("graph_triple_embeddings", triple_embedding_cache.metrics)
+
+
+def expand_from_seeds(worker, seeds, hops=GRAPH_RAG_HOPS, fanout=GRAPH_RAG_FANOUT,
+                      max_frontier=GRAPH_RAG_MAX_FRONTIER, kb_uuid=None):
+    """
+    从种子实体出发做多跳扩展。
+
+    每个实体每跳最多取 fanout 条关系，每跳最多扩展 max_frontier 个实体(按支持度优先)，
+    查询量只取决于这几个参数，与超级节点的实际度数无关。
+    :param worker: 图存储后端(GraphBackend)
+    :param seeds: 种子实体及其支持度 {实体 id: 支持度}
+    :param kb_uuid: 知识库 UUID
+    :return: (三元组列表, 实体支持度 {实体 id: 支持度})
+    """
+    support = {entity_id: float(value) for entity_id, value in seeds.items()}
+    frontier = sorted(support, key=support.get, reverse=True)[:max_frontier]
+    triples = {}
+    for hop in range(1, hops + 1):
+        if not frontier:
+            break
+        rows = worker.expand_entities(frontier, fanout, kb_uuid=kb_uuid)
+        frontier = merge_hop(rows, hop, triples, support, max_frontier)
+    return list(triples.values()), support
+
+
+async def aexpand_from_seeds(worker, seeds, hops=GRAPH_RAG_HOPS, fanout=GRAPH_RAG_FANOUT,
+                             max_frontier=GRAPH_RAG_MAX_FRONTIER, kb_uuid=None):
+    """expand_from_seeds 的异步版本，每跳的查询通过后端的异步接口执行"""
+    support = {entity_id: float(value) for entity_id, value in seeds.items()}
+    frontier = sorted(support, key=support.get, reverse=True)[:max_frontier]
+    triples = {}
+    for hop in range(1, hops + 1):
+        if not frontier:
+            break
+        rows = await worker.aexpand_entities(frontier, fanout, kb_uuid=kb_uuid)
+        frontier = merge_hop(rows, hop, triples, support, max_frontier)
+    return list(triples.values()), support
+
+
+def merge_hop(rows, hop, triples, support, max_frontier):
+    """
+    合并一跳扩展的结果，新实体继承来源实体衰减后的支持度
+    :return: 下一跳要扩展的实体
+    """
+    discovered = {}
+    for row in rows:
+        key = (row["source"], row["rel_type"], row["target"])
+        if key not in triples:
+            triples[key] = {
+                "source": row["source"],
+                "source_labels": row["source_labels"],
+                "target": row["target"],
+                "target_labels": row["target_labels"],
+                "rel_type": row["rel_type"],
+                "hop": hop,
+            }
+        neighbor = row["neighbor"]
+        if neighbor not in support:
+            inherited = support[row["from_id"]] * HOP_DECAY
+            discovered[neighbor] = max(discovered.get(neighbor, 0.0), inherited)
+    support.update(discovered)
+    return sorted(discovered, key=discovered.get, reverse=True)[:max_frontier]
+
+
+def rank_triples(triples, support, query_embedding, embeddings, n_chunks, top_m=GRAPH_RAG_TOP_M,
+                 max_candidates=GRAPH_RAG_MAX_CANDIDATES, support_weight=GRAPH_RAG_SUPPORT_WEIGHT):
+    """
+    按 与问题的向量相似度 和 分块支持度 加权打分，返回得分最高的 top_m 个三元组。
+    先按(跳数, 支持度)预筛出 max_candidates 个候选，候选的向量按三元组文本缓存，只为未缓存的三元组计算向量。
+    :param embeddings: 向量模型，需提供 embed_documents
+    :param n_chunks: 支持度的归一化系数(按分块取种子时为分块数)
+    """
+    for triple in triples:
+        triple["support"] = max(support.get(triple["source"], 0.0), support.get(triple["target"], 0.0))
+    candidates = sorted(triples, key=lambda t: (t["hop"], -t["support"]))[:max_candidates]
+    if not candidates:
+        return []
+
+    vectors = triple_embedding_cache.embed(embeddings, [triple_text(t) for t in candidates])
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+    similarities = vectors @ query / np.where(norms == 0, 1.0, norms)
+
+    for triple, similarity in zip(candidates, similarities):
+        support_score = min(triple["support"] / max(n_chunks, 1), 1.0)
+        triple["score"] = float((1 - support_weight) * similarity + support_weight * support_score)
+    return sorted(candidates, key=lambda t: t["score"], reverse=True)[:top_m]
+
+
+def chunk_seeds(worker, id_list, kb_uuid=None):
+    """分块关联的实体作为种子，支持度为提及该实体的分块数"""
+    return {row["id"]: row["support"] for row in worker.get_seed_entities(id_list, kb_uuid=kb_uuid)}
+
+
+async def achunk_seeds(worker, id_list, kb_uuid=None):
+    rows = await worker.aget_seed_entities(id_list, kb_uuid=kb_uuid)
+    return {row["id"]: row["support"] for row in rows}
+
+
+def retrieve_graph_triples(worker, embeddings, user_query, seeds, n_chunks=1, query_embedding=None,
+                           hops=GRAPH_RAG_HOPS, fanout=GRAPH_RAG_FANOUT, top_m=GRAPH_RAG_TOP_M, kb_uuid=None):
+    """
+    从种子实体多跳扩展并排序，返回与 get_graph_info 相同结构的三元组(额外包含 hop、support、score)
+    :param seeds: 种子实体及其支持度 {实体 id: 支持度}
+    :param n_chunks: 支持度的归一化系数
+    :param query_embedding: 已计算好的问题向量，为空时现算
+    """
+    start = time.perf_counter()
+    triples, support = expand_from_seeds(worker, seeds, hops=hops, fanout=fanout, kb_uuid=kb_uuid)
+    if query_embedding is None:
+        query_embedding = embeddings.embed_query(user_query)
+    ranked = rank_triples(triples, support, query_embedding, embeddings, n_chunks, top_m=top_m)
+    logging.info(f"GraphRAG 扩展: 种子实体 {len(seeds)} 个, 候选三元组 {len(triples)} 个, "
+                 f"返回 {len(ranked)} 个, 耗时 {time.perf_counter() - start:.3f}s")
+    return ranked
+
+
+async def aretrieve_graph_triples(worker, embeddings, user_query, seeds, n_chunks=1, query_embedding=None,
+                                  hops=GRAPH_RAG_HOPS, fanout=GRAPH_RAG_FANOUT, top_m=GRAPH_RAG_TOP_M,
+                                  kb_uuid=None):
+    """
+    retrieve_graph_triples 的异步版本: 数据库查询不阻塞事件循环，向量计算放到线程池中执行
+    """
+    start = time.perf_counter()
+    triples, support = await aexpand_from_seeds(worker, seeds, hops=hops, fanout=fanout, kb_uuid=kb_uuid)
+    if query_embedding is None:
+        query_embedding = await asyncio.to_thread(embeddings.embed_query, user_query)
+    ranked = await asyncio.to_thread(rank_triples, triples, support, query_embedding, embeddings, n_chunks,
+                                     top_m=top_m)
+    logging.info(f"GraphRAG 扩展: 种子实体 {len(seeds)} 个, 候选三元组 {len(triples)} 个, "
+                 f"返回 {len(ranked)} 个, 耗时 {time.perf_counter() - start:.3f}s")
+    return ranked
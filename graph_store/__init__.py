@@ -0,0 +1,28 @@
+import threading
+
+from config import GRAPH_BACKEND
+from utils import metrics_registry
+from .base import GraphBackend
+from .embedded import EmbeddedGraphBackend, KBGraph
+
+_embedded_backend = None
+_embedded_lock = threading.Lock()
+
+
+def get_graph_backend() -> GraphBackend:
+    """
+    按 GRAPH_BACKEND 配置获取进程内共享的图存储后端
+    neo4j: Neo4jWorker; embedded: EmbeddedGraphBackend
+    """
+    global _embedded_backend
+    if GRAPH_BACKEND == "neo4j":
+        from neo4j_worker import get_neo4j_worker
+        return get_neo4j_worker()
+    elif GRAPH_BACKEND == "embedded":
+        with _embedded_lock:
+            if _embedded_backend is None:
+                _embedded_backend = EmbeddedGraphBackend()
+                metrics_registry.register("graph_store", _embedded_backend.metrics)
+            return _embedded_backend
+    else:
+        raise Exception(f"不支持的图存储后端: {GRAPH_BACKEND}")
@@ -0,0 +1,61 @@
+from abc import ABC, abstractmethod
+
+
+class GraphBackend(ABC):
+    """
+    图存储后端接口。
+    知识库构建和 GraphRAG 检索只依赖这些方法，具体实现可以是 Neo4j 或进程内的嵌入式存储。
+    """
+
+    @abstractmethod
+    def save_graph_documents(self, graph_document_list):
+        """写入一批图文档，Document 的 metadata 中需包含 id 和 kb_uuid"""
+        pass
+
+    def flush(self, kb_uuid):
+        """知识库图文档全部写入后调用，需要落盘的后端在这里持久化"""
+        pass
+
+    @abstractmethod
+    def delete_by_uuid(self, kb_uuid):
+        """删除知识库的图谱"""
+        pass
+
+    @abstractmethod
+    def get_graph_info(self, vec_list, kb_uuid=None):
+        """
+        :param vec_list: 向量检索结果 [(分块 id, 文本, 相似度)]
+        :return: 分块关联实体的一跳出边 [{"source", "source_labels", "target", "target_labels", "rel_type"}]
+        """
+        pass
+
+    @abstractmethod
+    def get_seed_entities(self, id_list, kb_uuid=None):
+        """
+        :return: [{"id": 实体 id, "support": 提及该实体的分块数}]
+        """
+        pass
+
+    @abstractmethod
+    def expand_entities(self, ids, fanout, kb_uuid=None):
+        """
+        从实体向外扩展一跳(不区分方向)，每个实体最多返回 fanout 条关系
+        :return: [{"from_id", "neighbor", "source", "source_labels", "target", "target_labels", "rel_type"}]
+        """
+        pass
+
+    # 请求路径上的异步读取，默认直接调用同步实现(适用于进程内存储)，访问远程数据库的后端应覆盖
+    async def aget_graph_info(self, vec_list, kb_uuid=None):
+        return self.get_graph_info(vec_list, kb_uuid=kb_uuid)
+
+    async def aget_seed_entities(self, id_list, kb_uuid=None):
+        return self.get_seed_entities(id_list, kb_uuid=kb_uuid)
+
+    async def aexpand_entities(self, ids, fanout, kb_uuid=None):
+        return self.expand_entities(ids, fanout, kb_uuid=kb_uuid)
+
+    def health_check(self):
+        return {"ok": True, "latency_ms": 0.0, "error": None}
+
+    def close(self):
+        pass
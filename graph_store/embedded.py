@@ -0,0 +1,283 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from config import GRAPH_STORE_PATH
+from .base import GraphBackend
+
+# 抽取结果没有类型时使用的节点标签
+DEFAULT_NODE_LABEL = "Entity"
+# metadata 中没有 kb_uuid 时归入的知识库
+DEFAULT_KB = "default"
+
+# 每个知识库目录下的数组文件
+ARRAY_FILES = ("indptr", "indices", "edge_types", "edge_out", "doc_indptr", "doc_entities")
+
+
+def format_rel_type(rel_type):
+    return rel_type.replace(" ", "_").upper()
+
+
+def csr(rows, n_rows, *columns):
+    """
+    按行号构建 CSR
+    :param rows: 每条记录的行号
+    :param columns: 与 rows 等长的各列数据
+    :return: (indptr, 按行排序后的各列)
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return (indptr,) + tuple(np.asarray(column)[order] for column in columns)
+
+
+class KBGraph:
+    """
+    单个知识库的只读图，邻接表以 CSR 数组保存并以内存映射方式加载。
+
+    indptr/indices/edge_types/edge_out: 实体的邻接表，每条关系在起点和终点各存一份，edge_out 标记是否为出边
+    doc_indptr/doc_entities: 分块提及的实体
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.node_ids = meta["node_ids"]
+        self.node_labels = meta["node_labels"]
+        self.rel_types = meta["rel_types"]
+        self.doc_ids = meta["doc_ids"]
+        self.node_index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.doc_index = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        for name in ARRAY_FILES:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+
+    def entities_of(self, doc_id):
+        i = self.doc_index.get(doc_id)
+        if i is None:
+            # 没有抽取出实体的分块不在图中，返回与 doc_entities 同类型的空数组
+            return np.empty(0, dtype=self.doc_entities.dtype)
+        return self.doc_entities[self.doc_indptr[i]:self.doc_indptr[i + 1]]
+
+    def triple(self, node, neighbor, rel_type, out):
+        source, target = (node, neighbor) if out else (neighbor, node)
+        return {
+            "source": self.node_ids[source],
+            "source_labels": self.node_labels[source],
+            "target": self.node_ids[target],
+            "target_labels": self.node_labels[target],
+            "rel_type": self.rel_types[rel_type],
+        }
+
+    def neighbors(self, node, limit=None):
+        start, end = int(self.indptr[node]), int(self.indptr[node + 1])
+        if limit is not None:
+            end = min(end, start + limit)
+        return zip(self.indices[start:end].tolist(), self.edge_types[start:end].tolist(),
+                   self.edge_out[start:end].tolist())
+
+    def to_builder(self):
+        builder = GraphBuilder()
+        for node_id, labels in zip(self.node_ids, self.node_labels):
+            builder.nodes[node_id] = list(labels)
+        for node in range(len(self.node_ids)):
+            for neighbor, rel_type, out in self.neighbors(node):
+                if out:
+                    builder.edges[(self.node_ids[node], self.rel_types[rel_type], self.node_ids[neighbor])] = None
+        for doc_id in self.doc_ids:
+            builder.mentions[doc_id] = {self.node_ids[node]: None for node in self.entities_of(doc_id).tolist()}
+        return builder
+
+
+class GraphBuilder:
+    """构建中的知识库图(可变的字典结构)，flush 时转换为 CSR 落盘"""
+
+    def __init__(self):
+        self.nodes = {}  # 实体 id -> 标签列表
+        self.edges = {}  # (起点 id, 关系类型, 终点 id) -> None，保持插入顺序去重
+        self.mentions = defaultdict(dict)  # 分块 id -> {实体 id: None}
+
+    def add_node(self, node):
+        labels = self.nodes.setdefault(node.id, [])
+        label = node.type or DEFAULT_NODE_LABEL
+        if label not in labels:
+            labels.append(label)
+
+    def add(self, graph_document):
+        doc_id = graph_document.source.metadata.get("id")
+        for node in graph_document.nodes:
+            self.add_node(node)
+            if doc_id is not None:
+                self.mentions[doc_id][node.id] = None
+        for rel in graph_document.relationships:
+            self.add_node(rel.source)
+            self.add_node(rel.target)
+            self.edges[(rel.source.id, format_rel_type(rel.type), rel.target.id)] = None
+
+    def save(self, path):
+        node_ids = list(self.nodes)
+        node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        rel_types = sorted({rel_type for _, rel_type, _ in self.edges})
+        rel_index = {rel_type: i for i, rel_type in enumerate(rel_types)}
+        doc_ids = list(self.mentions)
+
+        edges = np.array([(node_index[s], rel_index[r], node_index[t]) for s, r, t in self.edges],
+                         dtype=np.int64).reshape(-1, 3)
+        sources, types, targets = edges[:, 0], edges[:, 1], edges[:, 2]
+        # 每条关系在起点存一份出边、在终点存一份入边，扩展时不区分方向
+        indptr, indices, edge_types, edge_out = csr(
+            np.concatenate([sources, targets]), len(node_ids),
+            np.concatenate([targets, sources]).astype(np.int32),
+            np.concatenate([types, types]).astype(np.int32),
+            np.concatenate([np.ones(len(edges), dtype=bool), np.zeros(len(edges), dtype=bool)]),
+        )
+        mention_rows = [(i, node_index[node_id]) for i, doc_id in enumerate(doc_ids)
+                        for node_id in self.mentions[doc_id]]
+        mentions = np.array(mention_rows, dtype=np.int64).reshape(-1, 2)
+        doc_indptr, doc_entities = csr(mentions[:, 0], len(doc_ids), mentions[:, 1].astype(np.int32))
+
+        # 先写入临时目录再替换，读取方不会看到写了一半的文件
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        arrays = {"indptr": indptr, "indices": indices, "edge_types": edge_types, "edge_out": edge_out,
+                  "doc_indptr": doc_indptr, "doc_entities": doc_entities}
+        for name in ARRAY_FILES:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"node_ids": node_ids, "node_labels": [self.nodes[node_id] for node_id in node_ids],
+                       "rel_types": rel_types, "doc_ids": doc_ids}, f, ensure_ascii=False)
+        # 旧目录先改名移开再替换，替换后再删除；旧文件可能仍被映射(Windows 上无法删除)，删除失败留到下次写入时清理
+        old_path = path + ".old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        shutil.rmtree(old_path, onerror=lambda func, target, exc_info: logging.warning(
+            f"删除旧图谱文件失败 {target}: {exc_info[1]}"))
+        return {"nodes": len(node_ids), "relationships": len(edges), "documents": len(doc_ids)}
+
+
+class EmbeddedGraphBackend(GraphBackend):
+    """
+    进程内的嵌入式图存储，适合单机部署和离线测试。
+
+    每个知识库一个目录(GRAPH_STORE_PATH/<kb_uuid>)，写入时先在内存中累积，
+    flush 时转换为 CSR 数组落盘；读取时内存映射加载并缓存，GraphRAG 查询只做数组切片。
+    只保存实体标签和关系类型，不保存节点和关系的属性。
+    """
+
+    def __init__(self, base_path=GRAPH_STORE_PATH):
+        self.base_path = base_path
+        os.makedirs(base_path, exist_ok=True)
+        self._builders = {}  # kb_uuid -> GraphBuilder
+        self._graphs = {}  # kb_uuid -> (meta.json 修改时间, KBGraph)
+        self._lock = threading.Lock()
+
+    def kb_path(self, kb_uuid):
+        return os.path.join(self.base_path, kb_uuid)
+
+    def load(self, kb_uuid):
+        """加载知识库图，按 meta.json 的修改时间缓存；知识库没有图谱时返回 None"""
+        meta_path = os.path.join(self.kb_path(kb_uuid), "meta.json")
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._graphs.get(kb_uuid)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        graph = KBGraph(self.kb_path(kb_uuid))
+        with self._lock:
+            self._graphs[kb_uuid] = (mtime, graph)
+        return graph
+
+    def save_graph_documents(self, graph_document_list):
+        with self._lock:
+            for graph_document in graph_document_list:
+                kb_uuid = graph_document.source.metadata.get("kb_uuid") or DEFAULT_KB
+                builder = self._builders.get(kb_uuid)
+                if builder is None:
+                    # 已有图谱时在其基础上追加
+                    graph = self._load_unlocked(kb_uuid)
+                    builder = graph.to_builder() if graph else GraphBuilder()
+                    self._builders[kb_uuid] = builder
+                builder.add(graph_document)
+
+    def _load_unlocked(self, kb_uuid):
+        if not os.path.exists(os.path.join(self.kb_path(kb_uuid), "meta.json")):
+            return None
+        return KBGraph(self.kb_path(kb_uuid))
+
+    def flush(self, kb_uuid):
+        with self._lock:
+            builder = self._builders.pop(kb_uuid, None)
+            if builder is None:
+                return
+            # 先释放缓存的旧图(内存映射)，再替换目录
+            self._graphs.pop(kb_uuid, None)
+            stats = builder.save(self.kb_path(kb_uuid))
+        logging.info(f"知识库 {kb_uuid} 的图谱已写入嵌入式存储: {stats}")
+
+    def delete_by_uuid(self, kb_uuid):
+        with self._lock:
+            self._builders.pop(kb_uuid, None)
+            self._graphs.pop(kb_uuid, None)
+            # 先改名移开，查询不会读到删了一半的目录；删除失败时抛出异常，由调用方重试
+            path = self.kb_path(kb_uuid)
+            if os.path.exists(path):
+                os.replace(path, path + ".old")
+            if os.path.exists(path + ".old"):
+                shutil.rmtree(path + ".old")
+        logging.info(f"已删除知识库 {kb_uuid} 的图谱")
+
+    def _graphs_for(self, kb_uuid):
+        if kb_uuid is not None:
+            graph = self.load(kb_uuid)
+            return [graph] if graph else []
+        kb_uuids = [name for name in os.listdir(self.base_path) if not name.endswith((".tmp", ".old"))]
+        return [graph for graph in map(self.load, kb_uuids) if graph]
+
+    def get_graph_info(self, vec_list, kb_uuid=None):
+        id_list = [vec[0] for vec in vec_list]
+        relations = {}
+        for graph in self._graphs_for(kb_uuid):
+            nodes = {node for doc_id in id_list for node in graph.entities_of(doc_id).tolist()}
+            for node in nodes:
+                for neighbor, rel_type, out in graph.neighbors(node):
+                    if out:
+                        triple = graph.triple(node, neighbor, rel_type, out)
+                        relations[(triple["source"], triple["rel_type"], triple["target"])] = triple
+        return list(relations.values())
+
+    def get_seed_entities(self, id_list, kb_uuid=None):
+        support = defaultdict(int)
+        for graph in self._graphs_for(kb_uuid):
+            for doc_id in id_list:
+                for node in graph.entities_of(doc_id).tolist():
+                    support[graph.node_ids[node]] += 1
+        return [{"id": node_id, "support": count} for node_id, count in support.items()]
+
+    def expand_entities(self, ids, fanout, kb_uuid=None):
+        rows = []
+        for graph in self._graphs_for(kb_uuid):
+            for node_id in ids:
+                node = graph.node_index.get(node_id)
+                if node is None:
+                    continue
+                for neighbor, rel_type, out in graph.neighbors(node, limit=fanout):
+                    row = graph.triple(node, neighbor, rel_type, out)
+                    row["from_id"] = node_id
+                    row["neighbor"] = graph.node_ids[neighbor]
+                    rows.append(row)
+        return rows
+
+    def metrics(self):
+        with self._lock:
+            return {"loaded_kbs": len(self._graphs), "building_kbs": len(self._builders)}
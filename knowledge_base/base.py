@@ -2,14 +2,24 @@ import os
 import uuid
 import json
 import shutil
-from text_to_vec import DocumentProcessor
+import threading
+import asyncio
+from text_to_vec import DocumentProcessor, VectorIndex, load_vector_index
 from utils import *
 import os
-from graph import LLMGraphTransformer
-from neo4j_worker import Neo4jWorker
+from graph import (GraphBuildPipeline, get_graph_transformer, chunk_seeds, achunk_seeds, retrieve_graph_triples,
+                   aretrieve_graph_triples, GraphCollector, label_propagation, community_triples,
+                   summarize_communities)
+from embedding_models import embedding_loader
+from semantic_cache import invalidate_semantic_cache
+from graph_store import get_graph_backend
 
 os.environ['NUMEXPR_MAX_THREADS'] = str(NUMEXPR_MAX_THREADS)
 
+# 正在后台删除图谱的知识库: kb_uuid -> 删除线程
+_graph_deletions = {}
+_graph_deletions_lock = threading.Lock()
+
 
 class KnowledgeBase:
     def __init__(self):
@@ -25,13 +35,31 @@ class KnowledgeBase:
             with open(self.metadata_file, 'r') as f:
                 self.kb_metadata = json.load(f)
 
-    def get_vec_metadata(self, kb_uuid):
+    def get_vecs_path(self, kb_uuid):
         kb_info = self.kb_metadata.get(kb_uuid)
         if not kb_info:
             return None
         vecs_path = os.path.join(VEC_BASE_PATH, kb_info['kb_dir'], 'vecs', 'vecs.json')
         if not os.path.exists(vecs_path):
             return None
+        return vecs_path
+
+    def get_entity_index_path(self, kb_uuid):
+        kb_info = self.kb_metadata.get(kb_uuid)
+        if not kb_info:
+            return None
+        return os.path.join(VEC_BASE_PATH, kb_info['kb_dir'], 'vecs', 'entities')
+
+    def get_community_index_path(self, kb_uuid):
+        kb_info = self.kb_metadata.get(kb_uuid)
+        if not kb_info:
+            return None
+        return os.path.join(VEC_BASE_PATH, kb_info['kb_dir'], 'vecs', 'communities')
+
+    def get_vec_metadata(self, kb_uuid):
+        vecs_path = self.get_vecs_path(kb_uuid)
+        if not vecs_path:
+            return None
         with open(vecs_path, 'r') as f:
             vec_metadata = json.load(f)
         return vec_metadata
@@ -122,6 +150,7 @@ class KnowledgeBase:
             kb_info['desc'] = item['desc']
             kb_info['vec'] = item['vec']
             kb_info['graph'] = item['graph']
+            kb_info['graph_deleting'] = self.is_graph_deleting(kb_uuid)
             kb_info['files'] = [{'file_uuid': file_uuid, 'filename': file_info['filename']} for file_uuid, file_info in item['files'].items()]
             kb_info_list.append(kb_info)
         return kb_info_list
@@ -136,6 +165,7 @@ class KnowledgeBase:
         shutil.rmtree(kb_dir_path)
         del self.kb_metadata[kb_uuid]
         self.save_kb_metadata()
+        invalidate_semantic_cache(kb_uuid)
 
     def init_vec(self, kb_uuid):
         kb_info = self.kb_metadata.get(kb_uuid)
@@ -152,6 +182,7 @@ class KnowledgeBase:
 
         self.kb_metadata[kb_uuid]['vec'] = False
         self.save_kb_metadata()
+        invalidate_semantic_cache(kb_uuid)
 
         logging.info(f"Vector library initialized for {kb_uuid}")
 
@@ -159,14 +190,63 @@ class KnowledgeBase:
         if not self.kb_metadata[kb_uuid]['graph']:
             return
 
-        worker = Neo4jWorker()
-        worker.delete_by_uuid(kb_uuid)
-
+        # 先标记为无图谱，图数据在后台分批删除，不阻塞请求；
+        # graph_deleting 持久化到元数据中，删除成功后才清除，失败或进程退出时可以重试
         self.kb_metadata[kb_uuid]['graph'] = False
+        self.kb_metadata[kb_uuid]['graph_deleting'] = True
         self.save_kb_metadata()
+        VectorIndex.remove(self.get_entity_index_path(kb_uuid))
+        VectorIndex.remove(self.get_community_index_path(kb_uuid))
+        self.delete_graph_in_background(kb_uuid)
+        invalidate_semantic_cache(kb_uuid)
 
         logging.info(f"Graph library initialized for {kb_uuid}")
 
+    def delete_graph(self, kb_uuid):
+        """删除知识库的图数据，成功后清除 graph_deleting 标记，失败时抛出异常并保留标记"""
+        get_graph_backend().delete_by_uuid(kb_uuid)
+        kb_info = self.kb_metadata.get(kb_uuid)
+        if kb_info is not None and kb_info.pop('graph_deleting', None):
+            self.save_kb_metadata()
+
+    def resume_graph_deletions(self):
+        """服务启动时重试上次未完成(失败或进程退出)的图谱删除"""
+        for kb_uuid, kb_info in list(self.kb_metadata.items()):
+            if kb_info.get('graph_deleting'):
+                logging.info(f"重试删除知识库 {kb_uuid} 的图谱")
+                self.delete_graph_in_background(kb_uuid)
+
+    def delete_graph_in_background(self, kb_uuid):
+        def work():
+            try:
+                self.delete_graph(kb_uuid)
+            except Exception as e:
+                logging.error(f"删除知识库 {kb_uuid} 的图谱失败，将在下次启动或重新构建图谱时重试: {e}")
+            finally:
+                with _graph_deletions_lock:
+                    _graph_deletions.pop(kb_uuid, None)
+
+        with _graph_deletions_lock:
+            if kb_uuid in _graph_deletions:
+                return
+            thread = threading.Thread(target=work, name=f"graph-delete-{kb_uuid}", daemon=True)
+            _graph_deletions[kb_uuid] = thread
+            thread.start()
+
+    def is_graph_deleting(self, kb_uuid):
+        with _graph_deletions_lock:
+            if kb_uuid in _graph_deletions:
+                return True
+        return bool(self.kb_metadata.get(kb_uuid, {}).get('graph_deleting'))
+
+    def wait_graph_deletion(self, kb_uuid):
+        """等待该知识库的后台图谱删除完成"""
+        with _graph_deletions_lock:
+            thread = _graph_deletions.get(kb_uuid)
+        if thread is not None:
+            logging.info(f"等待知识库 {kb_uuid} 的图谱删除完成")
+            thread.join()
+
     def generate_vectors(self, kb_uuid, chunk_size=500, chunk_overlap=100):
         kb_info = self.kb_metadata.get(kb_uuid)
         if not kb_info:
@@ -201,8 +281,9 @@ class KnowledgeBase:
 
         self.kb_metadata[kb_uuid]['vec'] = True
         self.save_kb_metadata()
+        invalidate_semantic_cache(kb_uuid)
 
-    def find_top_k_matches_in_kb(self, kb_uuid, user_query, k=5):
+    def find_top_k_matches_in_kb(self, kb_uuid, user_query, k=5, query_embedding=None):
         kb_info = self.kb_metadata.get(kb_uuid)
         if not kb_info:
             raise Exception(f"知识库 UUID {kb_uuid} 不存在")
@@ -216,18 +297,133 @@ class KnowledgeBase:
         # 创建DocumentProcessor实例
         processor = DocumentProcessor("")
         # 调用DocumentProcessor中的find_top_k_matches方法
-        top_k_matches = processor.find_top_k_matches(user_query, vecs_path, k)
+        top_k_matches = processor.find_top_k_matches(user_query, vecs_path, k, query_embedding=query_embedding)
         logging.info(f"在知识库 {kb_uuid} 中为查询 '{user_query}' 找到前 {k} 个匹配项")
         return top_k_matches
 
-    def find_top_k_matches_in_graph(self, kb_uuid, user_query, k=5):
-        logging.info(f"Finding top {k} matches in graph for {user_query}")
-        vec_list = self.find_top_k_matches_in_kb(kb_uuid, user_query, k)
-        worker = Neo4jWorker()
-        res = worker.get_graph_info(vec_list)
-        logging.info(json.dumps(res, ensure_ascii=False, indent=4))
+    def find_top_k_matches_in_graph(self, kb_uuid, user_query, k=5, mode=GRAPH_RAG_MODE, query_embedding=None):
+        """
+        :param query_embedding: 问题向量，已计算过时传入以免重复计算
+        :param mode: one_hop: 返回分块关联实体的全部一跳关系;
+                     expand: 从分块关联实体出发，限制度数的多跳扩展并按相关度排序;
+                     entity: 从实体名称向量索引中检索种子实体，再做 expand 的扩展和排序;
+                     global: 检索社区摘要 [{"community", "size", "entities", "summary", "score"}]
+        """
+        logging.info(f"Finding top {k} matches in graph for {user_query}, mode: {mode}")
+        if self.is_graph_deleting(kb_uuid):
+            logging.info(f"知识库 {kb_uuid} 的图谱正在删除")
+            return []
+        worker = get_graph_backend()
+        embeddings = embedding_loader.get_embedding_model()
+        if mode not in ("one_hop", "expand", "entity", "global"):
+            raise Exception(f"不支持的图谱检索模式: {mode}")
+        if query_embedding is None:
+            query_embedding = embeddings.embed_query(user_query)
+        if mode == "entity":
+            seeds = self.find_entity_seeds(kb_uuid, query_embedding)
+            res = retrieve_graph_triples(worker, embeddings, user_query, seeds,
+                                         query_embedding=query_embedding, kb_uuid=kb_uuid)
+        elif mode == "global":
+            res = self.find_community_summaries(kb_uuid, query_embedding)
+        else:
+            vec_list = self.find_top_k_matches_in_kb(kb_uuid, user_query, k, query_embedding=query_embedding)
+            if mode == "expand":
+                id_list = [vec[0] for vec in vec_list]
+                res = retrieve_graph_triples(worker, embeddings, user_query, chunk_seeds(worker, id_list, kb_uuid),
+                                             n_chunks=len(id_list), query_embedding=query_embedding, kb_uuid=kb_uuid)
+            else:
+                res = worker.get_graph_info(vec_list, kb_uuid=kb_uuid)
+        self.log_graph_matches(kb_uuid, mode, res)
+        return res
+
+    async def afind_top_k_matches_in_graph(self, kb_uuid, user_query, k=5, mode=GRAPH_RAG_MODE, query_embedding=None):
+        """
+        find_top_k_matches_in_graph 的异步版本，供请求路径使用:
+        图数据库查询通过异步驱动执行，向量检索等 CPU 计算放到线程池中，不阻塞事件循环
+        """
+        logging.info(f"Finding top {k} matches in graph for {user_query}, mode: {mode}")
+        if self.is_graph_deleting(kb_uuid):
+            logging.info(f"知识库 {kb_uuid} 的图谱正在删除")
+            return []
+        worker = get_graph_backend()
+        embeddings = embedding_loader.get_embedding_model()
+        if mode not in ("one_hop", "expand", "entity", "global"):
+            raise Exception(f"不支持的图谱检索模式: {mode}")
+        if query_embedding is None:
+            query_embedding = await asyncio.to_thread(embeddings.embed_query, user_query)
+        if mode == "entity":
+            seeds = await asyncio.to_thread(self.find_entity_seeds, kb_uuid, query_embedding)
+            res = await aretrieve_graph_triples(worker, embeddings, user_query, seeds,
+                                                query_embedding=query_embedding, kb_uuid=kb_uuid)
+        elif mode == "global":
+            res = await asyncio.to_thread(self.find_community_summaries, kb_uuid, query_embedding)
+        else:
+            vec_list = await asyncio.to_thread(self.find_top_k_matches_in_kb, kb_uuid, user_query, k,
+                                               query_embedding=query_embedding)
+            if mode == "expand":
+                id_list = [vec[0] for vec in vec_list]
+                seeds = await achunk_seeds(worker, id_list, kb_uuid)
+                res = await aretrieve_graph_triples(worker, embeddings, user_query, seeds, n_chunks=len(id_list),
+                                                    query_embedding=query_embedding, kb_uuid=kb_uuid)
+            else:
+                res = await worker.aget_graph_info(vec_list, kb_uuid=kb_uuid)
+        self.log_graph_matches(kb_uuid, mode, res)
         return res
 
+    @staticmethod
+    def log_graph_matches(kb_uuid, mode, res):
+        """INFO 只记录结果条数，完整结果在 DEBUG 级别才序列化输出"""
+        logging.info(f"知识库 {kb_uuid} 图谱检索({mode})返回 {len(res)} 条结果")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(json.dumps(res, ensure_ascii=False, indent=4))
+
+    def find_entity_seeds(self, kb_uuid, query_embedding):
+        """从实体向量索引中检索种子实体，支持度为与问题的相似度"""
+        index = load_vector_index(self.get_entity_index_path(kb_uuid))
+        if index is None:
+            raise Exception(f"知识库 {kb_uuid} 没有实体向量索引，请重新构建图谱")
+        return {item['id']: max(score, 0.0) for item, score in index.search(query_embedding, GRAPH_RAG_ENTITY_TOP_K)}
+
+    def find_community_summaries(self, kb_uuid, query_embedding):
+        index = load_vector_index(self.get_community_index_path(kb_uuid))
+        if index is None:
+            raise Exception(f"知识库 {kb_uuid} 没有社区摘要，请开启 GRAPH_COMMUNITY_ENABLED 后重新构建图谱")
+        return [{'community': item['id'], 'size': item['size'], 'entities': item['entities'],
+                 'summary': item['summary'], 'score': score}
+                for item, score in index.search(query_embedding, GRAPH_RAG_COMMUNITY_TOP_K)]
+
+    def build_entity_index(self, kb_uuid, entities):
+        """
+        为知识库的实体建立名称向量索引，实体按 "id (类型)" 计算向量
+        :param entities: {实体 id: 类型}
+        """
+        embeddings = embedding_loader.get_embedding_model()
+        items = [{'id': entity_id, 'type': entity_type} for entity_id, entity_type in entities.items()]
+        vectors = []
+        for i in range(0, len(items), GRAPH_ENTITY_EMBED_BATCH_SIZE):
+            batch = items[i:i + GRAPH_ENTITY_EMBED_BATCH_SIZE]
+            vectors.extend(embeddings.embed_documents([f"{item['id']} ({item['type']})" for item in batch]))
+        VectorIndex.build(self.get_entity_index_path(kb_uuid), items, vectors)
+        logging.info(f"知识库 {kb_uuid} 的实体向量索引已建立, 实体数: {len(items)}")
+
+    def build_community_index(self, kb_uuid, collector, transformer):
+        """
+        建图后处理: 标签传播检测社区，用图谱抽取模型为每个社区生成摘要，摘要计算向量后保存为社区索引
+        :param collector: 构建过程中收集的实体和关系(GraphCollector)
+        :param transformer: 图谱转换器，复用其聊天模型和并发控制器
+        """
+        labels = label_propagation(len(collector.entities), [(s, t) for s, _, t in collector.edges])
+        communities = community_triples(collector, labels)
+        logging.info(f"知识库 {kb_uuid} 检测到 {labels.max() + 1 if len(labels) else 0} 个社区, "
+                     f"其中 {len(communities)} 个需要生成摘要")
+        summarized = summarize_communities(transformer.llm, communities, controller=transformer.controller,
+                                           max_workers=transformer.controller.max_limit)
+        embeddings = embedding_loader.get_embedding_model()
+        items = [{'id': c['id'], 'size': c['size'], 'entities': c['entities'], 'summary': c['summary']}
+                 for c in summarized]
+        vectors = embeddings.embed_documents([item['summary'] for item in items]) if items else []
+        VectorIndex.build(self.get_community_index_path(kb_uuid), items, vectors)
+
     def clear_all_kbs(self):
         logging.info(f"Clearing all KBs")
         # 收集所有要删除的键
@@ -239,40 +435,64 @@ class KnowledgeBase:
         logging.info(f"Cleared all KBs")
 
     def create_graph_kb(self, model_name, kb_uuid, allow_nodes=None, allow_relationships=None, strict_mode=False):
-        vec_metadata = self.get_vec_metadata(kb_uuid)
-        if not vec_metadata:
+        vecs_path = self.get_vecs_path(kb_uuid)
+        if not vecs_path:
             raise Exception(f"向量库文件不存在: {kb_uuid}")
 
         if self.kb_metadata[kb_uuid]['graph']:
             self.init_graph(kb_uuid)
-
-        docs = []
-        for item in vec_metadata:
-            logging.debug(item)
-            doc = create_document_from_item(item)
-            docs.append(doc)
-
-        from chat_openai import get_chat_openai
-        llm = get_chat_openai(model_name)
-
-        # 初始化图谱转换器
-        transformer = LLMGraphTransformer(
-            llm=llm,
+        # 旧图谱删除完成后再写入，避免新写入的节点被删除
+        self.wait_graph_deletion(kb_uuid)
+        if self.kb_metadata[kb_uuid].get('graph_deleting'):
+            # 之前的删除失败，构建前同步删除残留的图数据，失败时不构建
+            self.delete_graph(kb_uuid)
+
+        # 获取图谱转换器(按抽取配置缓存)
+        transformer = get_graph_transformer(
+            model_name,
             allowed_nodes=allow_nodes,
             allowed_relationships=allow_relationships,
             strict_mode=strict_mode
         )
 
-        res = transformer.convert_to_graph_documents(docs)
+        # 惰性读取分块，抽取结果分批写入数据库
+        docs = (create_document_from_item(item) for item in iter_json_array(vecs_path))
+        worker = get_graph_backend()
+        collector = GraphCollector(collect_edges=GRAPH_COMMUNITY_ENABLED)
 
-        if not res or len(res) == 0 or res[0].nodes == [] or res[0].relationships == []:
+        def write(graph_document_list):
+            # 顺带收集实体和关系，用于建立实体向量索引和社区摘要
+            collector.add(graph_document_list)
+            worker.save_graph_documents(graph_document_list)
+
+        pipeline = GraphBuildPipeline(transformer, write)
+        try:
+            stats = pipeline.run(docs)
+            worker.flush(kb_uuid)
+        except Exception:
+            # 清理已写入的部分图谱
+            worker.delete_by_uuid(kb_uuid)
+            raise
+        logging.info(f"图谱抽取完成, 并发与重试统计: {transformer.controller.metrics()}")
+
+        if stats['nodes'] == 0 or stats['relationships'] == 0:
+            worker.delete_by_uuid(kb_uuid)
             raise Exception("创建图谱失败")
 
-        worker = Neo4jWorker()
-        worker.save_graph_documents_in_neo4j(res)
+        # 实体索引和社区摘要只影响 entity/global 检索模式，失败时不影响图谱本身
+        try:
+            self.build_entity_index(kb_uuid, collector.entities)
+        except Exception as e:
+            logging.error(f"建立实体向量索引失败: {e}")
+        if GRAPH_COMMUNITY_ENABLED:
+            try:
+                self.build_community_index(kb_uuid, collector, transformer)
+            except Exception as e:
+                logging.error(f"生成社区摘要失败: {e}")
 
         self.kb_metadata[kb_uuid]['graph'] = True
         self.save_kb_metadata()
+        invalidate_semantic_cache(kb_uuid)
 
     def delete_by_level(self, kb_uuid, level):
         if level in ["graph", "vec", "all"]:
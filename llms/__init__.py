@@ -1,10 +1,46 @@
+import threading
+
+from config import LLM_ROUTER_PROVIDERS
+from utils import metrics_registry
 from .kimi import KimiAI
 from .openai_ai import OpenAIAPI
+from .fake import FakeAI
+from .router import LLMRouter
+from .client import get_http_client, close_http_client
+from .budget import fit_context, count_tokens, count_message_tokens, PromptContext
+
+PROVIDERS = {
+    "kimi": KimiAI,
+    "openai": OpenAIAPI,
+    "fake": FakeAI,
+}
+
+# 按延迟和错误率在 LLM_ROUTER_PROVIDERS 之间路由的模型名称
+ROUTER_MODEL_NAME = "auto"
+
+_llms = {}
+_llms_lock = threading.Lock()
+
 
 def get_llm(model_name):
-    if model_name == "kimi":
-        return KimiAI()
-    elif model_name == "openai":
-        return OpenAIAPI()
-    else:
-        raise Exception("Unknown model name")
\ No newline at end of file
+    """获取进程内共享的服务商实例，每个服务商只创建一次客户端；"auto" 返回在多个服务商之间路由的 LLMRouter"""
+    if model_name == ROUTER_MODEL_NAME:
+        providers = {name: get_llm(name) for name in LLM_ROUTER_PROVIDERS}
+        with _llms_lock:
+            if model_name not in _llms:
+                _llms[model_name] = LLMRouter(providers)
+                metrics_registry.register("llm_router", _llms[model_name].metrics)
+            return _llms[model_name]
+    if model_name not in PROVIDERS:
+        raise Exception("Unknown model name")
+    with _llms_lock:
+        if model_name not in _llms:
+            _llms[model_name] = PROVIDERS[model_name]()
+        return _llms[model_name]
+
+
+async def close_llms():
+    with _llms_lock:
+        _llms.clear()
+    metrics_registry.unregister("llm_router")
+    await close_http_client()
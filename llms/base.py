@@ -1,6 +1,34 @@
 from abc import ABC, abstractmethod
+
+from .budget import count_message_tokens
+
+
 class BaseAI(ABC):
+    # 可用的模型及上下文长度 [(模型名, 上下文 token 数)]，按上下文长度升序
+    context_tiers = ()
+    # 提示(系统提示 + 历史 + 用户输入)的 token 预算上限
+    max_prompt_tokens = None
+
     @abstractmethod
     async def get_response(self, prompt, user_input, history, temperature=0.3, max_tokens=2048, stream=False):
         pass
 
+    @staticmethod
+    def build_messages(prompt, user_input, history=None):
+        """每次调用单独构建消息列表，服务商实例在请求之间共享，不能保存对话状态"""
+        return [{"role": "system", "content": prompt}, *(history or []), {"role": "user", "content": user_input}]
+
+    def prompt_budget(self, max_tokens):
+        """提示的 token 预算: 最大上下文减去输出预留，且不超过 max_prompt_tokens"""
+        budget = self.context_tiers[-1][1] - max_tokens
+        if self.max_prompt_tokens:
+            budget = min(budget, self.max_prompt_tokens)
+        return max(budget, 0)
+
+    def select_model(self, messages, max_tokens):
+        """选择能容纳提示和输出的最小上下文模型，都放不下时使用最大的模型"""
+        needed = count_message_tokens(messages) + max_tokens
+        for model, context_length in self.context_tiers:
+            if needed <= context_length:
+                return model
+        return self.context_tiers[-1][0]
@@ -0,0 +1,145 @@
+import logging
+import threading
+
+from config import LLM_HISTORY_BUDGET_RATIO
+from utils import metrics_registry
+
+# 输出预留的 token 数，与各服务商 get_response 的 max_tokens 默认值一致
+DEFAULT_MAX_TOKENS = 2048
+# 每条消息的格式开销(角色、分隔符)
+MESSAGE_OVERHEAD = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken 为可选依赖，未安装或编码表无法加载时返回 None，改用估算"""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            _encoding_loaded = True
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logging.warning(f"tiktoken 不可用，按字符数估算 token 数: {e}")
+        return _encoding
+
+
+def count_tokens(text):
+    """
+    统计文本的 token 数。没有 tiktoken 时估算: 非 ASCII 字符(中文等)每个按 1 个 token，其余每 4 个字符 1 个 token
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    n_chars = len(text)
+    # UTF-8 下中文等字符占 3 个字节，由字节数与字符数之差估算非 ASCII 字符数
+    non_ascii = min((len(text.encode("utf-8")) - n_chars) // 2, n_chars)
+    return non_ascii + (n_chars - non_ascii + 3) // 4
+
+
+def count_message_tokens(messages):
+    return sum(count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD for message in messages) + 2
+
+
+class PromptContext:
+    """
+    按 token 预算组装后的上下文
+    system_prompt: 填入知识后的系统提示; history: 截断后的对话历史; items: 保留的知识条目;
+    prompt_tokens: 完整提示(系统提示 + 历史 + 用户输入)的 token 数
+    """
+
+    def __init__(self, system_prompt, history, items, prompt_tokens, dropped_messages, dropped_items):
+        self.system_prompt = system_prompt
+        self.history = history
+        self.items = items
+        self.prompt_tokens = prompt_tokens
+        self.dropped_messages = dropped_messages
+        self.dropped_items = dropped_items
+
+
+class TokenStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def record(self, model_name, context):
+        with self._lock:
+            stats = self._models.setdefault(model_name, {"requests": 0, "prompt_tokens": 0, "max_prompt_tokens": 0,
+                                                          "dropped_messages": 0, "dropped_items": 0})
+            stats["requests"] += 1
+            stats["prompt_tokens"] += context.prompt_tokens
+            stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], context.prompt_tokens)
+            stats["dropped_messages"] += context.dropped_messages
+            stats["dropped_items"] += context.dropped_items
+
+    def metrics(self):
+        with self._lock:
+            return {name: dict(stats, avg_prompt_tokens=round(stats["prompt_tokens"] / stats["requests"], 1))
+                    for name, stats in self._models.items()}
+
+
+token_stats = TokenStats()
+metrics_registry.register("llm_tokens", token_stats.metrics)
+
+
+def _fit_history(history, budget):
+    """从最新的消息向前保留，直到超出预算；返回 (保留的消息, 占用的 token 数)"""
+    kept, used = [], 0
+    for message in reversed(history):
+        cost = count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+        if used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    # 截断后不以助手消息开头
+    while kept and kept[0].get("role") == "assistant":
+        used -= count_tokens(kept[0].get("content") or "") + MESSAGE_OVERHEAD
+        kept.pop(0)
+    return kept, used
+
+
+def fit_context(llm, render, items, history, user_input, model_name=None, max_tokens=DEFAULT_MAX_TOKENS,
+                history_ratio=LLM_HISTORY_BUDGET_RATIO):
+    """
+    在模型的提示 token 预算内组装上下文: 系统提示和用户输入必须保留，
+    对话历史最多占剩余预算的 history_ratio(从最早的轮次开始丢弃)，知识条目按相关度顺序填入剩余预算，
+    知识没有用完的预算再留给更早的历史。
+    :param llm: 服务商实例(BaseAI)，提供 prompt_budget
+    :param render: 知识条目列表 -> 系统提示
+    :param items: 按相关度降序的知识条目(非文本条目按 str() 统计 token 数)
+    :param history: 客户端发送的对话历史
+    :param model_name: 用于统计的模型名称
+    :return: PromptContext
+    """
+    history = history or []
+    budget = llm.prompt_budget(max_tokens)
+    fixed = count_tokens(render([])) + count_tokens(user_input) + 2 * MESSAGE_OVERHEAD + 2
+    remaining = max(budget - fixed, 0)
+
+    kept_history, history_used = _fit_history(history, int(remaining * history_ratio))
+
+    kept_items, items_used = [], 0
+    for item in items:
+        cost = count_tokens(item if isinstance(item, str) else str(item)) + 1
+        if items_used + cost <= remaining - history_used:
+            kept_items.append(item)
+            items_used += cost
+
+    if len(kept_history) < len(history):
+        kept_history, history_used = _fit_history(history, remaining - items_used)
+
+    system_prompt = render(kept_items)
+    messages = [{"role": "system", "content": system_prompt}, *kept_history, {"role": "user", "content": user_input}]
+    context = PromptContext(system_prompt, kept_history, kept_items, count_message_tokens(messages),
+                            len(history) - len(kept_history), len(items) - len(kept_items))
+    token_stats.record(model_name or type(llm).__name__, context)
+    logging.info(f"提示 token 数: {context.prompt_tokens}/{budget}, 丢弃历史消息 {context.dropped_messages} 条, "
+                 f"丢弃知识 {context.dropped_items} 条")
+    return context
@@ -0,0 +1,34 @@
+import logging
+
+import httpx
+
+from config import (LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_KEEPALIVE_EXPIRY,
+                    LLM_HTTP_TIMEOUT, LLM_HTTP_CONNECT_TIMEOUT)
+
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    获取进程内共享的异步 HTTP 客户端，所有大模型服务商复用同一个长连接池。
+    需在服务的事件循环中调用(连接池与创建时的事件循环绑定)。
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logging.info("大模型 HTTP 连接池已关闭")
@@ -0,0 +1,36 @@
+import asyncio
+import random
+
+from .base import BaseAI
+
+
+class FakeAI(BaseAI):
+    """
+    本地的模拟服务商，不访问网络，用于测试路由、对冲请求和压测。
+    首 token 延迟以 ttft 为基准，按 tail_rate 的概率放大为 tail_ttft 模拟长尾；按 error_rate 的概率在首 token 前报错。
+    """
+    context_tiers = (("fake", 8192),)
+
+    def __init__(self, ttft=0.05, tail_ttft=None, tail_rate=0.0, token_delay=0.0, n_tokens=50, error_rate=0.0,
+                 seed=None):
+        self.ttft = ttft
+        self.tail_ttft = tail_ttft if tail_ttft is not None else ttft * 10
+        self.tail_rate = tail_rate
+        self.token_delay = token_delay
+        self.n_tokens = n_tokens
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    async def get_response(self, prompt, user_input, history=None, temperature=0.3, max_tokens=2048, stream=False):
+        tail = self.random.random() < self.tail_rate
+        await asyncio.sleep(self.tail_ttft if tail else self.ttft)
+        if self.random.random() < self.error_rate:
+            raise Exception("模拟服务商错误")
+        tokens = [f"{user_input[:8]}{i} " for i in range(self.n_tokens)]
+        if not stream:
+            yield "".join(tokens)
+            return
+        for i, token in enumerate(tokens):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
@@ -1,31 +1,33 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 from config import *
 from .base import BaseAI
+from .client import get_http_client
 import logging
 
+from utils import LLM_STREAM_LOGGER
+
+stream_logger = logging.getLogger(LLM_STREAM_LOGGER)
+
+
 class KimiAI(BaseAI):
+    context_tiers = KIMI_CONTEXT_TIERS
+    max_prompt_tokens = KIMI_MAX_PROMPT_TOKENS
+
     def __init__(self):
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             api_key=KIMI_API_KEY,
-            base_url="https://api.moonshot.cn/v1"
+            base_url=KIMI_BASE_URL,
+            http_client=get_http_client()
         )
-        self.messages = []
-
-    def initialize_conversation(self, system_prompt):
-        self.messages.append({"role": "system", "content": system_prompt})
-        logging.info(f"Initialized conversation with system prompt: {system_prompt}")
-
 
     async def get_response(self, prompt, user_input, history=None, temperature=0.3, max_tokens=2048, stream=False):
-        if not history or history != []:
-            self.messages.extend(history)
-        self.messages.append({"role": "user", "content": user_input})
-        self.initialize_conversation(prompt)
-        logging.info(f"User input: {user_input}")
-
-        completion = self.client.chat.completions.create(
-            model="moonshot-v1-8k",
-            messages=self.messages,
+        messages = self.build_messages(prompt, user_input, history)
+        model = self.select_model(messages, max_tokens)
+        logging.info(f"User input: {user_input}, model: {model}")
+
+        completion = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
             stream=stream
@@ -34,11 +36,13 @@ class KimiAI(BaseAI):
         if stream:
             content_text = ""
             logging.info("Kimi AI: (streaming)")
-            for chunk in completion:
+            async for chunk in completion:
+                if not chunk.choices:
+                    continue
                 delta = chunk.choices[0].delta
                 if delta.content:
                     content_text += delta.content
-                    logging.info(delta.content, extra={'streaming': True})
+                    stream_logger.debug(delta.content)
                     yield delta.content  # 直接yield每个数据块
             logging.info(f"Kimi AI: {content_text}")
         else:
@@ -48,14 +52,20 @@ class KimiAI(BaseAI):
 
 
 if __name__ == "__main__":
+    import asyncio
 
     system_prompt = "你是 Kimi。"
 
-    kimi_ai = KimiAI()
+    async def main():
+        kimi_ai = KimiAI()
+        while True:
+            user_input = input("用户: ")
+            if user_input.lower() in ["退出", "exit"]:
+                break
+            print("Kimi AI: ", end="")
+            async for response in kimi_ai.get_response(system_prompt, user_input, temperature=0.3, max_tokens=2048,
+                                                       stream=True):
+                print(response, end="", flush=True)
+            print()
 
-    while True:
-        user_input = input("用户: ")
-        if user_input.lower() in ["退出", "exit"]:
-            break
-        response = kimi_ai.get_response(system_prompt, user_input, temperature=0.3, max_tokens=2048, stream=True)
-        print("Kimi AI:", response)
+    asyncio.run(main())
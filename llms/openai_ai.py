@@ -1,21 +1,24 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL
+from openai import AsyncOpenAI
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, OPENAI_CONTEXT_LENGTH, OPENAI_MAX_PROMPT_TOKENS
 from llms.base import BaseAI
+from llms.client import get_http_client
 import logging
 
+from utils import LLM_STREAM_LOGGER
+
+stream_logger = logging.getLogger(LLM_STREAM_LOGGER)
+
+
 class OpenAIAPI(BaseAI):
+    context_tiers = ((OPENAI_MODEL, OPENAI_CONTEXT_LENGTH),)
+    max_prompt_tokens = OPENAI_MAX_PROMPT_TOKENS
+
     def __init__(self):
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             api_key=OPENAI_API_KEY,
-            base_url=OPENAI_BASE_URL  # 如果需要指定基础URL，请确保它是有效的。
+            base_url=OPENAI_BASE_URL,  # 如果需要指定基础URL，请确保它是有效的。
+            http_client=get_http_client()
         )
-        self.messages = []
-
-    def initialize_conversation(self, system_prompt):
-        """初始化对话，设置系统提示"""
-        if not self.messages or self.messages[0]['role'] != "system":
-            self.messages.insert(0, {"role": "system", "content": system_prompt})
-            logging.info(f"Initialized conversation with system prompt: {system_prompt}")
 
     async def get_response(self, prompt, user_input, history=None, temperature=0.3, max_tokens=2048, stream=False):
         """
@@ -29,15 +32,12 @@ class OpenAIAPI(BaseAI):
         - stream: 是否流式输出，默认为False
         返回：助手的响应文本
         """
-        if history:
-            self.messages.extend(history)
-        self.messages.append({"role": "user", "content": user_input})
-        self.initialize_conversation(prompt)  # 注意：这会每次都添加系统提示到消息列表中，可能不是你想要的行为。
+        messages = self.build_messages(prompt, user_input, history)
         logging.info(f"User input: {user_input}")
 
-        completion = self.client.chat.completions.create(
+        completion = await self.client.chat.completions.create(
             model=OPENAI_MODEL,
-            messages=self.messages,
+            messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
             stream=stream
@@ -46,11 +46,13 @@ class OpenAIAPI(BaseAI):
         content_text = ""
         if stream:
             logging.info("OpenAI: (streaming)")
-            for chunk in completion:
+            async for chunk in completion:
+                if not chunk.choices:
+                    continue
                 delta = chunk.choices[0].delta
                 if hasattr(delta, 'content') and delta.content is not None:
                     content_text += delta.content
-                    logging.info(delta.content, extra={'streaming': True})
+                    stream_logger.debug(delta.content)
                     yield delta.content
             logging.info(f"OpenAI: {content_text}")
         else:
@@ -60,13 +62,20 @@ class OpenAIAPI(BaseAI):
 
 
 if __name__ == "__main__":
+    import asyncio
+
     system_prompt = "你是通义，由阿里云开发的人工智能助手。"
 
-    openai_api = OpenAIAPI()
+    async def main():
+        openai_api = OpenAIAPI()
+        while True:
+            user_input = input("用户: ")
+            if user_input.lower() in ["退出", "exit"]:
+                break
+            print("OpenAI: ", end="")
+            async for response in openai_api.get_response(system_prompt, user_input, temperature=0.3,
+                                                          max_tokens=2048, stream=True):
+                print(response, end="", flush=True)
+            print()
 
-    while True:
-        user_input = input("用户: ")
-        if user_input.lower() in ["退出", "exit"]:
-            break
-        response = openai_api.get_response(system_prompt, user_input, temperature=0.3, max_tokens=2048, stream=True)
-        print("OpenAI:", response)
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import numpy as np
+
+from config import (LLM_ROUTER_WINDOW, LLM_ROUTER_MIN_SAMPLES, LLM_ROUTER_ERROR_THRESHOLD, LLM_ROUTER_COOLDOWN,
+                    LLM_HEDGE_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_DELAY, LLM_HEDGE_MAX_DELAY)
+from .base import BaseAI
+from .budget import DEFAULT_MAX_TOKENS
+
+
+class ProviderStats:
+    """单个服务商最近 window 次请求的首 token 延迟(TTFT)和成败，错误率过高时熔断 cooldown 秒"""
+
+    def __init__(self, window=LLM_ROUTER_WINDOW):
+        self.ttft = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True 成功 / False 失败
+        self.open_until = 0.0
+        self.requests = 0
+        self.wins = 0
+
+    def percentile(self, q, default=0.0):
+        if not self.ttft:
+            return default
+        return float(np.percentile(self.ttft, q))
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def healthy(self, now=None):
+        return (now or time.monotonic()) >= self.open_until
+
+    def on_success(self, ttft):
+        self.ttft.append(ttft)
+        self.outcomes.append(True)
+
+    def on_error(self, min_samples=LLM_ROUTER_MIN_SAMPLES, threshold=LLM_ROUTER_ERROR_THRESHOLD,
+                 cooldown=LLM_ROUTER_COOLDOWN):
+        self.outcomes.append(False)
+        if len(self.outcomes) >= min_samples and self.error_rate() > threshold:
+            self.open_until = time.monotonic() + cooldown
+            # 熔断结束后按新的样本重新判断
+            self.outcomes.clear()
+            return True
+        return False
+
+
+async def first_token(gen):
+    """读取第一个非空增量，跳过只带 role 等的空分块(它们只反映连接建立，不代表首 token)；没有输出时返回 None"""
+    async for delta in gen:
+        if delta:
+            return delta
+    return None
+
+
+class LLMRouter(BaseAI):
+    """
+    在多个服务商之间路由的聊天模型，接口与服务商相同。
+    每次请求发往滚动 TTFT 中位数最低的健康服务商；开启对冲时，若首 token 在该服务商 TTFT 的 p95 内仍未到达，
+    再向下一个服务商发出同样的请求，先返回首 token 的一方继续输出，另一方被取消。
+    首 token 之前出错时立即改用下一个服务商，首 token 之后出错则直接抛出。
+    """
+
+    def __init__(self, providers, hedge=LLM_HEDGE_ENABLED, hedge_percentile=LLM_HEDGE_PERCENTILE,
+                 hedge_min_delay=LLM_HEDGE_MIN_DELAY, hedge_max_delay=LLM_HEDGE_MAX_DELAY):
+        """
+        :param providers: {名称: 服务商实例(BaseAI)}
+        """
+        if not providers:
+            raise Exception("路由至少需要一个服务商")
+        self.providers = dict(providers)
+        self.stats = {name: ProviderStats() for name in self.providers}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0, "errors": 0}
+
+    def prompt_budget(self, max_tokens):
+        # 提示需要能被任意一个服务商接受
+        return min(provider.prompt_budget(max_tokens) for provider in self.providers.values())
+
+    def rank(self):
+        """健康的服务商按 TTFT 中位数升序(没有样本的优先，以便收集数据)，熔断中的排在最后作为兜底"""
+        now = time.monotonic()
+        return sorted(self.providers, key=lambda name: (not self.stats[name].healthy(now),
+                                                        self.stats[name].percentile(50)))
+
+    def hedge_delay(self, name):
+        stats = self.stats[name]
+        if len(stats.ttft) < LLM_ROUTER_MIN_SAMPLES:
+            return self.hedge_max_delay
+        return min(max(stats.percentile(self.hedge_percentile), self.hedge_min_delay), self.hedge_max_delay)
+
+    def _on_error(self, name, e):
+        self.counters["errors"] += 1
+        if self.stats[name].on_error():
+            logging.warning(f"服务商 {name} 错误率过高，暂停路由 {LLM_ROUTER_COOLDOWN}s")
+        logging.error(f"服务商 {name} 请求失败: {e}")
+
+    async def get_response(self, prompt, user_input, history=None, temperature=0.3, max_tokens=DEFAULT_MAX_TOKENS,
+                           stream=False):
+        self.counters["requests"] += 1
+        candidates = self.rank()
+        attempts = {}  # 读取首个非空 token 的任务 -> (服务商名称, 生成器, 开始时间)
+
+        def launch(name):
+            self.stats[name].requests += 1
+            gen = self.providers[name].get_response(prompt, user_input, history=history, temperature=temperature,
+                                                    max_tokens=max_tokens, stream=stream)
+            attempts[asyncio.ensure_future(first_token(gen))] = (name, gen, time.monotonic())
+
+        def hedge_deadline(name):
+            return time.monotonic() + self.hedge_delay(name) if self.hedge and candidates else None
+
+        primary = candidates.pop(0)
+        launch(primary)
+        hedge_at = hedge_deadline(primary)
+        hedged, winner, last_error = False, None, None
+        try:
+            while winner is None:
+                if not attempts:
+                    if not candidates:
+                        raise last_error
+                    self.counters["failovers"] += 1
+                    primary = candidates.pop(0)
+                    launch(primary)
+                    hedge_at = hedge_deadline(primary) if not hedged else None
+                timeout = None if hedge_at is None else max(hedge_at - time.monotonic(), 0)
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_at = None
+                    if candidates:
+                        self.counters["hedges"] += 1
+                        hedged = True
+                        launch(candidates.pop(0))
+                    continue
+                for task in done:
+                    name, gen, start = attempts.pop(task)
+                    try:
+                        first = task.result()
+                    except Exception as e:
+                        self._on_error(name, e)
+                        last_error = e
+                        await gen.aclose()
+                        continue
+                    if winner is None:
+                        winner = (name, gen, first, time.monotonic() - start)
+                    else:
+                        # 同时完成的另一方，直接关闭
+                        await gen.aclose()
+        finally:
+            # 取消仍在等待首 token 的请求(对冲中落后的一方，或客户端已断开)
+            winner_ttft = winner[3] if winner else None
+            for task, (name, gen, start) in attempts.items():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await gen.aclose()
+                elapsed = time.monotonic() - start
+                # 被取消的一方至少这么慢，比胜者等待更久时计入样本，避免慢的服务商因总被取消而显得很快
+                if winner_ttft is not None and elapsed >= winner_ttft:
+                    self.stats[name].ttft.append(elapsed)
+
+        name, gen, first, ttft = winner
+        self.stats[name].on_success(ttft)
+        self.stats[name].wins += 1
+        if hedged and name != primary:
+            self.counters["hedge_wins"] += 1
+        logging.info(f"路由到服务商 {name}, 首 token 延迟 {ttft:.3f}s")
+        if first is None:
+            return
+        try:
+            yield first
+            async for delta in gen:
+                yield delta
+        except Exception as e:
+            self._on_error(name, e)
+            raise
+        finally:
+            await gen.aclose()
+
+    def metrics(self):
+        now = time.monotonic()
+        return {
+            **self.counters,
+            "providers": {
+                name: {
+                    "healthy": stats.healthy(now),
+                    "requests": stats.requests,
+                    "wins": stats.wins,
+                    "ttft_p50": round(stats.percentile(50), 4),
+                    "ttft_p95": round(stats.percentile(95), 4),
+                    "error_rate": round(stats.error_rate(), 4),
+                    "hedge_delay": round(self.hedge_delay(name), 4),
+                }
+                for name, stats in self.stats.items()
+            },
+        }
@@ -1 +1,2 @@
-from .base import Neo4jWorker
\ No newline at end of file
+from .base import Neo4jWorker, get_neo4j_worker, close_neo4j_worker
+from .async_reader import AsyncNeo4jReader, get_async_neo4j_reader, close_async_neo4j_reader
@@ -0,0 +1,61 @@
+import logging
+
+from neo4j import AsyncGraphDatabase, Query
+
+from config import *
+from .queries import QUERIES
+
+
+class AsyncNeo4jReader:
+    """
+    请求路径上的异步只读访问，基于 neo4j 异步驱动。
+    与 Neo4jWorker 共用查询语句，等待数据库返回时不阻塞事件循环，并发请求的查询可以重叠执行。
+    """
+
+    def __init__(self):
+        self.driver = AsyncGraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_CONNECTION_TIMEOUT,
+        )
+        self.database = NEO4J_DATABASE
+        self.queries = QUERIES[GRAPH_PARTITION_BY_KB]
+
+    async def run(self, query, param=None):
+        async with self.driver.session(database=self.database, default_access_mode="READ") as session:
+            result = await session.run(Query(query, timeout=NEO4J_QUERY_TIMEOUT), param or {})
+            return [record.data() async for record in result]
+
+    async def get_graph_info(self, vec_list, kb_uuid=None):
+        id_list = [vec[0] for vec in vec_list]
+        result = await self.run(self.queries["graph_info"], {"id_list": id_list, "kb_uuid": kb_uuid})
+        return result[0]['relations']
+
+    async def get_seed_entities(self, id_list, kb_uuid=None):
+        return await self.run(self.queries["seed"], {"id_list": id_list, "kb_uuid": kb_uuid})
+
+    async def expand_entities(self, ids, fanout, kb_uuid=None):
+        return await self.run(self.queries["expand"], {"ids": list(ids), "fanout": fanout, "kb_uuid": kb_uuid})
+
+    async def close(self):
+        await self.driver.close()
+
+
+_reader = None
+
+
+def get_async_neo4j_reader() -> AsyncNeo4jReader:
+    """获取共享的异步读取器，需在服务的事件循环中调用(驱动与创建时的事件循环绑定)"""
+    global _reader
+    if _reader is None:
+        _reader = AsyncNeo4jReader()
+    return _reader
+
+
+async def close_async_neo4j_reader():
+    global _reader
+    if _reader is not None:
+        await _reader.close()
+        _reader = None
+        logging.info("Neo4j 异步驱动已关闭")
@@ -1,49 +1,114 @@
 import os
-from langchain_community.graphs import Neo4jGraph
+import threading
+import time
+from neo4j import GraphDatabase, Query
 from typing import List
 from langchain_community.graphs.graph_document import GraphDocument
 from config import *
+from utils import metrics_registry
+from .bulk_writer import GraphBulkWriter
+from .queries import BASE_ENTITY_LABEL, QUERIES, DELETE_KB_DOCUMENTS_QUERY
+from .schema import GraphSchemaManager
+from .async_reader import get_async_neo4j_reader
+from graph_store.base import GraphBackend
 import logging
 import json
 
 
-class Neo4jWorker:
+class Neo4jWorker(GraphBackend):
     def __init__(self):
-        self.graph = Neo4jGraph(url=NEO4J_URI, username=NEO4J_USER, password=NEO4J_PASSWORD)
+        # 驱动内部维护连接池，创建时不连接数据库，也不做 APOC schema 查询
+        self.driver = GraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_CONNECTION_TIMEOUT,
+        )
+        self.database = NEO4J_DATABASE
+        self.queries = QUERIES[GRAPH_PARTITION_BY_KB]
+        self.bulk_writer = GraphBulkWriter(self)
+        self.schema = GraphSchemaManager(self)
 
     def run(self, query, param=None):
-        return self.graph.query(query, param)
+        with self.driver.session(database=self.database) as session:
+            result = session.run(Query(query, timeout=NEO4J_QUERY_TIMEOUT), param or {})
+            return [record.data() for record in result]
 
-    def save_graph_documents_in_neo4j(self, graph_document_list: List[GraphDocument]):
+    def run_write(self, query, param=None):
+        """在单独的写事务中执行查询，遇到瞬时错误时由驱动自动重试"""
+        def work(tx):
+            return tx.run(Query(query, timeout=NEO4J_QUERY_TIMEOUT), param or {}).consume().counters
+
+        with self.driver.session(database=self.database) as session:
+            return session.execute_write(work)
+
+    def explain(self, query, param=None):
+        """返回查询的执行计划(不实际执行)"""
+        with self.driver.session(database=self.database) as session:
+            summary = session.run(Query("EXPLAIN " + query), param or {}).consume()
+            return summary.plan
+
+    def health_check(self):
+        """
+        检查数据库连通性
+        :return: {"ok": bool, "latency_ms": float, "error": str | None}
+        """
+        start = time.perf_counter()
+        try:
+            self.run("RETURN 1 AS ok")
+            return {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000, "error": None}
+        except Exception as e:
+            logging.error(f"Neo4j 健康检查失败: {e}")
+            return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+
+    def close(self):
+        self.driver.close()
+
+    def save_graph_documents(self, graph_document_list: List[GraphDocument]):
         """将图文档存入数据库neo4j
         Args:
             graph_document_list (List[GraphDocument]): 图文档列表
         """
-        for graph_document in graph_document_list:
-            logging.info(graph_document)
-        self.graph.add_graph_documents(graph_document_list, True)
+        return self.bulk_writer.write(graph_document_list)
+
+    save_graph_documents_in_neo4j = save_graph_documents
 
-    def delete_by_uuid(self, kb_uuid: str):
+    def strip_document_embeddings(self, batch_size=1000):
+        """迁移: 分批删除已有 Document 节点上的 embedding 属性
+        Args:
+            batch_size (int): 每个事务处理的节点数
+        """
+        query = """
+        MATCH (d:Document) WHERE d.embedding IS NOT NULL
+        CALL { WITH d REMOVE d.embedding } IN TRANSACTIONS OF $batch_size ROWS
+        """
+        self.run(query, {"batch_size": batch_size})
+        logging.info("已删除 Document 节点上的 embedding 属性")
+
+    def label_entities(self, batch_size=1000):
+        """迁移: 给旧版本创建的实体节点补充公共实体标签
+        Args:
+            batch_size (int): 每个事务处理的节点数
+        """
         query = f"""
-           MATCH (d:Document)-[r0]->(m) WHERE d.kb_uuid = '{kb_uuid}'
-           WITH d, r0
-           MATCH (d)-[]->(n)
-           WITH n, d, r0
-           OPTIONAL MATCH (other_d:Document)-[]->(n) WHERE other_d.kb_uuid <> d.kb_uuid
-           WITH n, d, COUNT(other_d) AS other_count, r0
-           WHERE other_count = 0
-           MATCH (n)-[r]-()
-           DELETE r0, r, n, d
-           """
-        query1 = f"""
-           MATCH (d:Document)-[r]->()
-           WHERE d.kb_uuid = '{kb_uuid}'
-           DELETE r, d
-           """
-        self.run(query)
-        self.run(query1)
-
-    def get_graph_info(self, vec_list):
+        MATCH (n) WHERE NOT n:Document AND NOT n:{BASE_ENTITY_LABEL}
+        CALL {{ WITH n SET n:{BASE_ENTITY_LABEL} }} IN TRANSACTIONS OF $batch_size ROWS
+        """
+        self.run(query, {"batch_size": batch_size})
+        logging.info(f"已为实体节点补充 {BASE_ENTITY_LABEL} 标签")
+
+    def delete_by_uuid(self, kb_uuid: str, batch_size=NEO4J_DELETE_BATCH_SIZE):
+        """分批删除知识库的图谱，未按知识库分区时，其他知识库仍在引用的实体会保留
+        Args:
+            kb_uuid (str): 知识库 UUID
+            batch_size (int): 每个事务删除的节点数
+        """
+        params = {"kb_uuid": kb_uuid, "batch_size": batch_size}
+        self.run(self.queries["delete_entities"], params)
+        self.run(DELETE_KB_DOCUMENTS_QUERY, params)
+        logging.info(f"已删除知识库 {kb_uuid} 的图谱")
+
+    def get_graph_info(self, vec_list, kb_uuid=None):
         """
         :param vec_list:
         :return:
@@ -73,25 +138,58 @@ class Neo4jWorker:
             ]
         """
         id_list = [vec[0] for vec in vec_list]
-        query = """
-        MATCH (d:Document)-[]->(n) 
-        WHERE d.id IN $id_list 
-        WITH n 
-        MATCH (n)-[r]->(m) 
-        RETURN collect(distinct {
-            source: n.id, 
-            source_labels: labels(n), 
-            target: m.id, 
-            target_labels: labels(m), 
-            rel_type: type(r)
-        }) as relations
-        """
-        result = self.run(query, {"id_list": id_list})
+        result = self.run(self.queries["graph_info"], {"id_list": id_list, "kb_uuid": kb_uuid})
         return result[0]['relations']
 
+    def get_seed_entities(self, id_list, kb_uuid=None):
+        """
+        :param id_list: 分块 id 列表
+        :param kb_uuid: 分块所属的知识库(同一分块在不同知识库中是不同的 Document 节点)
+        :return: [{"id": 实体 id, "support": 提及该实体的分块数}]
+        """
+        return self.run(self.queries["seed"], {"id_list": id_list, "kb_uuid": kb_uuid})
+
+    def expand_entities(self, ids, fanout, kb_uuid=None):
+        """
+        从实体向外扩展一跳(不区分方向)，每个实体最多返回 fanout 条关系
+        :return: [{"from_id", "neighbor", "source", "source_labels", "target", "target_labels", "rel_type"}]
+        """
+        return self.run(self.queries["expand"], {"ids": list(ids), "fanout": fanout, "kb_uuid": kb_uuid})
+
+    async def aget_graph_info(self, vec_list, kb_uuid=None):
+        return await get_async_neo4j_reader().get_graph_info(vec_list, kb_uuid)
+
+    async def aget_seed_entities(self, id_list, kb_uuid=None):
+        return await get_async_neo4j_reader().get_seed_entities(id_list, kb_uuid)
+
+    async def aexpand_entities(self, ids, fanout, kb_uuid=None):
+        return await get_async_neo4j_reader().expand_entities(ids, fanout, kb_uuid)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_neo4j_worker() -> Neo4jWorker:
+    """获取进程内共享的 Neo4jWorker，所有请求复用同一个连接池"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = Neo4jWorker()
+            metrics_registry.register("graph_writer", _worker.bulk_writer.metrics)
+        return _worker
+
+
+def close_neo4j_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.close()
+            _worker = None
+
 
 if __name__ == '__main__':
-    worker = Neo4jWorker()
+    worker = get_neo4j_worker()
 
     query = """
     MATCH (d:Document)-[r]->(n)
@@ -121,4 +219,5 @@ if __name__ == '__main__':
             "123"
         )]
 
-    print(json.dumps(worker.get_graph_info(vec_list), indent=4, ensure_ascii=False))
+    print(json.dumps(worker.get_graph_info(vec_list, kb_uuid="276e4a6f-8c00-45cf-b6d3-59304698e320"), indent=4,
+                     ensure_ascii=False))
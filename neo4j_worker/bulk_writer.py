@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import List
+
+from langchain_community.graphs.graph_document import GraphDocument
+
+from config import NEO4J_WRITE_BATCH_SIZE, GRAPH_PARTITION_BY_KB
+from utils import DOCUMENT_SOURCE_KEYS
+from .queries import BASE_ENTITY_LABEL, MERGE_DOCUMENTS_QUERY
+
+# 抽取结果没有类型时使用的节点标签
+DEFAULT_NODE_LABEL = "Entity"
+
+
+def escape_name(name: str) -> str:
+    """转义标签/关系类型名，防止拼接到 Cypher 中时被注入"""
+    return "`" + name.replace("`", "``") + "`"
+
+
+def format_rel_type(rel_type: str) -> str:
+    return rel_type.replace(" ", "_").upper()
+
+
+class GraphBulkWriter:
+    """
+    图文档批量写入器。
+
+    节点按标签分组、关系按(起点标签, 关系类型, 终点标签)分组，
+    每组参数按 batch_size 切分后用 UNWIND + MERGE 写入，每批单独提交。
+    实体统一在公共标签 __Entity__ 上按 id MERGE(有唯一约束索引)，再补充类型标签；
+    重试或重复写入同一批数据不会产生重复节点和关系。
+    Document 按 (kb_uuid, id) MERGE: 分块 id 是内容哈希，同一分块出现在多个知识库时每个知识库各有一个节点。
+    partition_by_kb 为 True 时实体按 (kb_uuid, id) MERGE，每个知识库有自己的实体节点。
+    """
+
+    def __init__(self, worker, batch_size=NEO4J_WRITE_BATCH_SIZE, partition_by_kb=GRAPH_PARTITION_BY_KB):
+        self.worker = worker
+        self.batch_size = batch_size
+        self.partition_by_kb = partition_by_kb
+        self._lock = threading.Lock()
+        self._totals = defaultdict(float)
+
+    def _write_batches(self, query, rows):
+        for i in range(0, len(rows), self.batch_size):
+            self.worker.run_write(query, {"rows": rows[i:i + self.batch_size]})
+            self._totals["batches"] += 1
+
+    def entity_key(self, id_field):
+        """实体 MERGE/MATCH 使用的属性条件"""
+        if self.partition_by_kb:
+            return f"{{kb_uuid: row.kb_uuid, id: row.{id_field}}}"
+        return f"{{id: row.{id_field}}}"
+
+    def write(self, graph_document_list: List[GraphDocument]) -> dict:
+        """
+        写入图文档
+        :param graph_document_list: 图文档列表
+        :return: 本次写入的统计信息
+        """
+        start = time.perf_counter()
+        documents = {}  # (kb_uuid, doc_id) -> properties
+        nodes = defaultdict(dict)  # label -> {(kb_uuid, id): properties}
+        mentions = set()  # {(doc_id, kb_uuid, node_id)}
+        # (source_label, type, target_label) -> {(kb_uuid, source, target): properties}
+        relationships = defaultdict(dict)
+
+        for graph_document in graph_document_list:
+            metadata = graph_document.source.metadata
+            doc_id = metadata.get("id")
+            kb_uuid = metadata.get("kb_uuid")
+            if kb_uuid is None and (self.partition_by_kb or doc_id is not None):
+                raise ValueError("图文档的 metadata 中必须包含 kb_uuid")
+            if doc_id is not None:
+                documents[(kb_uuid, doc_id)] = {key: metadata[key] for key in DOCUMENT_SOURCE_KEYS
+                                                if key in metadata}
+            for node in graph_document.nodes:
+                label = node.type or DEFAULT_NODE_LABEL
+                nodes[label].setdefault((kb_uuid, node.id), {}).update(node.properties or {})
+                if doc_id is not None:
+                    mentions.add((doc_id, kb_uuid, node.id))
+            for rel in graph_document.relationships:
+                key = (rel.source.type or DEFAULT_NODE_LABEL, format_rel_type(rel.type),
+                       rel.target.type or DEFAULT_NODE_LABEL)
+                relationships[key].setdefault((kb_uuid, rel.source.id, rel.target.id), {}).update(
+                    rel.properties or {})
+
+        with self._lock:
+            self._write_batches(
+                MERGE_DOCUMENTS_QUERY,
+                list(documents.values()),
+            )
+            for label, rows in nodes.items():
+                self._write_batches(
+                    f"UNWIND $rows AS row MERGE (n:{BASE_ENTITY_LABEL} {self.entity_key('id')}) "
+                    f"SET n:{escape_name(label)} SET n += row.properties",
+                    [{"kb_uuid": kb_uuid, "id": node_id, "properties": properties}
+                     for (kb_uuid, node_id), properties in rows.items()],
+                )
+            self._write_batches(
+                f"UNWIND $rows AS row MATCH (d:Document {{kb_uuid: row.kb_uuid, id: row.doc_id}}) "
+                f"MATCH (n:{BASE_ENTITY_LABEL} {self.entity_key('node_id')}) "
+                f"MERGE (d)-[:MENTIONS]->(n)",
+                [{"doc_id": doc_id, "kb_uuid": kb_uuid, "node_id": node_id} for doc_id, kb_uuid, node_id in mentions],
+            )
+            for (source_label, rel_type, target_label), rows in relationships.items():
+                self._write_batches(
+                    f"UNWIND $rows AS row "
+                    f"MERGE (s:{BASE_ENTITY_LABEL} {self.entity_key('source')}) SET s:{escape_name(source_label)} "
+                    f"MERGE (t:{BASE_ENTITY_LABEL} {self.entity_key('target')}) SET t:{escape_name(target_label)} "
+                    f"MERGE (s)-[r:{escape_name(rel_type)}]->(t) SET r += row.properties",
+                    [{"kb_uuid": kb_uuid, "source": source, "target": target, "properties": properties}
+                     for (kb_uuid, source, target), properties in rows.items()],
+                )
+
+            seconds = time.perf_counter() - start
+            stats = {
+                "documents": len(documents),
+                "nodes": sum(len(rows) for rows in nodes.values()),
+                "relationships": sum(len(rows) for rows in relationships.values()),
+                "mentions": len(mentions),
+                "seconds": seconds,
+            }
+            for key, value in stats.items():
+                self._totals[key] += value
+
+        stats["nodes_per_second"] = stats["nodes"] / seconds if seconds else 0.0
+        stats["relationships_per_second"] = stats["relationships"] / seconds if seconds else 0.0
+        logging.info(f"批量写入图文档: {stats}")
+        return stats
+
+    def metrics(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        seconds = totals.get("seconds", 0.0)
+        totals["nodes_per_second"] = totals.get("nodes", 0.0) / seconds if seconds else 0.0
+        totals["relationships_per_second"] = totals.get("relationships", 0.0) / seconds if seconds else 0.0
+        return totals
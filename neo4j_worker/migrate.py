@@ -0,0 +1,16 @@
+import sys
+from neo4j_worker import get_neo4j_worker
+
+MIGRATIONS = {
+    '--strip-embeddings': lambda worker: worker.strip_document_embeddings(),
+    '--label-entities': lambda worker: worker.label_entities(),
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or sys.argv[1].lower() not in MIGRATIONS:
+        print("Usage: python -m neo4j_worker.migrate <action>")
+        print("Actions: '--strip-embeddings' to remove embedding properties from existing Document nodes, "
+              "'--label-entities' to add the base entity label to entity nodes created by older versions")
+        sys.exit(1)
+
+    MIGRATIONS[sys.argv[1].lower()](get_neo4j_worker())
@@ -0,0 +1,106 @@
+# 实体节点的公共标签，实体按该标签上的 id 唯一约束 MERGE
+BASE_ENTITY_LABEL = "__Entity__"
+
+# 按知识库分区(GRAPH_PARTITION_BY_KB)时实体的匹配条件，实体按 (kb_uuid, id) 唯一
+KB_SCOPE = " {kb_uuid: $kb_uuid}"
+
+
+# Document 按 (kb_uuid, id) 唯一，分块只在所属知识库内匹配
+def graph_info_query(scope=""):
+    return f"""
+MATCH (d:Document {{kb_uuid: $kb_uuid}})-[:MENTIONS]->(n:{BASE_ENTITY_LABEL}{scope})
+WHERE d.id IN $id_list
+WITH DISTINCT n
+MATCH (n)-[r]->(m:{BASE_ENTITY_LABEL}{scope})
+RETURN collect(distinct {{
+    source: n.id,
+    source_labels: [l IN labels(n) WHERE l <> '{BASE_ENTITY_LABEL}'],
+    target: m.id,
+    target_labels: [l IN labels(m) WHERE l <> '{BASE_ENTITY_LABEL}'],
+    rel_type: type(r)
+}}) as relations
+"""
+
+
+def graph_seed_query(scope=""):
+    return f"""
+MATCH (d:Document {{kb_uuid: $kb_uuid}})-[:MENTIONS]->(n:{BASE_ENTITY_LABEL}{scope})
+WHERE d.id IN $id_list
+RETURN n.id AS id, count(DISTINCT d) AS support
+"""
+
+
+def graph_expand_query(key="{id: node_id}"):
+    return f"""
+UNWIND $ids AS node_id
+MATCH (n:{BASE_ENTITY_LABEL} {key})
+CALL {{
+    WITH n
+    MATCH (n)-[r]-(m:{BASE_ENTITY_LABEL})
+    RETURN r, m
+    LIMIT $fanout
+}}
+WITH n, r, m, startNode(r) AS s, endNode(r) AS t
+RETURN n.id AS from_id,
+       m.id AS neighbor,
+       s.id AS source,
+       [l IN labels(s) WHERE l <> '{BASE_ENTITY_LABEL}'] AS source_labels,
+       t.id AS target,
+       [l IN labels(t) WHERE l <> '{BASE_ENTITY_LABEL}'] AS target_labels,
+       type(r) AS rel_type
+"""
+
+
+# 按分块 id 查询相关实体的一跳关系
+GRAPH_INFO_QUERY = graph_info_query()
+GRAPH_INFO_BY_KB_QUERY = graph_info_query(KB_SCOPE)
+
+# 分块关联的种子实体，support 为提及该实体的分块数
+GRAPH_SEED_QUERY = graph_seed_query()
+GRAPH_SEED_BY_KB_QUERY = graph_seed_query(KB_SCOPE)
+
+# 从一组实体向外扩展一跳，每个实体最多取 $fanout 条关系，超级节点的度数不影响查询耗时
+GRAPH_EXPAND_QUERY = graph_expand_query()
+GRAPH_EXPAND_BY_KB_QUERY = graph_expand_query("{kb_uuid: $kb_uuid, id: node_id}")
+
+# 分批删除只被该知识库引用的实体(需要在自动提交事务中执行)
+DELETE_KB_ENTITIES_QUERY = f"""
+MATCH (d:Document {{kb_uuid: $kb_uuid}})-[:MENTIONS]->(n:{BASE_ENTITY_LABEL})
+WITH DISTINCT n
+WHERE NOT EXISTS {{
+    MATCH (n)<-[:MENTIONS]-(other:Document)
+    WHERE other.kb_uuid <> $kb_uuid
+}}
+CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+# 分区模式下直接按 kb_uuid 索引分批删除实体，不需要检查其他知识库的引用
+DELETE_KB_ENTITIES_BY_KB_QUERY = f"""
+MATCH (n:{BASE_ENTITY_LABEL}{KB_SCOPE})
+CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+# 写入分块节点，同一分块在每个知识库中各有一个节点
+MERGE_DOCUMENTS_QUERY = "UNWIND $rows AS row MERGE (d:Document {kb_uuid: row.kb_uuid, id: row.id}) SET d += row"
+
+# 分批删除知识库的 Document 节点
+DELETE_KB_DOCUMENTS_QUERY = """
+MATCH (d:Document {kb_uuid: $kb_uuid})
+CALL { WITH d DETACH DELETE d } IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+# 是否按知识库分区 -> 使用的查询
+QUERIES = {
+    False: {
+        "graph_info": GRAPH_INFO_QUERY,
+        "seed": GRAPH_SEED_QUERY,
+        "expand": GRAPH_EXPAND_QUERY,
+        "delete_entities": DELETE_KB_ENTITIES_QUERY,
+    },
+    True: {
+        "graph_info": GRAPH_INFO_BY_KB_QUERY,
+        "seed": GRAPH_SEED_BY_KB_QUERY,
+        "expand": GRAPH_EXPAND_BY_KB_QUERY,
+        "delete_entities": DELETE_KB_ENTITIES_BY_KB_QUERY,
+    },
+}
@@ -0,0 +1,127 @@
+import logging
+
+from config import GRAPH_PARTITION_BY_KB
+from .queries import BASE_ENTITY_LABEL, QUERIES, DELETE_KB_DOCUMENTS_QUERY, MERGE_DOCUMENTS_QUERY
+
+# (名称, 标签, 属性, 是否唯一)，属性为元组时是组合索引/约束
+# Document 的 id 是分块内容的哈希，同一分块可以属于多个知识库，因此按 (kb_uuid, id) 唯一
+SCHEMA_ITEMS = [
+    ("document_kb_id", "Document", ("kb_uuid", "id"), True),
+    ("document_kb_uuid", "Document", "kb_uuid", False),
+    ("entity_id", BASE_ENTITY_LABEL, "id", True),
+]
+
+# 按知识库分区时实体按 (kb_uuid, id) 唯一，同一个 id 可以在不同知识库中各有一个节点
+PARTITIONED_SCHEMA_ITEMS = [
+    ("document_kb_id", "Document", ("kb_uuid", "id"), True),
+    ("document_kb_uuid", "Document", "kb_uuid", False),
+    ("entity_kb_id", BASE_ENTITY_LABEL, ("kb_uuid", "id"), True),
+    ("entity_kb_uuid", BASE_ENTITY_LABEL, "kb_uuid", False),
+]
+
+
+def diagnostic_queries(partition_by_kb):
+    """需要检查执行计划的查询: 名称 -> (查询, 示例参数)"""
+    queries = QUERIES[partition_by_kb]
+    return {
+        "get_graph_info": (queries["graph_info"], {"id_list": ["_"], "kb_uuid": "_"}),
+        "get_seed_entities": (queries["seed"], {"id_list": ["_"], "kb_uuid": "_"}),
+        "expand_entities": (queries["expand"], {"ids": ["_"], "fanout": 1, "kb_uuid": "_"}),
+        "delete_kb_entities": (queries["delete_entities"], {"kb_uuid": "_", "batch_size": 1}),
+        "delete_kb_documents": (DELETE_KB_DOCUMENTS_QUERY, {"kb_uuid": "_", "batch_size": 1}),
+        "merge_documents": (MERGE_DOCUMENTS_QUERY, {"rows": [{"kb_uuid": "_", "id": "_"}]}),
+    }
+
+
+# 出现在执行计划中说明查询没有走索引
+SLOW_OPERATORS = {"AllNodesScan", "NodeByLabelScan", "DirectedAllRelationshipsScan",
+                  "UndirectedAllRelationshipsScan"}
+
+
+def schema_statement(name, label, prop, unique):
+    props = prop if isinstance(prop, tuple) else (prop,)
+    columns = ", ".join(f"n.{p}" for p in props)
+    if unique:
+        target = f"({columns})" if len(props) > 1 else columns
+        return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE {target} IS UNIQUE"
+    return f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON ({columns})"
+
+
+class GraphSchemaManager:
+    """
+    图数据库索引与约束管理。
+    启动时创建 Document (kb_uuid, id)、Document.kb_uuid 和实体 id(分区模式下为 kb_uuid + id)上的约束/索引，
+    并可检查缺失的索引和不走索引的查询计划。
+    """
+
+    def __init__(self, worker, partition_by_kb=GRAPH_PARTITION_BY_KB):
+        self.worker = worker
+        self.partition_by_kb = partition_by_kb
+        self.items = PARTITIONED_SCHEMA_ITEMS if partition_by_kb else SCHEMA_ITEMS
+
+    def ensure_schema(self):
+        """
+        创建缺失的约束和索引(幂等)
+        :return: 创建失败的项 {名称: 错误信息}
+        """
+        errors = {}
+        # 旧版本的全局 Document.id 唯一约束会让不同知识库的同一分块冲突
+        self.worker.run("DROP CONSTRAINT document_id IF EXISTS")
+        if self.partition_by_kb:
+            # 全局的实体 id 唯一约束与分区冲突(不同知识库可以有同名实体)
+            self.worker.run("DROP CONSTRAINT entity_id IF EXISTS")
+        for name, label, prop, unique in self.items:
+            try:
+                self.worker.run(schema_statement(name, label, prop, unique))
+            except Exception as e:
+                # 已有数据违反唯一约束时创建会失败，不影响服务启动
+                logging.error(f"创建图数据库约束/索引 {name} 失败: {e}")
+                errors[name] = str(e)
+        logging.info("图数据库约束与索引检查完成")
+        return errors
+
+    def missing_indexes(self):
+        """
+        :return: 缺失或未就绪的索引 [{"name", "label", "property", "state"}]
+        """
+        indexes = self.worker.run(
+            "SHOW INDEXES YIELD labelsOrTypes, properties, state "
+            "RETURN labelsOrTypes, properties, state"
+        )
+        states = {}
+        for index in indexes:
+            for label in index["labelsOrTypes"] or []:
+                if index["properties"]:
+                    states[(label, tuple(index["properties"]))] = index["state"]
+        missing = []
+        for name, label, prop, _ in self.items:
+            state = states.get((label, prop if isinstance(prop, tuple) else (prop,)))
+            if state != "ONLINE":
+                missing.append({"name": name, "label": label, "property": prop, "state": state})
+        return missing
+
+    def slow_query_plans(self):
+        """
+        EXPLAIN 关键查询，找出包含全量扫描算子的执行计划
+        :return: {查询名称: [算子名称]}
+        """
+        slow = {}
+        for name, (query, params) in diagnostic_queries(self.partition_by_kb).items():
+            plan = self.worker.explain(query, params)
+            operators = set()
+            stack = [plan] if plan else []
+            while stack:
+                node = stack.pop()
+                operator = node.get("operatorType", "").split("@")[0]
+                if operator in SLOW_OPERATORS:
+                    operators.add(operator)
+                stack.extend(node.get("children", []))
+            if operators:
+                slow[name] = sorted(operators)
+        return slow
+
+    def diagnose(self):
+        report = {"missing_indexes": self.missing_indexes(), "slow_query_plans": self.slow_query_plans()}
+        if report["missing_indexes"] or report["slow_query_plans"]:
+            logging.warning(f"图数据库索引诊断: {report}")
+        return report
@@ -73,3 +73,12 @@ GRAPH_CHAT_PROMPT = f"""
     生成的回答：“区块链采用分布式账本技术，每个区块包含多个交易记录，并通过加密算法确保数据的不可篡改。一旦数据被写入区块链，就几乎无法被篡改，因为任何对数据的修改都需要同时改变后续所有区块的信息，这在计算上是极其困难的。因此，区块链技术能够有效地保证数据的安全性和完整性。”
 - Knowlege Graph:{{graph}}
 """
+
+COMMUNITY_SUMMARY_PROMPT = f"""
+- Role: 知识图谱分析专家
+- Background: 知识图谱已按社区划分，每个社区是一组联系紧密的实体及其关系，需要为社区生成摘要，用于回答关于知识库整体的全局性问题。
+- Goals: 根据给出的社区内的实体关系，概括该社区的主题、核心实体以及它们之间的主要联系。
+- Constrains: 摘要只能基于给出的关系，不要编造信息；使用与关系相同的语言，控制在200字以内。
+- OutputFormat: 第一行为社区主题(一句话)，随后是一段摘要正文。
+- Relations:{{triples}}
+"""
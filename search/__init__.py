@@ -1 +1,2 @@
 from .duckduckgo import SearchHelper
+from .fetcher import UrlFetcher, get_url_fetcher, close_url_fetcher
@@ -1,14 +1,8 @@
-import json
+import asyncio
 
-import requests
 from langchain_community.tools import DuckDuckGoSearchRun, DuckDuckGoSearchResults
 from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import concurrent
-from config import NUMEXPR_MAX_THREADS
-import logging
-from utils import strip_tags
-from config import MAX_INPUT_LENGTH
+from .fetcher import UrlFetcher, get_url_fetcher
 
 class SearchHelper:
     def __init__(self, region="wt-wt", time="d", max_results=5):
@@ -31,51 +25,28 @@ class SearchHelper:
         result = self.search_run.invoke(question)
         return result
 
-    def get_info_from_url(self, url_list):
+    async def aget_info_from_url(self, url_list):
         """
-        多线程爬取URL页面内容
+        异步并发爬取URL页面内容，使用共享的连接池(见 search.fetcher)
         :param url_list: URL列表
-        :param max_workers: 最大线程数，默认为5
-        :return: 页面内容列表
+        :return: 页面内容列表 [{"url", "content"}]，请求失败的页面 content 为 None
         """
-        content_list = []
+        return await get_url_fetcher().fetch_all(url_list)
 
-        def search_by_url(url):
-            """
-            通过URL获取页面内容
-            :param url: 页面URL
-            :return: 页面内容
-            """
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-            }
-            logging.info(f"正在爬取{url}...")
+    def get_info_from_url(self, url_list):
+        """
+        爬取URL页面内容(同步接口，供脚本使用，服务中请使用 aget_info_from_url)
+        :param url_list: URL列表
+        :return: 页面内容列表 [{"url", "content"}]，请求失败的页面 content 为 None
+        """
+        async def run():
+            fetcher = UrlFetcher()
             try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()  # 如果请求失败，抛出HTTPError异常
-                return response.text
-            except Exception as e:
-                return f"{url} 请求出错：{e}"
-
-        with ThreadPoolExecutor(max_workers=NUMEXPR_MAX_THREADS) as executor:  # 创建线程池
-            future_to_url = {executor.submit(search_by_url, url): url for url in url_list}  # 提交任务到线程池
-            for future in as_completed(future_to_url):  # 获取任务结果
-                url = future_to_url[future]
-                content = future.result()  # 获取任务返回的结果
-                striped_content = strip_tags(content)
-                if "请求出错" in content:
-                    logging.error(content)
-                    content_list.append({"url": url, "content": None})
-                else:
-                    if len(striped_content) > MAX_INPUT_LENGTH:
-                        logging.warning(
-                            f"{url} 内容过长，长度为{len(striped_content)}，超过{MAX_INPUT_LENGTH}字符限制，取前{MAX_INPUT_LENGTH}字符"
-                        )
-                        content_list.append({"url": url, "content": striped_content[:MAX_INPUT_LENGTH]})
-                    else:
-                        content_list.append({"url": url, "content": striped_content})  # 将结果保存到列表中
+                return await fetcher.fetch_all(url_list)
+            finally:
+                await fetcher.close()
 
-        return content_list
+        return asyncio.run(run())
 
     def search_detailed_results(self, query):
         """
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import (MAX_INPUT_LENGTH, FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT, FETCH_TOTAL_TIMEOUT,
+                    FETCH_MAX_PER_HOST, FETCH_MAX_CONNECTIONS, FETCH_MAX_BYTES, PAGE_CACHE_ENABLED,
+                    PAGE_CACHE_MAX_STALE)
+from utils import metrics_registry
+from .page_cache import PageCache
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/58.0.3029.110 Safari/537.3')
+
+# 按文本解析的内容类型
+TEXT_CONTENT_TYPES = ("text/", "application/xhtml+xml", "application/xml", "application/json")
+
+
+class HtmlTextExtractor(HTMLParser):
+    """
+    增量提取 HTML 中的文本(跳过 <script> 和 <style>)，与 utils.strip_tags 的结果一致，
+    可以边下载边解析，文本足够时即可停止下载。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.length = 0  # 合并空白后的文本长度(近似)
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+            self.length += len(re.sub(r'\s+', ' ', data))
+
+    def text(self):
+        return re.sub(r'\s+', ' ', "".join(self.parts)).strip()
+
+
+class UrlFetcher:
+    """
+    异步网页抓取: 共享 httpx 连接池，每个域名的并发数受 FETCH_MAX_PER_HOST 限制，
+    连接、读取和单个 URL 的总耗时都有超时；流式读取，提取到 max_chars 个字符或下载超过 max_bytes 时提前结束。
+    传入 cache(PageCache) 时，TTL 内的页面直接从缓存返回，过期后发起条件请求校验；
+    校验遇到 5xx、网络错误或超时时，过期不超过 max_stale 秒的缓存仍可使用，遇到 4xx 时删除缓存。
+    """
+
+    def __init__(self, max_chars=MAX_INPUT_LENGTH, max_bytes=FETCH_MAX_BYTES, total_timeout=FETCH_TOTAL_TIMEOUT,
+                 max_per_host=FETCH_MAX_PER_HOST, cache=None, max_stale=PAGE_CACHE_MAX_STALE):
+        self.max_chars = max_chars
+        self.cache = cache
+        self.max_stale = max_stale
+        self.max_bytes = max_bytes
+        self.total_timeout = total_timeout
+        self.max_per_host = max_per_host
+        self._client = None
+        self._hosts = {}  # 域名 -> [信号量, 使用中的请求数]
+        self._stats = {"requests": 0, "errors": 0, "timeouts": 0, "cut_off": 0, "stale": 0, "bytes": 0}
+
+    @property
+    def client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=FETCH_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(FETCH_READ_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+            )
+        return self._client
+
+    async def _read(self, url, cached=None):
+        """
+        :return: (文本, 响应头)，带 cached 的条件请求返回 304 时文本为 None
+        """
+        headers = cached.validators() if cached is not None else {}
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and cached is not None:
+                return None, response.headers
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "text/html").lower()
+            if not content_type.startswith(TEXT_CONTENT_TYPES):
+                raise Exception(f"不支持的内容类型: {content_type}")
+            extractor = HtmlTextExtractor()
+            try:
+                async for text in response.aiter_text():
+                    extractor.feed(text)
+                    if extractor.length >= self.max_chars or response.num_bytes_downloaded >= self.max_bytes:
+                        # 退出 stream 上下文时关闭连接，不再下载剩余内容
+                        self._stats["cut_off"] += 1
+                        break
+            finally:
+                self._stats["bytes"] += response.num_bytes_downloaded
+            extractor.close()
+            return extractor.text(), response.headers
+
+    async def _cache_call(self, fn, *args):
+        # 有磁盘层时缓存读写放到线程中，避免阻塞事件循环
+        if self.cache.disk is not None:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def fetch_text(self, url):
+        """
+        获取页面的文本内容(最多 max_chars 个字符)，请求失败或超时时抛出异常
+        """
+        cached = None
+        if self.cache is not None:
+            cached = await self._cache_call(self.cache.get, url, self.max_chars)
+            if cached is not None and cached.is_fresh(self.cache.ttl):
+                return cached.text[:self.max_chars]
+
+        host = urlsplit(url).netloc
+        entry = self._hosts.setdefault(host, [asyncio.Semaphore(self.max_per_host), 0])
+        entry[1] += 1
+        self._stats["requests"] += 1
+        logging.info(f"正在爬取{url}...")
+        try:
+            async with entry[0]:
+                text, headers = await asyncio.wait_for(self._read(url, cached), self.total_timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            if self._can_serve_stale(cached):
+                return self._stale(cached, f"超过 {self.total_timeout}s 未完成")
+            raise Exception(f"超过 {self.total_timeout}s 未完成")
+        except httpx.HTTPStatusError as e:
+            self._stats["errors"] += 1
+            status = e.response.status_code
+            if cached is not None and 400 <= status < 500:
+                # 页面已不存在或无权访问，缓存不再有效
+                await self._cache_call(self.cache.evict, url)
+            elif status >= 500 and self._can_serve_stale(cached):
+                return self._stale(cached, e)
+            raise
+        except httpx.TransportError as e:
+            self._stats["errors"] += 1
+            if self._can_serve_stale(cached):
+                return self._stale(cached, e)
+            raise
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._hosts[host]
+
+        if text is None:
+            # 304: 页面未变化，沿用缓存的文本
+            await self._cache_call(self.cache.revalidated, cached, headers)
+            return cached.text[:self.max_chars]
+        if len(text) > self.max_chars:
+            logging.warning(f"{url} 内容过长，超过{self.max_chars}字符限制，取前{self.max_chars}字符")
+            text = text[:self.max_chars]
+        if self.cache is not None:
+            await self._cache_call(self.cache.put, url, text, headers, self.max_chars)
+        return text
+
+    def _can_serve_stale(self, cached):
+        return cached is not None and cached.is_fresh(self.cache.ttl + self.max_stale)
+
+    def _stale(self, cached, error):
+        # 源站暂时不可用(stale-if-error)时沿用过期的缓存，比返回空内容更有用
+        self._stats["stale"] += 1
+        logging.warning(f"{cached.url} 缓存校验失败，使用过期的缓存: {error}")
+        return cached.text[:self.max_chars]
+
+    async def fetch_all(self, url_list):
+        """
+        并发获取多个页面
+        :return: [{"url", "content"}]，与 url_list 顺序一致，失败的页面 content 为 None
+        """
+        results = await asyncio.gather(*(self.fetch_text(url) for url in url_list), return_exceptions=True)
+        content_list = []
+        for url, result in zip(url_list, results):
+            if isinstance(result, Exception):
+                logging.error(f"{url} 请求出错：{result}")
+                content_list.append({"url": url, "content": None})
+            else:
+                content_list.append({"url": url, "content": result})
+        return content_list
+
+    def metrics(self):
+        return {"hosts_in_flight": len(self._hosts), **self._stats}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_fetcher = None
+
+
+def get_url_fetcher() -> UrlFetcher:
+    """获取进程内共享的网页抓取器，需在服务的事件循环中调用(连接池与创建时的事件循环绑定)"""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = UrlFetcher(cache=PageCache() if PAGE_CACHE_ENABLED else None)
+        metrics_registry.register("url_fetcher", _fetcher.metrics)
+        if _fetcher.cache is not None:
+            metrics_registry.register("page_cache", _fetcher.cache.metrics)
+    return _fetcher
+
+
+async def close_url_fetcher():
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
+        metrics_registry.unregister("url_fetcher")
+        metrics_registry.unregister("page_cache")
+        logging.info("网页抓取连接池已关闭")
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import (PAGE_CACHE_TTL, PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_PATH, PAGE_CACHE_MAX_DISK_BYTES)
+
+
+class CachedPage:
+    """缓存的页面: 提取后的文本和用于条件请求的 ETag / Last-Modified"""
+
+    __slots__ = ("url", "text", "etag", "last_modified", "fetched_at", "max_chars")
+
+    def __init__(self, url, text, etag=None, last_modified=None, fetched_at=None, max_chars=0):
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.max_chars = max_chars
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+    def validators(self):
+        """条件请求头，没有 ETag 和 Last-Modified 时为空"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DiskTier:
+    """
+    页面缓存的磁盘层: 每个 URL 一个 JSON 文件，总大小超过 max_bytes 时按最近使用时间淘汰
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()  # 文件名 -> 大小，最久未使用的在前
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        entries = []
+        for name in os.listdir(path):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(path, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self._bytes += size
+
+    @staticmethod
+    def _name(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json"
+
+    def get(self, url):
+        name = self._name(url)
+        with self._lock:
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+        file_path = os.path.join(self.path, name)
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(file_path)
+        except (OSError, ValueError) as e:
+            logging.warning(f"页面缓存文件读取失败 {file_path}: {e}")
+            self._remove(name)
+            return None
+        if data.get("url") != url:
+            return None
+        return CachedPage(**data)
+
+    def put(self, page):
+        name = self._name(page.url)
+        file_path = os.path.join(self.path, name)
+        data = json.dumps(page.to_dict(), ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return 0
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+
+        evicted = []
+        with self._lock:
+            self._bytes += len(data) - self._files.pop(name, 0)
+            self._files[name] = len(data)
+            while self._bytes > self.max_bytes and self._files:
+                old_name, size = self._files.popitem(last=False)
+                self._bytes -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.path, old_name))
+            except OSError:
+                pass
+        return len(evicted)
+
+    def remove(self, url):
+        self._remove(self._name(url))
+
+    def _remove(self, name):
+        with self._lock:
+            self._bytes -= self._files.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.path, name))
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            names = list(self._files)
+            self._files.clear()
+            self._bytes = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+
+    def metrics(self):
+        return {"disk_entries": len(self._files), "disk_bytes": self._bytes}
+
+
+class PageCache:
+    """
+    按 URL 缓存抓取的页面文本。
+
+    TTL 内直接返回缓存，不访问网络也不解析 HTML；过期后由抓取器带 If-None-Match / If-Modified-Since
+    发起条件请求，源站返回 304 时刷新时间并继续使用缓存文本。
+    内存层按 LRU 保留 max_entries 个页面，磁盘层(path 非空时)按总大小 max_disk_bytes 淘汰，重启后仍可用。
+    """
+
+    def __init__(self, ttl=PAGE_CACHE_TTL, max_entries=PAGE_CACHE_MAX_ENTRIES, path=PAGE_CACHE_PATH,
+                 max_disk_bytes=PAGE_CACHE_MAX_DISK_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskTier(path, max_disk_bytes) if path else None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "revalidated": 0, "stores": 0,
+                       "evictions": 0}
+
+    def get(self, url, max_chars=0):
+        """
+        获取缓存的页面(可能已过期，调用方用 is_fresh 判断)，缓存的文本短于 max_chars 时视为未命中
+        """
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None:
+                self._pages.move_to_end(url)
+        source = "memory_hits"
+        if page is None and self.disk is not None:
+            page = self.disk.get(url)
+            source = "disk_hits"
+            if page is not None:
+                self._remember(page)
+        if page is None or page.max_chars < max_chars:
+            self._stats["misses"] += 1
+            return None
+        self._stats[source] += 1
+        return page
+
+    def put(self, url, text, headers, max_chars=0):
+        """
+        缓存页面文本，headers 为响应头；响应带 Cache-Control: no-store 时不缓存
+        """
+        if "no-store" in headers.get("cache-control", "").lower():
+            return None
+        page = CachedPage(url, text, headers.get("etag"), headers.get("last-modified"), max_chars=max_chars)
+        self._store(page)
+        return page
+
+    def revalidated(self, page, headers):
+        """条件请求返回 304 后调用: 更新校验信息并重新开始计算 TTL"""
+        page.etag = headers.get("etag") or page.etag
+        page.last_modified = headers.get("last-modified") or page.last_modified
+        page.fetched_at = time.time()
+        self._stats["revalidated"] += 1
+        self._store(page)
+
+    def evict(self, url):
+        """删除页面的缓存(源站返回 4xx 时调用)"""
+        with self._lock:
+            removed = self._pages.pop(url, None) is not None
+        if self.disk is not None:
+            self.disk.remove(url)
+        if removed:
+            self._stats["evictions"] += 1
+
+    def _store(self, page):
+        self._remember(page)
+        self._stats["stores"] += 1
+        if self.disk is not None:
+            try:
+                self._stats["evictions"] += self.disk.put(page)
+            except OSError as e:
+                logging.warning(f"页面缓存写入磁盘失败 {page.url}: {e}")
+
+    def _remember(self, page):
+        with self._lock:
+            self._pages[page.url] = page
+            self._pages.move_to_end(page.url)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def metrics(self):
+        metrics = {"entries": len(self._pages), **self._stats}
+        if self.disk is not None:
+            metrics.update(self.disk.metrics())
+        return metrics
@@ -0,0 +1,29 @@
+import threading
+
+from config import SEMANTIC_CACHE_ENABLED
+from utils import metrics_registry
+from .cache import SemanticCache, cache_key
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """
+    获取进程内共享的语义回复缓存，未开启 SEMANTIC_CACHE_ENABLED 时返回 None
+    """
+    global _cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+            metrics_registry.register("semantic_cache", _cache.metrics)
+        return _cache
+
+
+def invalidate_semantic_cache(kb_uuid):
+    """知识库的向量或图谱变化后调用，使该知识库的缓存回复失效"""
+    cache = get_semantic_cache()
+    if cache is not None:
+        cache.invalidate(kb_uuid)
@@ -0,0 +1,136 @@
+import hashlib
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_THRESHOLD,
+                    SSE_COALESCE_MAX_CHARS)
+
+
+def _digest(value):
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+def cache_key(endpoint, kb_uuid, model_name, prompt_template, context_ids=(), history=None):
+    """
+    缓存键，只有键完全相同的请求之间才按问题向量的相似度匹配
+    :param endpoint: 接口名称
+    :param kb_uuid: 知识库 UUID，普通对话为 None
+    :param model_name: 模型名称
+    :param prompt_template: 提示词模板(普通对话为系统提示)
+    :param context_ids: 检索到的分块 id 或图谱三元组
+    :param history: 对话历史
+    """
+    return (endpoint, kb_uuid, model_name, _digest(prompt_template), _digest(list(context_ids)),
+            _digest(history or []))
+
+
+class SemanticCache:
+    """
+    语义回复缓存: 键相同且问题向量的余弦相似度不低于阈值时复用之前完整生成的回复。
+    条目按 TTL 过期，总数超过上限时按 LRU 淘汰；知识库重新向量化时按 kb_uuid 失效。
+    """
+
+    def __init__(self, max_entries=SEMANTIC_CACHE_MAX_ENTRIES, ttl=SEMANTIC_CACHE_TTL,
+                 threshold=SEMANTIC_CACHE_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()  # 条目编号 -> (键, 归一化向量, 回复, 过期时间)，按最近使用排序
+        self._buckets = {}  # 键 -> [条目编号]
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _remove(self, entry_id):
+        key = self._entries.pop(entry_id)[0]
+        bucket = self._buckets[key]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._buckets[key]
+
+    def get(self, key, vector):
+        """
+        :return: 最相似且未过期的缓存回复，没有时返回 None
+        """
+        query = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id in list(self._buckets.get(key, ())):
+                _, cached_vector, _, expires_at = self._entries[entry_id]
+                if expires_at <= now:
+                    self._remove(entry_id)
+                    self._stats["expirations"] += 1
+                    continue
+                score = float(cached_vector @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self._stats["hits"] += 1
+            return self._entries[best_id][2]
+
+    def put(self, key, vector, response):
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (key, self._normalize(vector), response, time.monotonic() + self.ttl)
+            self._buckets.setdefault(key, []).append(entry_id)
+            self._stats["puts"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, kb_uuid):
+        """删除该知识库的全部缓存条目"""
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items() if entry[0][1] == kb_uuid]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self._stats["invalidations"] += len(stale)
+        if stale:
+            logging.info(f"知识库 {kb_uuid} 的语义缓存已失效, 条目数: {len(stale)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    async def stream(self, key, vector, produce):
+        """
+        命中时按片段回放缓存的回复，未命中时调用 produce() 获取大模型的流式回复，
+        完整输出结束后写入缓存(中途出错或客户端断开时不写入)
+        :param produce: 无参回调，返回文本增量的异步迭代器
+        """
+        response = self.get(key, vector)
+        if response is not None:
+            logging.info(f"语义缓存命中: {key[0]}")
+            for start in range(0, len(response), SSE_COALESCE_MAX_CHARS):
+                yield response[start:start + SSE_COALESCE_MAX_CHARS]
+            return
+
+        parts = []
+        async for delta in produce():
+            parts.append(delta)
+            yield delta
+        self.put(key, vector, "".join(parts))
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {"entries": len(self._entries), "keys": len(self._buckets),
+                    "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0, **self._stats}
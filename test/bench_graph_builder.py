@@ -0,0 +1,150 @@
+"""
+图谱抽取吞吐基准测试，使用离线的 FakeGraphChatModel，不依赖真实服务商。
+
+用法:
+    python test/bench_graph_builder.py --sizes 100 1000 10000 --latency 0.01
+    python test/bench_graph_builder.py --mode text --target transformer
+
+统计每种规模下的 分块/秒、峰值内存，以及解析(_convert_to_graph_document、json_repair)耗时。
+create_graph_kb 默认写入空实现，--store neo4j 写入配置中的 Neo4j，--store embedded 写入嵌入式图存储。
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_repair
+from langchain_core.documents import Document
+
+import graph.builder as builder
+from chat_openai import FakeGraphChatModel
+from graph import LLMGraphTransformer
+
+
+class ParseTimer:
+    """累计解析函数耗时(多线程安全)"""
+
+    def __init__(self):
+        self.seconds = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+
+        return timed
+
+
+class NullGraphWorker:
+    """丢弃写入的图存储，用于只测量构建流程本身"""
+
+    def save_graph_documents(self, graph_document_list):
+        pass
+
+    def flush(self, kb_uuid):
+        pass
+
+    def delete_by_uuid(self, kb_uuid):
+        pass
+
+
+def make_documents(n):
+    return [Document(page_content=f"chunk {i}: 这是第 {i} 个用于基准测试的文本分块。" * 4,
+                     metadata={"id": str(i)})
+            for i in range(n)]
+
+
+def make_llm(args):
+    return FakeGraphChatModel(latency=args.latency, relations_per_chunk=args.relations,
+                              function_call=args.mode == "function", parsed=False)
+
+
+def run_transformer(args, n):
+    transformer = LLMGraphTransformer(llm=make_llm(args), strict_mode=False)
+    docs = make_documents(n)
+    start = time.perf_counter()
+    res = transformer.convert_to_graph_documents(docs)
+    return time.perf_counter() - start, sum(len(r.relationships) for r in res)
+
+
+def run_create_graph_kb(args, n):
+    import knowledge_base.base as kb_module
+    from knowledge_base import KnowledgeBase
+
+    if args.store == "null":
+        kb_module.get_graph_backend = NullGraphWorker
+    elif args.store == "embedded":
+        from graph_store import EmbeddedGraphBackend
+        backend = EmbeddedGraphBackend()
+        kb_module.get_graph_backend = lambda: backend
+    kb = KnowledgeBase()
+    kb_uuid = kb.create_kb(f"bench_{n}", "graph builder benchmark")
+    try:
+        vecs_path = kb.get_vecs_path(kb_uuid)
+        with open(vecs_path, 'w', encoding='utf-8') as f:
+            json.dump([{
+                "id": f"{kb_uuid}_{i}",
+                "text": doc.page_content,
+                "embedding": [0.0] * args.dim,
+                "source_filename": "bench.txt",
+                "file_uuid": "bench",
+                "kb_uuid": kb_uuid,
+            } for i, doc in enumerate(make_documents(n))], f, ensure_ascii=False)
+        start = time.perf_counter()
+        kb.create_graph_kb("fake", kb_uuid)
+        return time.perf_counter() - start, None
+    finally:
+        kb_module.get_graph_backend().delete_by_uuid(kb_uuid)
+        kb.delete_kb(kb_uuid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图谱抽取吞吐基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--target", choices=["transformer", "kb", "all"], default="all")
+    parser.add_argument("--mode", choices=["function", "text"], default="function",
+                        help="function: with_structured_output 模式; text: 纯文本 JSON 模式")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟的单次调用延迟(秒)")
+    parser.add_argument("--relations", type=int, default=5, help="每个分块输出的关系数量")
+    parser.add_argument("--dim", type=int, default=384, help="模拟向量维度")
+    parser.add_argument("--store", choices=["null", "neo4j", "embedded"], default="null",
+                        help="create_graph_kb 写入的图存储")
+    args = parser.parse_args()
+
+    timer = ParseTimer()
+    builder._convert_to_graph_document = timer.wrap("_convert_to_graph_document",
+                                                    builder._convert_to_graph_document)
+    json_repair.loads = timer.wrap("json_repair", json_repair.loads)
+
+    targets = {"transformer": run_transformer, "kb": run_create_graph_kb}
+    names = list(targets) if args.target == "all" else [args.target]
+    print(f"mode={args.mode} latency={args.latency}s relations={args.relations} pid={os.getpid()}")
+    print(f"{'target':<12}{'chunks':>8}{'chunks/s':>12}{'peak MB':>10}"
+          f"{'convert s':>11}{'repair s':>10}{'total s':>10}")
+    for name in names:
+        for n in args.sizes:
+            # tracemalloc 会显著拖慢多线程抽取，吞吐和峰值内存分两次测量
+            tracemalloc.start()
+            targets[name](args, n)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            timer.seconds = {}
+            elapsed, _ = targets[name](args, n)
+            print(f"{name:<12}{n:>8}{n / elapsed:>12.1f}{peak / 2 ** 20:>10.1f}"
+                  f"{timer.seconds.get('_convert_to_graph_document', 0.0):>11.3f}"
+                  f"{timer.seconds.get('json_repair', 0.0):>10.3f}{elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+服务商路由与对冲请求的基准测试，使用本地的 FakeAI 模拟长尾延迟和错误，不访问网络。
+
+用法:
+    python test/bench_llm_router.py --requests 500 --concurrency 20 --tail-rate 0.05
+
+对比 单个服务商 / 路由不对冲 / 路由并对冲 三种情况下首 token 延迟(TTFT)的 p50、p95、p99。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from llms import FakeAI, LLMRouter
+
+
+def make_providers(args):
+    return {
+        "fast": FakeAI(ttft=args.ttft, tail_ttft=args.tail_ttft, tail_rate=args.tail_rate,
+                       error_rate=args.error_rate, n_tokens=args.tokens, seed=1),
+        "slow": FakeAI(ttft=args.ttft * 2, tail_ttft=args.tail_ttft, tail_rate=args.tail_rate,
+                       error_rate=args.error_rate, n_tokens=args.tokens, seed=2),
+    }
+
+
+async def one(llm, i):
+    start = time.perf_counter()
+    ttft = None
+    try:
+        async for _ in llm.get_response("", f"q{i}", stream=True):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+    except Exception:
+        return None
+    return ttft
+
+
+async def run(llm, n_requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            return await one(llm, i)
+
+    results = await asyncio.gather(*(limited(i) for i in range(n_requests)))
+    ttfts = [t for t in results if t is not None]
+    return ttfts, n_requests - len(ttfts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务商路由与对冲请求基准测试")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ttft", type=float, default=0.05, help="正常首 token 延迟(秒)")
+    parser.add_argument("--tail-ttft", type=float, default=2.0, help="长尾首 token 延迟(秒)")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="长尾比例")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    cases = {
+        "single": lambda: make_providers(args)["fast"],
+        "router": lambda: LLMRouter(make_providers(args), hedge=False),
+        "hedged": lambda: LLMRouter(make_providers(args), hedge=True, hedge_min_delay=args.ttft),
+    }
+    for name, factory in cases.items():
+        llm = factory()
+        ttfts, failed = asyncio.run(run(llm, args.requests, args.concurrency))
+        p50, p95, p99 = np.percentile(ttfts, [50, 95, 99]) if ttfts else (0, 0, 0)
+        extra = {k: v for k, v in llm.counters.items() if v} if isinstance(llm, LLMRouter) else {}
+        print(f"{name:>7}: TTFT p50 {p50:.3f}s, p95 {p95:.3f}s, p99 {p99:.3f}s, 失败 {failed}, {extra}")
+
+
+if __name__ == "__main__":
+    main()
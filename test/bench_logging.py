@@ -0,0 +1,108 @@
+"""
+流式输出日志开销基准测试，模拟多个并发的大模型流，每个 token 记录一条日志，统计 tokens/秒。
+
+用法:
+    python test/bench_logging.py --streams 50 --tokens 2000 2>/dev/null
+
+模式:
+    sync      原来的方式: 根日志记录器直接挂文件和控制台处理器，每个 token 以 INFO 记录
+    queue     队列日志，每个 token 以 DEBUG 记录到 llm.stream 并写出
+    filtered  队列日志，llm.stream 使用默认级别(逐 token 日志被丢弃)
+    off       不记录逐 token 日志
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import LOG_PATH, LOG_CATEGORY_LEVELS
+from utils import get_logging, stop_logging, LLM_STREAM_LOGGER
+from utils.log import logging_metrics
+
+
+def setup_sync_logging():
+    """与改动前的 get_logging 相同: 文件和控制台处理器在调用线程中同步写出"""
+    os.makedirs(LOG_PATH, exist_ok=True)
+    log_file_path = os.path.join(LOG_PATH, datetime.datetime.now().strftime('%Y-%m-%d') + '.log')
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    file_handler = logging.FileHandler(log_file_path, mode='a', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    logger.handlers = [file_handler, stream_handler]
+
+
+async def fake_stream(n_tokens):
+    for i in range(n_tokens):
+        if i % 64 == 0:
+            await asyncio.sleep(0)  # 模拟网络读取时让出事件循环
+        yield f"tok{i} "
+
+
+async def consume(n_tokens, log_token):
+    content_text = ""
+    async for token in fake_stream(n_tokens):
+        content_text += token
+        if log_token:
+            log_token(token)
+    logging.info(f"stream done: {len(content_text)} chars")
+
+
+async def run(streams, tokens, log_token):
+    start = time.perf_counter()
+    await asyncio.gather(*(consume(tokens, log_token) for _ in range(streams)))
+    return time.perf_counter() - start
+
+
+def bench(mode, streams, tokens):
+    stream_logger = logging.getLogger(LLM_STREAM_LOGGER)
+    if mode == "sync":
+        setup_sync_logging()
+        stream_logger.setLevel(logging.NOTSET)
+        log_token = logging.info
+    else:
+        get_logging()
+        if mode == "queue":
+            stream_logger.setLevel(logging.DEBUG)
+        log_token = None if mode == "off" else stream_logger.debug
+
+    elapsed = asyncio.run(run(streams, tokens, log_token))
+    metrics = logging_metrics() if mode != "sync" else {}
+    start = time.perf_counter()
+    stop_logging()
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    drain = time.perf_counter() - start
+    logging.getLogger().handlers = []
+    stream_logger.setLevel(LOG_CATEGORY_LEVELS.get(LLM_STREAM_LOGGER, "NOTSET"))
+    return elapsed, drain, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式输出日志开销基准测试")
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "queue", "filtered", "off"],
+                        default=["sync", "queue", "filtered", "off"])
+    args = parser.parse_args()
+
+    total = args.streams * args.tokens
+    results = []
+    for mode in args.modes:
+        elapsed, drain, metrics = bench(mode, args.streams, args.tokens)
+        results.append((mode, elapsed, drain, metrics))
+
+    for mode, elapsed, drain, metrics in results:
+        print(f"{mode:>8}: {total / elapsed:12.0f} tokens/s, 事件循环耗时 {elapsed:.3f}s, "
+              f"关闭时写出剩余日志 {drain:.3f}s, {metrics}")
+
+
+if __name__ == "__main__":
+    main()
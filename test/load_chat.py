@@ -0,0 +1,166 @@
+"""
+对话接口的端到端压测，按目标并发持续请求 /chat/chat、/chat/rag 或 /chat/graph_rag，
+统计首 token 延迟(TTFT)、帧间延迟、每 token 延迟、总耗时的 p50/p95/p99 以及吞吐。
+只统计大模型回复的帧: 跳过空帧，rag / graph_rag / url_info 在回复之后附加的匹配结果帧不计入。
+
+离线压测时先启动本地模拟服务商，并在 config.py 中把 OPENAI_BASE_URL / KIMI_BASE_URL 指向它:
+    python test/mock_openai_server.py --port 9000
+    python app.py
+    python test/load_chat.py --endpoint chat --concurrency 100 --requests 2000
+    python test/load_chat.py --endpoint rag --kb-uuid <知识库 UUID> --concurrency 50 --duration 60
+
+默认每个请求的问题都不同(避免请求合并和语义缓存命中)，--same-question 时所有请求使用同一个问题。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+from config import SERVER_HOST, SERVER_PORT
+from llms.budget import count_tokens
+
+ENDPOINTS = {
+    "chat": "/chat/chat",
+    "rag": "/chat/rag",
+    "graph_rag": "/chat/graph_rag",
+}
+
+# 大模型回复之后附加的匹配结果以这些标题帧开始(见 app.py)
+TRAILER_HEADERS = {"\n\n## 匹配结果：\n", "\n\n## 匹配实体和关系：\n", "\n\n## 提取URL：\n"}
+
+
+class Result:
+    def __init__(self):
+        self.ttft = None
+        self.total = None
+        self.gaps = []  # 相邻两帧的间隔
+        self.token_gaps = []  # 帧间隔 / 帧内 token 数
+        self.frames = 0
+        self.chars = 0
+        self.error = None
+
+
+def build_payload(args, i):
+    question = args.question if args.same_question else f"{args.question} #{i}"
+    payload = {"model_name": args.model, "user_input": question, "stream": True}
+    if args.endpoint != "chat":
+        payload.update({"kb_uuid": args.kb_uuid, "top_k": args.top_k})
+    if args.endpoint == "graph_rag" and args.graph_mode:
+        payload["graph_mode"] = args.graph_mode
+    return payload
+
+
+async def one(client, url, payload):
+    result = Result()
+    start = time.perf_counter()
+    last = None
+    try:
+        async with client.stream("POST", url, json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                result.error = f"HTTP {response.status_code}"
+                return result
+            in_reply = True
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or not in_reply:
+                    continue
+                now = time.perf_counter()
+                frame = json.loads(line[6:])
+                text = frame.get("data") or ""
+                if frame.get("type") != "response" or "msg" in frame or text in TRAILER_HEADERS:
+                    # 回复结束，之后是附加的匹配结果，只等待响应结束
+                    in_reply = False
+                    continue
+                if not text:
+                    continue
+                if result.ttft is None:
+                    result.ttft = now - start
+                else:
+                    result.gaps.append(now - last)
+                    result.token_gaps.append((now - last) / max(count_tokens(text), 1))
+                last = now
+                result.frames += 1
+                result.chars += len(text)
+    except Exception as e:
+        result.error = type(e).__name__
+    result.total = time.perf_counter() - start
+    return result
+
+
+async def run(args):
+    url = f"{args.base_url.rstrip('/')}{ENDPOINTS[args.endpoint]}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = []
+    counter = iter(range(args.requests if args.requests > 0 else 1 << 62))
+    deadline = time.perf_counter() + args.duration if args.duration > 0 else None
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(args.timeout)) as client:
+        async def worker():
+            for i in counter:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                results.append(await one(client, url, build_payload(args, i)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def percentiles(values):
+    if not values:
+        return "无数据"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50 * 1000:8.1f}ms  p95 {p95 * 1000:8.1f}ms  p99 {p99 * 1000:8.1f}ms"
+
+
+def report(results, elapsed):
+    ok = [r for r in results if r.error is None]
+    errors = {}
+    for r in results:
+        if r.error is not None:
+            errors[r.error] = errors.get(r.error, 0) + 1
+    frames = sum(r.frames for r in ok)
+    chars = sum(r.chars for r in ok)
+    print(f"请求数 {len(results)}, 成功 {len(ok)}, 失败 {len(results) - len(ok)} {errors or ''}")
+    print(f"耗时 {elapsed:.2f}s, 吞吐 {len(ok) / elapsed:.1f} 请求/s, {frames / elapsed:.1f} 帧/s, "
+          f"{chars / elapsed:.0f} 字符/s")
+    print(f"首 token 延迟:  {percentiles([r.ttft for r in ok if r.ttft is not None])}")
+    print(f"帧间延迟:       {percentiles([gap for r in ok for gap in r.gaps])}")
+    print(f"每 token 延迟:  {percentiles([gap for r in ok for gap in r.token_gaps])}")
+    print(f"总耗时:         {percentiles([r.total for r in ok])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对话接口端到端压测")
+    parser.add_argument("--base-url", default=f"http://{SERVER_HOST}:{SERVER_PORT}")
+    parser.add_argument("--endpoint", choices=list(ENDPOINTS), default="chat")
+    parser.add_argument("--model", default="openai", help="model_name 参数")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--requests", type=int, default=500, help="总请求数，0 表示只按 --duration 结束")
+    parser.add_argument("--duration", type=float, default=0, help="最长压测时间(秒)，0 表示不限")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--kb-uuid", default="", help="rag / graph_rag 使用的知识库 UUID")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--graph-mode", default=None)
+    parser.add_argument("--question", default="介绍中国矿业大学")
+    parser.add_argument("--same-question", action="store_true", help="所有请求使用同一个问题")
+    args = parser.parse_args()
+    if args.endpoint != "chat" and not args.kb_uuid:
+        parser.error("--endpoint rag / graph_rag 需要 --kb-uuid")
+    if args.requests <= 0 and args.duration <= 0:
+        parser.error("--requests 和 --duration 至少指定一个")
+
+    results, elapsed = asyncio.run(run(args))
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+本地的 OpenAI 兼容聊天接口(/v1/chat/completions)，用于离线压测，不访问真实服务商。
+
+用法:
+    python test/mock_openai_server.py --port 9000 --ttft 0.3 --token-rate 50 --tokens 200 --error-rate 0.01
+
+然后在 config.py 中把服务商指向它(api_key 可以任意填写):
+    OPENAI_BASE_URL = "http://127.0.0.1:9000/v1"
+    KIMI_BASE_URL = "http://127.0.0.1:9000/v1"
+
+支持流式(SSE)和非流式响应；首 token 延迟按 --tail-rate 的概率放大为 --tail-ttft 模拟长尾，
+按 --error-rate 的概率返回 --error-status 错误。
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+args = None
+app = FastAPI()
+stats = {"requests": 0, "errors": 0, "streams": 0, "tokens": 0}
+
+
+def chunk(completion_id, model, delta, finish_reason=None):
+    data = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return "data: " + json.dumps(data, ensure_ascii=False) + "\n\n"
+
+
+def make_tokens(n_tokens):
+    return [f"模拟回复{i} " for i in range(n_tokens)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "mock")
+    max_tokens = body.get("max_tokens") or args.tokens
+    n_tokens = min(args.tokens, max_tokens)
+    stats["requests"] += 1
+
+    tail = random.random() < args.tail_rate
+    await asyncio.sleep(args.tail_ttft if tail else args.ttft)
+    if random.random() < args.error_rate:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "模拟服务商错误", "type": "server_error"}},
+                            status_code=args.error_status)
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    tokens = make_tokens(n_tokens)
+    if not body.get("stream"):
+        stats["tokens"] += n_tokens
+        await asyncio.sleep(n_tokens / args.token_rate if args.token_rate > 0 else 0)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": n_tokens, "total_tokens": n_tokens},
+        }
+
+    async def generate():
+        stats["streams"] += 1
+        interval = 1 / args.token_rate if args.token_rate > 0 else 0
+        yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+        start = time.perf_counter()
+        for i, token in enumerate(tokens):
+            # 按目标速率发送，不累积 sleep 的误差
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            stats["tokens"] += 1
+            yield chunk(completion_id, model, {"content": token})
+        yield chunk(completion_id, model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    global args
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容聊天接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ttft", type=float, default=0.3, help="首 token 延迟(秒)")
+    parser.add_argument("--tail-ttft", type=float, default=5.0, help="长尾首 token 延迟(秒)")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="长尾比例")
+    parser.add_argument("--token-rate", type=float, default=50, help="每秒输出的 token 数，0 表示不限速")
+    parser.add_argument("--tokens", type=int, default=200, help="每次回复的 token 数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误的比例")
+    parser.add_argument("--error-status", type=int, default=500, help="错误的 HTTP 状态码")
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
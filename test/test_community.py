@@ -0,0 +1,65 @@
+"""
+社区检测的测试，不需要大模型和图数据库。
+
+    python -m pytest test/test_community.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from graph.community import GraphCollector, label_propagation, community_triples
+
+
+def clique(nodes):
+    return [(a, b) for i, a in enumerate(nodes) for b in nodes[i + 1:]]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_two_cliques(seed):
+    # 两个 8 节点团之间只有一条边，应分为两个社区
+    edges = clique(list(range(8))) + clique(list(range(8, 16))) + [(7, 8)]
+    labels = label_propagation(16, edges, seed=seed).tolist()
+    assert labels == [0] * 8 + [1] * 8
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_star(seed):
+    # 星形图的中心和所有叶子属于同一个社区
+    edges = [(0, leaf) for leaf in range(1, 31)]
+    assert set(label_propagation(31, edges, seed=seed).tolist()) == {0}
+
+
+def test_isolated_nodes_keep_own_community():
+    labels = label_propagation(5, [(0, 1), (1, 2), (0, 2)]).tolist()
+    assert labels[0] == labels[1] == labels[2]
+    assert len({labels[0], labels[3], labels[4]}) == 3
+
+
+def make_collector(groups, collect_edges=True):
+    collector = GraphCollector(collect_edges=collect_edges)
+    relationships = []
+    for group in groups:
+        nodes = [Node(id=name, type="Entity") for name in group]
+        relationships += [Relationship(source=a, target=b, type="RELATED") for a, b in clique(nodes)]
+    collector.add([GraphDocument(nodes=[], relationships=relationships, source=Document(page_content=""))])
+    return collector
+
+
+def test_max_communities_keeps_largest():
+    groups = [["a1", "a2", "a3"], ["b1", "b2", "b3", "b4", "b5"], ["c1", "c2", "c3", "c4"]]
+    collector = make_collector(groups)
+    labels = label_propagation(len(collector.entities), [(s, t) for s, _, t in collector.edges])
+    communities = community_triples(collector, labels, min_size=3, max_communities=2)
+    assert [c["size"] for c in communities] == [5, 4]
+    assert all(c["triples"] for c in communities)
+
+
+def test_collector_without_edges():
+    collector = make_collector([["a1", "a2", "a3"]], collect_edges=False)
+    assert list(collector.entities) == ["a1", "a2", "a3"]
+    assert collector.edges == []
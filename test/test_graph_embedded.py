@@ -0,0 +1,78 @@
+"""
+嵌入式图存储的测试，使用临时目录，不需要 Neo4j。
+
+    python -m pytest test/test_graph_embedded.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from graph_store.embedded import EmbeddedGraphBackend
+
+KB_UUID = "kb-test"
+
+
+def make_backend(tmp_path):
+    backend = EmbeddedGraphBackend(base_path=str(tmp_path))
+    cumt = Node(id="中国矿业大学", type="School")
+    xuzhou = Node(id="徐州", type="City")
+    graph_document = GraphDocument(
+        nodes=[cumt, xuzhou],
+        relationships=[Relationship(source=cumt, target=xuzhou, type="located in")],
+        source=Document(page_content="中国矿业大学位于徐州", metadata={"id": "chunk-1", "kb_uuid": KB_UUID}),
+    )
+    backend.save_graph_documents([graph_document])
+    backend.flush(KB_UUID)
+    return backend
+
+
+def test_chunk_with_entities(tmp_path):
+    backend = make_backend(tmp_path)
+    triples = backend.get_graph_info([("chunk-1", 0.9)], kb_uuid=KB_UUID)
+    assert [(t["source"], t["rel_type"], t["target"]) for t in triples] == [("中国矿业大学", "LOCATED_IN", "徐州")]
+
+
+def test_chunk_without_entities(tmp_path):
+    # 没有抽取出实体的分块不会写入图中，查询时应返回空结果而不是报错
+    backend = make_backend(tmp_path)
+    graph = backend.load(KB_UUID)
+    assert graph.entities_of("chunk-empty").tolist() == []
+    assert backend.get_graph_info([("chunk-empty", 0.9)], kb_uuid=KB_UUID) == []
+    assert backend.get_seed_entities(["chunk-empty"], kb_uuid=KB_UUID) == []
+    seeds = backend.get_seed_entities(["chunk-1", "chunk-empty"], kb_uuid=KB_UUID)
+    assert sorted(seed["id"] for seed in seeds) == ["中国矿业大学", "徐州"]
+
+
+def test_append_keeps_existing_graph(tmp_path):
+    backend = make_backend(tmp_path)
+    node = Node(id="江苏", type="Province")
+    backend.save_graph_documents([GraphDocument(
+        nodes=[node], relationships=[],
+        source=Document(page_content="江苏", metadata={"id": "chunk-2", "kb_uuid": KB_UUID}),
+    )])
+    backend.flush(KB_UUID)
+    assert len(backend.get_graph_info([("chunk-1", 0.9)], kb_uuid=KB_UUID)) == 1
+    assert [seed["id"] for seed in backend.get_seed_entities(["chunk-2"], kb_uuid=KB_UUID)] == ["江苏"]
+
+
+def test_rewrite_and_delete(tmp_path):
+    backend = make_backend(tmp_path)
+    old_graph = backend.load(KB_UUID)
+    node = Node(id="江苏", type="Province")
+    backend.save_graph_documents([GraphDocument(
+        nodes=[node], relationships=[],
+        source=Document(page_content="江苏", metadata={"id": "chunk-2", "kb_uuid": KB_UUID}),
+    )])
+    backend.flush(KB_UUID)
+    # 替换后旧目录被删除，缓存换成新图
+    assert sorted(os.listdir(tmp_path)) == [KB_UUID]
+    assert backend.load(KB_UUID) is not old_graph
+
+    backend.delete_by_uuid(KB_UUID)
+    assert os.listdir(tmp_path) == []
+    assert backend.get_graph_info([("chunk-1", 0.9)], kb_uuid=KB_UUID) == []
+    backend.delete_by_uuid(KB_UUID)
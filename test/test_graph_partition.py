@@ -0,0 +1,73 @@
+"""
+两个知识库包含同一个分块(分块 id 相同)时，删除其中一个不应影响另一个。
+嵌入式图存储总会测试；Neo4j 的用例在数据库不可用时跳过。
+
+    python -m pytest test/test_graph_partition.py
+"""
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from langchain_core.documents import Document
+
+from graph_store.embedded import EmbeddedGraphBackend
+
+CHUNK_ID = "chunk-shared"
+
+
+def make_graph_document(kb_uuid):
+    cumt = Node(id="中国矿业大学", type="School")
+    xuzhou = Node(id="徐州", type="City")
+    return GraphDocument(
+        nodes=[cumt, xuzhou],
+        relationships=[Relationship(source=cumt, target=xuzhou, type="located in")],
+        source=Document(page_content="中国矿业大学位于徐州", metadata={"id": CHUNK_ID, "kb_uuid": kb_uuid}),
+    )
+
+
+def make_neo4j_backend(partition_by_kb):
+    from neo4j_worker import Neo4jWorker
+    from neo4j_worker.bulk_writer import GraphBulkWriter
+    from neo4j_worker.queries import QUERIES
+
+    worker = Neo4jWorker()
+    if not worker.health_check()["ok"]:
+        worker.close()
+        pytest.skip("Neo4j 不可用")
+    worker.queries = QUERIES[partition_by_kb]
+    worker.bulk_writer = GraphBulkWriter(worker, partition_by_kb=partition_by_kb)
+    return worker
+
+
+@pytest.fixture(params=["embedded", "neo4j", "neo4j-partitioned"])
+def backend(request, tmp_path):
+    if request.param == "embedded":
+        backend = EmbeddedGraphBackend(base_path=str(tmp_path))
+    else:
+        backend = make_neo4j_backend(request.param == "neo4j-partitioned")
+    yield backend
+    backend.close()
+
+
+def test_delete_kb_sharing_chunk(backend):
+    kb_a, kb_b = f"kb-a-{uuid.uuid4().hex}", f"kb-b-{uuid.uuid4().hex}"
+    try:
+        for kb_uuid in (kb_a, kb_b):
+            backend.save_graph_documents([make_graph_document(kb_uuid)])
+            backend.flush(kb_uuid)
+
+        backend.delete_by_uuid(kb_a)
+
+        assert backend.get_graph_info([(CHUNK_ID, 0.9)], kb_uuid=kb_a) == []
+        assert backend.get_seed_entities([CHUNK_ID], kb_uuid=kb_a) == []
+        triples = backend.get_graph_info([(CHUNK_ID, 0.9)], kb_uuid=kb_b)
+        assert [(t["source"], t["rel_type"], t["target"]) for t in triples] == [("中国矿业大学", "LOCATED_IN", "徐州")]
+        seeds = backend.get_seed_entities([CHUNK_ID], kb_uuid=kb_b)
+        assert sorted(seed["id"] for seed in seeds) == ["中国矿业大学", "徐州"]
+    finally:
+        backend.delete_by_uuid(kb_a)
+        backend.delete_by_uuid(kb_b)
@@ -0,0 +1,49 @@
+"""
+向量索引的测试，使用临时目录。
+
+    python -m pytest test/test_vector_index.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_to_vec.vector_index import VectorIndex, load_vector_index
+
+
+def test_search(tmp_path):
+    path = str(tmp_path / "entities")
+    VectorIndex.build(path, [{"id": "a"}, {"id": "b"}], [[1.0, 0.0], [0.0, 2.0]])
+    results = load_vector_index(path).search([0.0, 1.0], 1)
+    assert [(item["id"], round(score, 6)) for item, score in results] == [("b", 1.0)]
+
+
+def test_empty_index(tmp_path):
+    # 没有实体或社区时仍然保存索引，查询返回空结果而不是报"没有索引"
+    path = str(tmp_path / "communities")
+    VectorIndex.build(path, [], [])
+    index = load_vector_index(path)
+    assert index is not None
+    assert index.search([0.0, 1.0], 5) == []
+
+
+def test_rebuild_switches_version(tmp_path):
+    path = str(tmp_path / "entities")
+    VectorIndex.build(path, [{"id": "a"}], [[1.0, 0.0]])
+    old = load_vector_index(path)
+    VectorIndex.build(path, [{"id": "b"}, {"id": "c"}], [[1.0, 0.0], [0.0, 1.0]])
+    new = load_vector_index(path)
+    assert new is not old
+    assert [item["id"] for item, _ in new.search([0.0, 1.0], 1)] == ["c"]
+    # 只保留当前版本
+    assert sorted(os.listdir(path)) == sorted(["CURRENT", os.path.basename(new.path)])
+
+
+def test_remove(tmp_path):
+    path = str(tmp_path / "entities")
+    VectorIndex.build(path, [{"id": "a"}], [[1.0, 0.0]])
+    assert load_vector_index(path) is not None
+    VectorIndex.remove(path)
+    assert not os.path.exists(path)
+    assert load_vector_index(path) is None
+    VectorIndex.remove(path)
@@ -1 +1,2 @@
-from .loader import DocumentProcessor
\ No newline at end of file
+from .loader import DocumentProcessor
+from .vector_index import VectorIndex, load_vector_index
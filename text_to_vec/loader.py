@@ -117,8 +117,8 @@ class DocumentProcessor:
         logging.info("Cosine similarities calculated")
         return similarities
 
-    def find_top_k_matches(self, user_query, vector_library_path, k=5):
-        user_query_embedding = self.embeddings.embed_query(user_query)
+    def find_top_k_matches(self, user_query, vector_library_path, k=5, query_embedding=None):
+        user_query_embedding = query_embedding if query_embedding is not None else self.embeddings.embed_query(user_query)
         vector_library = self.load_vector_library(vector_library_path)
         similarities = self.calculate_cosine_similarity(user_query_embedding, vector_library)
         top_k_matches = sorted(similarities, key=lambda x: x[2], reverse=True)[:k]
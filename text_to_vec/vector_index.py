@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+_indexes = {}  # 路径 -> (版本, VectorIndex)
+_indexes_lock = threading.Lock()
+
+CURRENT_FILE = "CURRENT"
+
+
+class VectorIndex:
+    """
+    向量索引: 归一化后的 float32 矩阵(.npy，内存映射加载) + 条目列表(.json)。
+    查询时一次矩阵乘法得到全部余弦相似度，再用 argpartition 取前 k 个。
+
+    索引目录下每次构建生成一个版本子目录(vectors.npy + items.json)，CURRENT 文件记录当前版本，
+    构建完成后原子替换 CURRENT，读取方不会拿到新旧混杂的向量和条目，正在使用的旧版本也不会被覆盖。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "items.json"), "r", encoding="utf-8") as f:
+            self.items = json.load(f)
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+
+    @staticmethod
+    def build(path, items, vectors):
+        """
+        保存向量索引
+        :param path: 索引目录，生成新的版本子目录并切换 CURRENT，旧版本随后删除
+        :param items: 与向量一一对应的条目(可 JSON 序列化)
+        :param vectors: 向量列表，items 为空时可为空，保存为空索引
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(len(items), -1) if len(items) else vectors.reshape(0, 0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+        version = str(time.time_ns())
+        tmp_path = os.path.join(path, version + ".tmp")
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "vectors.npy"), vectors)
+        with open(os.path.join(tmp_path, "items.json"), "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(path, version))
+        with open(os.path.join(path, CURRENT_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(os.path.join(path, CURRENT_FILE + ".tmp"), os.path.join(path, CURRENT_FILE))
+
+        evict_vector_index(path)
+        for name in os.listdir(path):
+            if name not in (version, CURRENT_FILE):
+                _remove_tree(os.path.join(path, name))
+
+    @staticmethod
+    def remove(path):
+        """删除索引目录，删除失败(如文件仍被映射)时只记录警告"""
+        evict_vector_index(path)
+        if os.path.exists(path):
+            _remove_tree(path)
+
+    def search(self, query_vector, k):
+        """
+        :return: [(条目, 余弦相似度)]，按相似度降序
+        """
+        if not self.items or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.items[i], float(scores[i])) for i in top]
+
+
+def _remove_tree(path):
+    # Windows 上仍被内存映射的文件无法删除，留到下次构建时再清理
+    def onerror(func, target, exc_info):
+        logging.warning(f"删除向量索引文件失败 {target}: {exc_info[1]}")
+
+    if os.path.isdir(path):
+        shutil.rmtree(path, onerror=onerror)
+    else:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logging.warning(f"删除向量索引文件失败 {path}: {e}")
+
+
+def _current_version(path):
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def evict_vector_index(path):
+    """从缓存中移除索引，释放对内存映射的引用"""
+    with _indexes_lock:
+        _indexes.pop(path, None)
+
+
+def load_vector_index(path):
+    """加载向量索引的当前版本，按版本缓存；索引不存在时返回 None"""
+    for _ in range(3):
+        version = _current_version(path)
+        if version is None:
+            return None
+        with _indexes_lock:
+            cached = _indexes.get(path)
+            if cached and cached[0] == version:
+                return cached[1]
+        try:
+            index = VectorIndex(os.path.join(path, version))
+        except OSError:
+            # 读取 CURRENT 后索引被重新构建，旧版本已删除，重新读取当前版本
+            continue
+        with _indexes_lock:
+            _indexes[path] = (version, index)
+        return index
+    return None
@@ -1 +1,5 @@
-from .utils import *
\ No newline at end of file
+from .utils import *
+from .metrics import metrics_registry
+from .log import get_logging, stop_logging, LLM_STREAM_LOGGER
+from .sse import coalesce_stream, stream_stats
+from .singleflight import SingleFlight, StreamFlight, flight_key
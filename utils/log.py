@@ -0,0 +1,157 @@
+import atexit
+import datetime
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from config import (LOG_PATH, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_QUEUE_RESERVED, LOG_BLOCK_TIMEOUT, LOG_CATEGORY_LEVELS,
+                    LOG_SAMPLE_RATES)
+from .metrics import metrics_registry
+
+# 大模型流式输出逐 token 的日志分类，默认级别下被丢弃，完整回复由各服务商在结束时汇总记录一次
+LLM_STREAM_LOGGER = "llm.stream"
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按日志分类采样，rates 为 分类 -> 保留比例(0~1)，分类匹配自身及其子分类。
+    WARNING 及以上的日志总是保留。
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        # 按分类名长度降序，优先匹配最具体的分类
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.sampled_out = 0
+
+    def _rate(self, name):
+        for category, rate in self.rates:
+            if name == category or name.startswith(category + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    写入有界队列的日志处理器，请求路径不会因为磁盘或控制台变慢而阻塞。
+    队列中超过 size 条时丢弃 WARNING 以下的日志；队列额外为 WARNING 及以上的日志保留 reserved 个位置，
+    保留位置也用满时最多等待 block_timeout 秒，仍然写不进去才丢弃。丢弃数按级别计数。
+    """
+
+    def __init__(self, size=LOG_QUEUE_SIZE, reserved=LOG_QUEUE_RESERVED, block_timeout=LOG_BLOCK_TIMEOUT):
+        super().__init__(queue.Queue(size + reserved))
+        self.size = size
+        self.block_timeout = block_timeout
+        self.enqueued = 0
+        self.dropped = {}  # 级别名 -> 丢弃数
+
+    def prepare(self, record):
+        # 只合并消息参数、格式化异常，其余格式化留给监听线程；根记录器只有这一个处理器，不需要复制记录
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.block_timeout)
+            elif self.queue.qsize() < self.size:
+                self.queue.put_nowait(record)
+            else:
+                raise queue.Full
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+
+def get_logging():
+    """
+    初始化日志系统: 根日志记录器只挂一个队列处理器，文件和控制台输出由后台监听线程完成。
+    重复调用会先停止之前的监听线程。
+    :return: 根日志记录器
+    """
+    global _listener, _queue_handler
+    # 创建日志目录
+    if not os.path.exists(LOG_PATH):
+        os.makedirs(LOG_PATH)
+
+    # 设置日志文件路径
+    log_file_path = os.path.join(LOG_PATH, datetime.datetime.now().strftime('%Y-%m-%d') + '.log')
+    # 创建日志格式
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    # 创建文件处理器和控制台处理器，由监听线程调用
+    file_handler = logging.FileHandler(log_file_path, mode='a', encoding='utf-8')
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    with _lock:
+        stop_logging()
+        queue_handler = DroppingQueueHandler()
+        queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+        listener = QueueListener(queue_handler.queue, file_handler, stream_handler, respect_handler_level=True)
+        listener.start()
+        _listener, _queue_handler = listener, queue_handler
+
+    # 获取根日志记录器，并设置级别
+    logger = logging.getLogger()
+    logger.setLevel(getattr(logging, LOG_LEVEL))
+    # 移除所有旧的处理器，只保留队列处理器
+    logger.handlers = [queue_handler]
+
+    # 按分类设置级别，低于级别的日志在 logging.xxx 调用处即被丢弃
+    for category, level in LOG_CATEGORY_LEVELS.items():
+        logging.getLogger(category).setLevel(getattr(logging, level))
+
+    # 记录一条初始化日志
+    logger.info("日志系统初始化完成")
+    return logger
+
+
+def stop_logging():
+    """停止监听线程，写出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def logging_metrics():
+    handler = _queue_handler
+    if handler is None:
+        return {}
+    sampler = next((f for f in handler.filters if isinstance(f, SamplingFilter)), None)
+    return {
+        "queued": handler.queue.qsize(),
+        "enqueued": handler.enqueued,
+        "dropped": sum(handler.dropped.values()),
+        "dropped_by_level": dict(handler.dropped),
+        "sampled_out": sampler.sampled_out if sampler else 0,
+    }
+
+
+metrics_registry.register("logging", logging_metrics)
+atexit.register(stop_logging)
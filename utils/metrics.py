@@ -0,0 +1,33 @@
+import threading
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表。
+    各模块注册一个返回 dict 的回调，/metrics 接口调用 snapshot() 汇总输出。
+    """
+
+    def __init__(self):
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, provider):
+        """
+        注册指标回调
+        :param name: 指标分组名称
+        :param provider: 无参回调，返回可 JSON 序列化的 dict
+        """
+        with self._lock:
+            self._providers[name] = provider
+
+    def unregister(self, name):
+        with self._lock:
+            self._providers.pop(name, None)
+
+    def snapshot(self):
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: provider() for name, provider in providers.items()}
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+
+from config import SINGLE_FLIGHT_ENABLED
+from .metrics import metrics_registry
+
+
+def flight_key(*parts):
+    """由请求参数生成合并键，参数需可 JSON 序列化(其他类型按 str() 处理)"""
+    data = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    合并相同键的并发协程调用: 同一时刻只有第一个请求(leader)执行，其余请求(follower)等待并共享同一结果或异常。
+    调用完成后键即被移除，之后的请求重新执行。结果被多个请求共享，调用方不能修改。
+    """
+
+    def __init__(self, name, enabled=SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._calls = {}
+        self._stats = {"leaders": 0, "followers": 0}
+        metrics_registry.register(f"singleflight.{name}", self.metrics)
+
+    async def do(self, key, fn):
+        """
+        :param key: 合并键
+        :param fn: 无参回调，返回协程
+        """
+        if not self.enabled:
+            return await fn()
+        future = self._calls.get(key)
+        if future is not None:
+            self._stats["followers"] += 1
+        else:
+            self._stats["leaders"] += 1
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        # 单个请求断开(被取消)时不取消共享的计算
+        return await asyncio.shield(future)
+
+    def _done(self, key, future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # 所有请求都已断开时避免"异常未被获取"的警告
+
+    def metrics(self):
+        return {"in_flight": len(self._calls), **self._stats}
+
+
+class _Broadcast:
+    """一次流式输出的共享状态: 已产生的增量、是否结束、异常和订阅数"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.event = asyncio.Event()
+
+    def notify(self):
+        self.event.set()
+        self.event = asyncio.Event()
+
+
+class StreamFlight:
+    """
+    合并相同键的并发流式调用: 第一个请求在后台任务中读取上游的异步迭代器，
+    所有请求(包括之后加入的)从头订阅已产生的增量并跟随后续输出。
+    全部订阅者断开时取消上游；上游结束后键即被移除。
+    """
+
+    def __init__(self, name, enabled=SINGLE_FLIGHT_ENABLED):
+        self.name = name
+        self.enabled = enabled
+        self._streams = {}
+        self._stats = {"leaders": 0, "followers": 0, "cancelled": 0}
+        metrics_registry.register(f"singleflight.{name}", self.metrics)
+
+    def stream(self, key, produce):
+        """
+        :param key: 合并键
+        :param produce: 无参回调，返回文本增量的异步迭代器
+        :return: 增量的异步迭代器
+        """
+        if not self.enabled:
+            return produce()
+        broadcast = self._streams.get(key)
+        if broadcast is not None:
+            self._stats["followers"] += 1
+        else:
+            self._stats["leaders"] += 1
+            broadcast = self._streams[key] = _Broadcast()
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, produce))
+        return self._subscribe(key, broadcast)
+
+    async def _pump(self, key, broadcast, produce):
+        try:
+            async for delta in produce():
+                broadcast.chunks.append(delta)
+                broadcast.notify()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            broadcast.done = True
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            broadcast.notify()
+
+    async def _subscribe(self, key, broadcast):
+        broadcast.subscribers += 1
+        position = 0
+        try:
+            while True:
+                if position < len(broadcast.chunks):
+                    position += 1
+                    yield broadcast.chunks[position - 1]
+                elif broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                else:
+                    await broadcast.event.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # 没有订阅者了，停止上游并让之后的请求重新开始
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+                broadcast.task.cancel()
+                self._stats["cancelled"] += 1
+
+    def metrics(self):
+        return {"in_flight": len(self._streams), **self._stats}
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+from config import SSE_COALESCE_WINDOW_MS, SSE_COALESCE_MAX_CHARS
+from .metrics import metrics_registry
+
+
+class StreamStats:
+    """SSE 合并统计，只在事件循环线程中更新"""
+
+    def __init__(self, rate_window=10):
+        self.rate_window = rate_window  # 计算帧率的时间窗口(秒)
+        self._buckets = [(0, 0)] * rate_window  # 按秒计数的环形缓冲 (秒, 帧数)
+        self.streams = 0
+        self.deltas = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+
+    def on_frame(self, frame_bytes, merged, overhead):
+        """
+        :param frame_bytes: 发出的帧大小
+        :param merged: 合并进该帧的增量数
+        :param overhead: 每帧的固定开销(JSON 包装和 SSE 分帧)
+        """
+        self.deltas += merged
+        self.frames += 1
+        self.bytes_sent += frame_bytes
+        self.bytes_saved += (merged - 1) * overhead
+        second = int(time.monotonic())
+        slot = second % self.rate_window
+        bucket_second, count = self._buckets[slot]
+        self._buckets[slot] = (second, count + 1 if bucket_second == second else 1)
+
+    def metrics(self):
+        now = int(time.monotonic())
+        recent = sum(count for second, count in self._buckets if now - second < self.rate_window)
+        return {
+            "streams": self.streams,
+            "deltas": self.deltas,
+            "frames": self.frames,
+            "frames_per_second": round(recent / self.rate_window, 2),
+            "deltas_per_frame": round(self.deltas / self.frames, 2) if self.frames else 0.0,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+stream_stats = StreamStats()
+metrics_registry.register("sse", stream_stats.metrics)
+
+
+async def _non_empty(deltas):
+    # 跳过空增量(如 OpenAI 流式响应开头只带 role 的分块)，避免空帧占用"首帧"并推迟真正的首个 token
+    async for delta in deltas:
+        if delta:
+            yield delta
+
+
+async def coalesce_stream(deltas, frame, window_ms=SSE_COALESCE_WINDOW_MS, max_chars=SSE_COALESCE_MAX_CHARS):
+    """
+    合并大模型的流式增量后再分帧输出，减少小帧的序列化和发送次数。
+    第一个非空增量立即发出，之后的增量缓冲到距缓冲开始超过 window_ms 毫秒或累计 max_chars 个字符时合并为一帧，
+    上游暂时没有新增量时也会在时间窗口到期后发出，不会因等待而拖延已收到的内容。
+    上游抛出异常时先发出已缓冲的内容再抛出。
+    :param deltas: 文本增量的异步迭代器
+    :param frame: 文本 -> SSE 帧字符串
+    :param window_ms: 合并时间窗口(毫秒)，为 0 时每个增量单独成帧
+    :param max_chars: 单帧最多合并的字符数
+    """
+    overhead = len(frame("").encode("utf-8"))
+    stream_stats.streams += 1
+
+    def emit(parts):
+        data = frame("".join(parts))
+        stream_stats.on_frame(len(data.encode("utf-8")), len(parts), overhead)
+        return data
+
+    iterator = _non_empty(deltas)
+    # 第一个增量不等待
+    async for delta in iterator:
+        yield emit([delta])
+        break
+    else:
+        return
+
+    if window_ms <= 0:
+        async for delta in iterator:
+            yield emit([delta])
+        return
+
+    window = window_ms / 1000
+    buffer, size, deadline = [], 0, None
+    pending = None
+    try:
+        while True:
+            if not buffer:
+                # 缓冲为空时直接等待下一个增量(或上一轮超时未完成的读取)，无需计时
+                task, pending = pending, None
+                try:
+                    delta = await (task if task is not None else iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+                buffer, size, deadline = [delta], len(delta), time.monotonic() + window
+            else:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=max(deadline - time.monotonic(), 0))
+                if done:
+                    task, pending = pending, None
+                    try:
+                        delta = task.result()
+                    except StopAsyncIteration:
+                        break
+                    except Exception:
+                        # 上游出错时已收到的内容不丢弃
+                        yield emit(buffer)
+                        buffer = []
+                        raise
+                    buffer.append(delta)
+                    size += len(delta)
+            if size >= max_chars or time.monotonic() >= deadline:
+                yield emit(buffer)
+                buffer, size = [], 0
+    finally:
+        if pending is not None:
+            pending.cancel()
+    if buffer:
+        yield emit(buffer)
@@ -6,6 +6,7 @@ import logging.config
 from langchain_core.documents import Document
 from fastapi import UploadFile
 import re
+import json
 from bs4 import BeautifulSoup
 
 
@@ -16,43 +17,14 @@ def get_file_name(file_path):
         return None
 
 
-def get_logging():
-    # 创建日志目录
-    if not os.path.exists(LOG_PATH):
-        os.makedirs(LOG_PATH)
-
-    # 设置日志文件路径
-    log_file_path = os.path.join(LOG_PATH, datetime.datetime.now().strftime('%Y-%m-%d') + '.log')
-    # 创建日志格式
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-
-    # 创建文件处理器，并设置格式
-    file_handler = logging.FileHandler(log_file_path, mode='a', encoding='utf-8')
-    file_handler.setFormatter(formatter)
-
-    # 创建控制台处理器，并设置格式
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
-
-    # 获取根日志记录器，并设置级别
-    logger = logging.getLogger()
-    logger.setLevel(getattr(logging, LOG_LEVEL))
-
-    # 移除所有旧的处理器
-    logger.handlers = []
-
-    # 添加新的处理器
-    logger.addHandler(file_handler)
-    logger.addHandler(stream_handler)
-
-    # 记录一条初始化日志
-    logger.info("日志系统初始化完成")
-    return logger
+# 写入图数据库 Document 节点的属性
+DOCUMENT_SOURCE_KEYS = ('id', 'kb_uuid', 'file_uuid', 'source_filename')
 
 
 def create_document_from_item(item):
     """
     从提供的数据项创建并返回一个Document对象。
+    向量不放入 metadata，避免写入图数据库并在构建期间常驻内存。
 
     参数:
     item (dict): 包含文档信息的字典。
@@ -63,17 +35,58 @@ def create_document_from_item(item):
     document = Document(
         id=item['id'],
         page_content=item['text'],
-        metadata={
-            'id': item['id'],
-            'embedding': item['embedding'],
-            'source_filename': item['source_filename'],
-            'file_uuid': item['file_uuid'],
-            'kb_uuid': item['kb_uuid'],
-        }
+        metadata={key: item[key] for key in DOCUMENT_SOURCE_KEYS}
     )
     return document
 
 
+def iter_json_array(file_path, chunk_size=64 * 1024):
+    """
+    逐个读取 JSON 数组文件中的元素(元素为对象)，内存占用与单个元素大小成正比，而不是整个文件。
+
+    :param file_path: JSON 数组文件路径(如 vecs.json)
+    :param chunk_size: 每次读取的字符数
+    :return: 逐个产出数组元素的生成器
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        started = False
+        eof = False
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    if eof:
+                        return
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                if buffer[0] != '[':
+                    raise ValueError(f"{file_path} 不是 JSON 数组")
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(','):
+                buffer = buffer[1:]
+                continue
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # 缓冲区中的元素不完整，继续读取
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
 async def save_upload_file(file: UploadFile, file_path: str):
     """
     将 FastAPI UploadFile 对象保存到指定路径。